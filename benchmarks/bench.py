@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for ruscorpora-tools.
+
+Usage::
+
+    python benchmarks/bench.py [--sentences N] [--repeat N] [--output results.json]
+
+A synthetic corpus is generated in a temporary file; results (time,
+throughput and peak Python memory of each benchmark) are printed
+and optionally saved as JSON so that runs can be compared.
+"""
+from __future__ import absolute_import, unicode_literals, print_function
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+import tracemalloc
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, _ROOT)
+
+import ruscorpora as rnc
+from ruscorpora.tagset import CATEGORIES
+from ruscorpora.reader import (_iter_sentence_elements, _sentence_tokens,
+                               _sentence_tokens_reference)
+from ruscorpora.backends import available_backends
+
+from synthetic import generate_corpus
+
+BENCHMARKS = []
+
+def benchmark(name, unit='tokens'):
+    """
+    Register a benchmark. The decorated function receives a context
+    dict and returns a callable which runs the benchmark once and
+    returns the number of processed items.
+    """
+    def decorator(func):
+        BENCHMARKS.append((name, unit, func))
+        return func
+    return decorator
+
+
+def _consume(sents):
+    return sum(len(sent) for sent in sents)
+
+
+@benchmark('parse_xml')
+def bench_parse_xml(ctx):
+    return lambda: _consume(rnc.parse_xml(ctx['path']))
+
+
+@benchmark('parse_simple')
+def bench_parse_simple(ctx):
+    return lambda: _consume(rnc.parse_simple(ctx['path']))
+
+
+def _backend_benchmark(backend):
+    def setup(ctx):
+        return lambda: _consume(rnc.parse_xml(ctx['path'], backend=backend))
+    return setup
+
+for _backend in available_backends():
+    benchmark('parse_xml[backend=%s]' % _backend)(_backend_benchmark(_backend))
+
+
+@benchmark('parse_xml_lazy')
+def bench_parse_xml_lazy(ctx):
+    return lambda: _consume(rnc.parse_xml_lazy(ctx['path']))
+
+
+@benchmark('parse_xml_lazy texts')
+def bench_parse_xml_lazy_texts(ctx):
+    return lambda: _consume(sent.texts() for sent in rnc.parse_xml_lazy(ctx['path']))
+
+
+@benchmark('simplify(parse_xml)')
+def bench_simplify_parse_xml(ctx):
+    return lambda: _consume(rnc.simplify(rnc.parse_xml(ctx['path'])))
+
+
+@benchmark('simplify(parse_xml_lazy)')
+def bench_simplify_parse_xml_lazy(ctx):
+    return lambda: _consume(rnc.simplify(rnc.parse_xml_lazy(ctx['path'])))
+
+
+# peak memory of these benchmarks is the memory taken by retained sentences
+@benchmark('list(parse_xml)')
+def bench_list_parse_xml(ctx):
+    return lambda: _consume(list(rnc.parse_xml(ctx['path'])))
+
+
+@benchmark('list(parse_xml_lazy)')
+def bench_list_parse_xml_lazy(ctx):
+    return lambda: _consume(list(rnc.parse_xml_lazy(ctx['path'])))
+
+
+@benchmark('parse_xml[reference builder]')
+def bench_parse_xml_reference(ctx):
+    return lambda: _consume(
+        _sentence_tokens_reference(se) for se in _iter_sentence_elements(ctx['path'])
+    )
+
+
+@benchmark('sentence builder')
+def bench_sentence_builder(ctx):
+    return lambda: _consume(_sentence_tokens(se) for se in ctx['elements'])
+
+
+@benchmark('sentence builder[reference]')
+def bench_sentence_builder_reference(ctx):
+    return lambda: _consume(_sentence_tokens_reference(se) for se in ctx['elements'])
+
+
+SIMPLIFY_OPTIONS = [
+    {},
+    {'remove_accents': False},
+    {'join_split': False},
+    {'join_hyphenated': False},
+    {'wrap_tags': False},
+    {'flat_tokens': False},
+]
+
+def _simplify_benchmark(options):
+    def setup(ctx):
+        return lambda: _consume(rnc.simplify(ctx['parsed'], **options))
+    return setup
+
+for _options in SIMPLIFY_OPTIONS:
+    _name = 'simplify[%s]' % ",".join("%s=%s" % kv for kv in sorted(_options.items()))
+    benchmark(_name)(_simplify_benchmark(_options))
+
+
+@benchmark('Tag()', unit='tags')
+def bench_tag_init(ctx):
+    def run():
+        for gr in ctx['tag_strings']:
+            rnc.Tag(gr)
+        return len(ctx['tag_strings'])
+    return run
+
+
+@benchmark('Tag.from_string', unit='tags')
+def bench_tag_from_string(ctx):
+    def run():
+        from_string = rnc.Tag.from_string
+        for gr in ctx['tag_strings']:
+            from_string(gr)
+        return len(ctx['tag_strings'])
+    return run
+
+
+@benchmark('Tag properties', unit='attributes')
+def bench_tag_properties(ctx):
+    names = ['POS'] + [name for name, grammemes in CATEGORIES]
+    def run():
+        for tag in ctx['tags']:
+            for name in names:
+                getattr(tag, name)
+        return len(ctx['tags']) * len(names)
+    return run
+
+
+@benchmark('Tag == Tag', unit='comparisons')
+def bench_tag_eq(ctx):
+    def run():
+        tags = ctx['tags']
+        for tag1, tag2 in zip(tags, tags[1:]):
+            tag1 == tag2
+        return len(tags) - 1
+    return run
+
+
+@benchmark('Tag == str', unit='comparisons')
+def bench_tag_eq_str(ctx):
+    def run():
+        tags = ctx['tags']
+        for tag, gr in zip(tags, ctx['tag_strings'][1:]):
+            tag == gr
+        return len(tags) - 1
+    return run
+
+
+@benchmark('grammeme in Tag', unit='checks')
+def bench_tag_contains(ctx):
+    def run():
+        for tag in ctx['tags']:
+            'S' in tag
+            'gen' in tag
+            'pl' in tag
+        return len(ctx['tags']) * 3
+    return run
+
+
+@benchmark('import ruscorpora', unit='imports')
+def bench_import(ctx):
+    # a fresh interpreter is started for each import; its startup time
+    # is included
+    def run():
+        for _ in range(5):
+            subprocess.check_call([sys.executable, '-c', 'import ruscorpora'],
+                                  cwd=_ROOT)
+        return 5
+    return run
+
+
+def _tag_strings(parsed):
+    return [
+        ann.gr for sent in parsed for tok in sent
+        for ann in (tok.annotations or [])
+    ]
+
+
+def run_benchmark(func, ctx, repeat, memory=True):
+    run = func(ctx)
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        items = run()
+        times.append(time.perf_counter() - start)
+
+    result = {'seconds': min(times), 'items': items}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        run()
+        result['peak_memory_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    return result
+
+
+def _print_backend_speed(results):
+    speed = dict(
+        (result['name'][len('parse_xml[backend='):-1], result['per_second'])
+        for result in results if result['name'].startswith('parse_xml[backend=')
+    )
+    if 'etree' in speed and len(speed) > 1:
+        print("\nparser backends relative to etree: %s" % ", ".join(
+            "%s %.2fx" % (name, speed[name] / speed['etree']) for name in sorted(speed)
+        ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sentences', type=int, default=20000,
+                        help='number of sentences in the synthetic corpus')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--filter', default='',
+                        help='run only benchmarks with this substring in the name')
+    parser.add_argument('--no-memory', action='store_true',
+                        help="don't measure peak memory usage")
+    parser.add_argument('--output', help='save results to this JSON file')
+    args = parser.parse_args(argv)
+
+    fd, path = tempfile.mkstemp(suffix='.xml')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            tokens = generate_corpus(f, args.sentences, args.seed)
+
+        parsed = list(rnc.parse_xml(path))
+        tag_strings = _tag_strings(parsed)
+        ctx = {
+            'path': path,
+            'parsed': parsed,
+            'elements': list(_iter_sentence_elements(path)),
+            'tag_strings': tag_strings,
+            'tags': [rnc.Tag.from_string(gr) for gr in tag_strings],
+        }
+
+        results = []
+        for name, unit, func in BENCHMARKS:
+            if args.filter not in name:
+                continue
+            result = run_benchmark(func, ctx, args.repeat, not args.no_memory)
+            result.update(name=name, unit=unit)
+            result['per_second'] = result['items'] / result['seconds']
+            results.append(result)
+            print("%-45s %12.0f %s/s %10s" % (
+                name, result['per_second'], unit,
+                "%d KB" % result['peak_memory_kb'] if 'peak_memory_kb' in result else ''
+            ))
+    finally:
+        os.remove(path)
+
+    _print_backend_speed(results)
+
+    if args.output:
+        report = {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'sentences': args.sentences,
+            'tokens': tokens,
+            'seed': args.seed,
+            'benchmarks': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
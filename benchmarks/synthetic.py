@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Generator of synthetic corpus files in ruscorpora.ru XML format.
+"""
+from __future__ import absolute_import, unicode_literals
+import random
+from xml.sax.saxutils import quoteattr, escape
+
+from ruscorpora import tagset
+
+SYLLABLES = ['ка', 'ло', 'ми', 'ну', 'ре', 'та', 'ско', 'при', 'вед', 'жи',
+             'сто', 'гра', 'ну', 'ель', 'ор', 'шко', 'да', 'вы']
+PUNCT = [' ,', ' .', ' !', ' ?', ' —', ' :', ' ;', ' » .', ' ,-']
+
+
+def _choice(rng, grammemes):
+    return rng.choice(sorted(grammemes))
+
+
+def random_tag(rng):
+    """ Return a random tag built from real grammemes. """
+    pos = rng.choice(['S', 'S', 'A', 'V', 'V', 'ADV', 'PR', 'CONJ', 'PART',
+                      'S-PRO', 'A-PRO', 'NUM', 'ADV-PRO', 'PRAEDIC', 'INTJ'])
+    if pos in ('S', 'S-PRO'):
+        lex = [pos, _choice(rng, tagset.GENDERS), _choice(rng, tagset.ANIMACY)]
+        form = [_choice(rng, tagset.NUMBERS), _choice(rng, tagset.CASES)]
+    elif pos in ('A', 'A-PRO'):
+        lex = [pos]
+        form = [_choice(rng, tagset.NUMBERS), _choice(rng, tagset.CASES),
+                _choice(rng, tagset.GENDERS), _choice(rng, tagset.SHORT_FULL)]
+    elif pos == 'V':
+        lex = [pos, _choice(rng, tagset.ASPECTS), _choice(rng, tagset.TRANSITIVITY),
+               _choice(rng, tagset.VOICES)]
+        form = [_choice(rng, tagset.NUMBERS), _choice(rng, tagset.TENSES),
+                _choice(rng, tagset.GRAMMATICAL_MOODS), _choice(rng, tagset.PERSONS)]
+    elif pos == 'NUM':
+        lex = [pos]
+        form = [_choice(rng, tagset.CASES)] if rng.random() < 0.7 else ['ciph']
+    else:
+        return pos
+    return ",".join(lex) + "=" + ",".join(form)
+
+
+def random_word(rng, accent=True):
+    word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+    if accent and rng.random() < 0.6:
+        pos = rng.randint(1, len(word))
+        word = word[:pos] + '`' + word[pos:]
+    return word
+
+
+def _w(rng, word, joined=None, ambiguity=0.2):
+    count = rng.randint(2, 3) if rng.random() < ambiguity else 1
+    anas = []
+    for _ in range(count):
+        attrs = 'lex=%s gr=%s' % (quoteattr(word.replace('`', '')), quoteattr(random_tag(rng)))
+        if joined:
+            attrs += ' joined=%s' % quoteattr(joined)
+        anas.append('<ana %s></ana>' % attrs)
+    return '<w>%s%s</w>' % ("".join(anas), escape(word))
+
+
+def random_sentence(rng, min_words=5, max_words=25, ambiguity=0.2):
+    """ Return XML of a random <se> element and the number of its tokens. """
+    parts = ['<se>']
+    tokens = 0
+    if rng.random() < 0.1:
+        parts.append('«')
+        tokens += 1
+
+    for _ in range(rng.randint(min_words, max_words)):
+        r = rng.random()
+        if r < 0.05:
+            # split word
+            parts.append(_w(rng, random_word(rng), 'together', ambiguity))
+            parts.append(_w(rng, random_word(rng), 'together', ambiguity))
+        elif r < 0.1:
+            # hyphenated word
+            parts.append(_w(rng, random_word(rng), 'hyphen', ambiguity))
+            parts.append('-')
+            parts.append(_w(rng, random_word(rng), 'hyphen', ambiguity))
+        else:
+            parts.append(_w(rng, random_word(rng), ambiguity=ambiguity))
+        tokens += 1
+
+        if rng.random() < 0.15:
+            parts.append(escape(rng.choice(PUNCT)))
+            tokens += 1
+        parts.append('\n')
+
+    parts.append('</se>\n')
+    return "".join(parts), tokens
+
+
+def generate_corpus(fp, sentences, seed=0, ambiguity=0.2):
+    """
+    Write a synthetic corpus with ``sentences`` sentences to binary file
+    object ``fp``; return the number of tokens (as returned by
+    ``ruscorpora.parse_simple``).
+    """
+    rng = random.Random(seed)
+    tokens = 0
+    fp.write(b'<?xml version="1.0" encoding="utf-8" ?>\n<corpus>\n')
+    for _ in range(sentences):
+        xml, count = random_sentence(rng, ambiguity=ambiguity)
+        fp.write(xml.encode('utf8'))
+        tokens += count
+    fp.write(b'</corpus>\n')
+    return tokens
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from ruscorpora.export import main
+
+if __name__ == '__main__':
+    main()
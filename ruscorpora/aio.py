@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio API for the reader (Python 3.6+).
+
+``aparse_simple`` is an async version of ``ruscorpora.parse_simple``::
+
+    >>> async for sent in aparse_simple('fiction.xml'):
+    ...     print(sent)
+
+Parsing runs in an executor thread, so the event loop is not blocked.
+Sentences are sent to the loop in chunks through a bounded queue: the
+parser waits when the consumer is slow. ``source`` can be a file name,
+a file object or an async stream with a ``read`` coroutine (e.g.
+``asyncio.StreamReader``); async streams are read from the event loop.
+Parsing stops when the iterator is closed or the consuming task
+is cancelled.
+"""
+from __future__ import absolute_import, unicode_literals
+import asyncio
+import inspect
+import functools
+import threading
+
+from .reader import parse_simple
+
+_DONE = object()
+
+
+class _Stopped(Exception):
+    """ Raised in the parser thread when the consumer is gone. """
+
+
+async def aparse_simple(source, executor=None, chunk_size=100, max_chunks=4,
+                        read_size=64 * 1024, **simplify_kwargs):
+    """
+    Parse XML file ``source`` in ``executor`` (the default loop executor
+    if None) and return an async iterator over simplified sentences
+    (see ``ruscorpora.parse_simple``).
+
+    Sentences are passed to the loop in chunks of ``chunk_size`` sentences;
+    at most ``max_chunks`` chunks are buffered. Async streams are read
+    in blocks of at most ``read_size`` bytes. If parsing fails, sentences
+    parsed before the error are returned and then the error is raised.
+    """
+    loop = asyncio.get_event_loop()
+    queue = asyncio.Queue()
+    slots = threading.Semaphore(max_chunks)
+    stop = threading.Event()
+    reads = []  # pending async reads
+
+    if _is_async_stream(source):
+        source = _AsyncStreamReader(source, loop, stop, reads, read_size)
+
+    producer = loop.run_in_executor(executor, functools.partial(
+        _produce, source, simplify_kwargs, chunk_size, loop, queue, slots, stop
+    ))
+    try:
+        while True:
+            chunk = await queue.get()
+            slots.release()
+            if chunk is _DONE:
+                break
+            for sent in chunk:
+                yield sent
+        await producer  # re-raise parsing errors
+    finally:
+        if not producer.done():
+            stop.set()
+            for future in list(reads):
+                future.cancel()
+            slots.release()  # wake up the producer if it waits for a slot
+            await asyncio.wait([producer])
+
+
+def _produce(source, simplify_kwargs, chunk_size, loop, queue, slots, stop):
+    """ Parse ``source`` in the executor thread. """
+    def send(item):
+        slots.acquire()
+        if stop.is_set():
+            raise _Stopped()
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    chunk = []
+    try:
+        for sent in parse_simple(source, **simplify_kwargs):
+            chunk.append(sent)
+            if len(chunk) == chunk_size:
+                send(chunk)
+                chunk = []
+        if chunk:
+            send(chunk)
+    except _Stopped:
+        return
+    except Exception:
+        # sentences parsed before the error are returned first
+        if chunk:
+            send(chunk)
+        raise
+    finally:
+        # the final message doesn't wait for a slot
+        if not stop.is_set():
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+
+class _AsyncStreamReader(object):
+    """ Blocking file-like wrapper for an async stream; used in the parser thread. """
+
+    def __init__(self, stream, loop, stop, reads, read_size):
+        self._stream = stream
+        self._loop = loop
+        self._stop = stop
+        self._reads = reads
+        self._read_size = read_size
+
+    def read(self, size=-1):
+        if self._stop.is_set():
+            raise _Stopped()
+        if size is None or size < 0 or size > self._read_size:
+            size = self._read_size
+        future = asyncio.run_coroutine_threadsafe(
+            self._stream.read(size), self._loop
+        )
+        self._reads.append(future)
+        try:
+            return future.result()
+        except BaseException:  # CancelledError is not an Exception in Python 3.8+
+            if self._stop.is_set():
+                raise _Stopped()
+            raise
+        finally:
+            self._reads.remove(future)
+
+
+def _is_async_stream(source):
+    read = getattr(source, 'read', None)
+    return read is not None and inspect.iscoroutinefunction(read)
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Ambiguity-preserving reader.
+
+``parse_ambiguous`` keeps all candidate analyses of each token instead
+of the single one ``ruscorpora.simplify`` keeps. Split and hyphenated
+words are joined the same way as in ``simplify``; candidates of a joined
+token are all combinations of candidates of its parts.
+
+Sentences are returned in batches which store data in flat integer
+arrays; strings are interned in shared ``ruscorpora.arrays.Vocabularies``::
+
+    >>> for batch in parse_ambiguous('fiction.xml', batch_size=1000):
+    ...     for sent in batch:
+    ...         for i in range(len(sent)):
+    ...             print(sent.text(i), sent.candidates(i))
+
+Batch arrays (``array.array`` instances):
+
+* ``sent_offsets`` - the first token of each sentence (+ the total);
+* ``text_ids`` - a text id of each token;
+* ``token_offsets`` - the first candidate of each token (+ the total);
+* ``lex_ids``, ``gr_ids``, ``joined`` - lemma and tag ids and joined
+  codes (indices in ``ruscorpora.compiled.JOINED_VALUES``)
+  of each candidate.
+
+The last candidate of each token is the one ``simplify`` would return.
+"""
+from __future__ import absolute_import, unicode_literals
+import array
+import warnings
+import itertools
+
+from .reader import parse_xml, FlatToken, _HYPHEN_SECOND_PART_TAGS
+from .tagset import Tag
+from .arrays import Vocabularies
+from .compiled import JOINED_VALUES, JOINED_CODES
+
+
+def parse_ambiguous(source, batch_size=1000, vocabs=None, remove_accents=True,
+                    join_split=True, join_hyphenated=True, punct_tag='PNCT'):
+    """
+    Parse XML file ``source``; return an iterator over AmbiguousBatch
+    instances with up to ``batch_size`` sentences. Strings are interned
+    in ``vocabs`` (a new Vocabularies instance if None). Other options
+    have the same meaning as ``ruscorpora.simplify`` options.
+    """
+    if vocabs is None:
+        vocabs = Vocabularies()
+    batch = AmbiguousBatch(vocabs)
+    for sent in parse_xml(source):
+        groups = _group_tokens(sent, join_split, join_hyphenated, remove_accents)
+        batch.add(groups, remove_accents, punct_tag)
+        if len(batch) == batch_size:
+            yield batch
+            batch = AmbiguousBatch(vocabs)
+    if len(batch):
+        yield batch
+
+
+class AmbiguousBatch(object):
+    """ Sentences with all candidate analyses stored in flat arrays. """
+
+    def __init__(self, vocabs):
+        self.vocabs = vocabs
+        self.sent_offsets = array.array(str('I'), [0])
+        self.text_ids = array.array(str('i'))
+        self.token_offsets = array.array(str('I'), [0])
+        self.lex_ids = array.array(str('i'))
+        self.gr_ids = array.array(str('i'))
+        self.joined = array.array(str('b'))
+
+    def __len__(self):
+        return len(self.sent_offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("sentence index out of range")
+        return AmbiguousSentence(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield AmbiguousSentence(self, index)
+
+    def add(self, groups, remove_accents, punct_tag):
+        """ Add a sentence from ``_group_tokens`` result. """
+        text_vocab = self.vocabs.text
+        lex_vocab = self.vocabs.lex
+        gr_vocab = self.vocabs.gr
+        for group in groups:
+            text = "".join(tok.text for tok in group)
+            if remove_accents:
+                text = text.replace('`', '')
+            self.text_ids.append(text_vocab[text])
+            for lex, gr, joined in _candidates(text, group, punct_tag):
+                self.lex_ids.append(lex_vocab[lex])
+                self.gr_ids.append(gr_vocab[gr])
+                self.joined.append(JOINED_CODES[joined])
+            self.token_offsets.append(len(self.lex_ids))
+        self.sent_offsets.append(len(self.text_ids))
+
+
+class AmbiguousSentence(object):
+    """ A sentence of AmbiguousBatch. """
+    __slots__ = ('batch', 'start', 'end')
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.start = batch.sent_offsets[index]
+        self.end = batch.sent_offsets[index + 1]
+
+    def __len__(self):
+        return self.end - self.start
+
+    def text(self, i):
+        return self.batch.vocabs.text.items[self.batch.text_ids[self.start + i]]
+
+    def texts(self):
+        items = self.batch.vocabs.text.items
+        return [items[text_id] for text_id in self.batch.text_ids[self.start:self.end]]
+
+    def candidate_counts(self):
+        """ Return a list with the number of candidates of each token. """
+        offsets = self.batch.token_offsets[self.start:self.end + 1]
+        return [end - start for start, end in zip(offsets, offsets[1:])]
+
+    def candidates(self, i, wrap_tags=False):
+        """ Return a list of FlatToken instances for token ``i`` candidates. """
+        batch = self.batch
+        start = batch.token_offsets[self.start + i]
+        end = batch.token_offsets[self.start + i + 1]
+        return [self._token(i, j, wrap_tags) for j in range(start, end)]
+
+    def simplified(self, wrap_tags=True):
+        """ Return the sentence as ``ruscorpora.simplify`` would return it. """
+        offsets = self.batch.token_offsets
+        return [
+            self._token(i, offsets[self.start + i + 1] - 1, wrap_tags)
+            for i in range(len(self))
+        ]
+
+    def _token(self, i, j, wrap_tags):
+        batch = self.batch
+        vocabs = batch.vocabs
+        gr = vocabs.gr.items[batch.gr_ids[j]] if batch.gr_ids[j] else None
+        if wrap_tags and gr is not None:
+            gr = Tag.from_string(gr)
+        return FlatToken(
+            self.text(i),
+            vocabs.lex.items[batch.lex_ids[j]] if batch.lex_ids[j] else None,
+            gr,
+            JOINED_VALUES[batch.joined[j]],
+        )
+
+    def __repr__(self):
+        return "AmbiguousSentence(%r)" % self.texts()
+
+
+def _group_tokens(sent, join_split, join_hyphenated, remove_accents):
+    """
+    Split raw sentence tokens into groups which form simplified tokens;
+    this follows the joining logic of ``ruscorpora.reader._simplify``.
+    """
+    groups = []
+    split_accum = []
+    hyphen_accum = []
+
+    def add_split_joined(group):
+        if not join_hyphenated:
+            groups.append(group)
+            return
+
+        ann = _last_annotation(group[0])
+        text = "".join(tok.text for tok in group)
+        if remove_accents:
+            text = text.replace('`', '')
+        if ((ann is not None and ann.joined == 'hyphen') or
+                (hyphen_accum and text.strip() == '-')):
+            hyphen_accum.append(group)
+            if len(hyphen_accum) == 3:
+                groups.append([tok for item in hyphen_accum for tok in item])
+                del hyphen_accum[:]
+            return
+
+        if hyphen_accum:
+            _warn_unconsumed(hyphen_accum)
+            groups.extend(hyphen_accum)
+            del hyphen_accum[:]
+        groups.append(group)
+
+    for token in sent:
+        ann = _last_annotation(token)
+        if not join_split:
+            add_split_joined([token])
+            continue
+
+        if ann is not None and ann.joined == 'together':
+            split_accum.append(token)
+            if len(split_accum) == 2:
+                add_split_joined(split_accum)
+                split_accum = []
+            continue
+
+        if split_accum:
+            _warn_unconsumed([[tok] for tok in split_accum])
+            for tok in split_accum:
+                add_split_joined([tok])
+            split_accum = []
+        add_split_joined([token])
+
+    return groups
+
+
+def _candidates(text, group, punct_tag):
+    """
+    Return a list of (lex, gr, joined) candidates for a group of raw
+    tokens; the last one is the ``simplify`` result.
+    """
+    if len(group) == 1:
+        annotations = group[0].annotations
+        if annotations is None:
+            return [(text, punct_tag, None)]
+        return _unique([_flat_fields([ann]) for ann in annotations])
+
+    parts = [tok.annotations for tok in group if tok.annotations is not None]
+    return _unique([
+        _flat_fields(list(combination))
+        for combination in itertools.product(*parts)
+    ])
+
+
+def _flat_fields(annotations):
+    """ (lex, gr, joined) the same way as ``simplify`` flat tokens are built. """
+    ann = annotations[0]
+    if len(annotations) == 1:
+        return ann.lex, ann.gr, ann.joined
+    if all(a.joined == 'together' for a in annotations):
+        return "".join(a.lex for a in annotations), annotations[-1].gr, 'together'
+    if len(annotations) == 2 and all(a.joined == 'hyphen' for a in annotations):
+        ann1, ann2 = annotations
+        gr = ann1.gr if ann2.gr in _HYPHEN_SECOND_PART_TAGS else ann2.gr
+        return "-".join([ann1.lex, ann2.lex]), gr, 'hyphen'
+    return ann.lex, ann.gr, ann.joined
+
+
+def _unique(candidates):
+    """ Remove duplicates; the last occurrence is kept. """
+    seen = set()
+    result = []
+    for candidate in reversed(candidates):
+        if candidate not in seen:
+            seen.add(candidate)
+            result.append(candidate)
+    result.reverse()
+    return result
+
+
+def _last_annotation(token):
+    return token.annotations[-1] if token.annotations is not None else None
+
+
+def _warn_unconsumed(groups):
+    warnings.warn("unconsumed tokens: %s" % [
+        "".join(tok.text for tok in group) for group in groups
+    ])
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Export of simplified sentences to NumPy integer arrays.
+
+NumPy is an optional dependency (``pip install ruscorpora-tools[numpy]``).
+
+Sentences are converted to ids using shared ``Vocabularies``; arrays
+are either ragged (flat token arrays + sentence offsets) or padded
+(2D arrays + sentence lengths). Id 0 is used for padding and None
+values, id 1 is used for unknown strings when a vocabulary is frozen.
+"""
+from __future__ import absolute_import, unicode_literals
+import io
+import json
+
+np = None  # numpy module; it is imported by _require_numpy
+
+from .tagset import Tag, POS_TAGS, CUSTOM_GRAMMEMES, CATEGORIES
+
+PAD_ID = 0
+UNKNOWN_ID = 1
+
+# Values of grammatical categories; index in a tuple is a category value id.
+CATEGORY_VALUES = (
+    ('POS', (None,) + tuple(sorted(POS_TAGS | CUSTOM_GRAMMEMES))),
+) + tuple(
+    (name, (None,) + tuple(sorted(grammemes)))
+    for name, grammemes in CATEGORIES
+)
+
+# category value -> value id, for each category of CATEGORY_VALUES
+CATEGORY_VALUE_IDS = tuple(
+    dict((value, i) for i, value in enumerate(values))
+    for name, values in CATEGORY_VALUES
+)
+
+
+class Vocabulary(object):
+    """
+    Mapping from strings to integer ids. New strings get new ids
+    unless the vocabulary is ``frozen``.
+    """
+
+    def __init__(self, items=(), frozen=False):
+        self.items = ['<pad>', '<unk>']
+        self.ids = {}
+        for item in items:
+            self.add(item)
+        self.frozen = frozen
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, value):
+        """ Return id of ``value`` (adding it unless the vocabulary is frozen). """
+        if value is None:
+            return PAD_ID
+        try:
+            return self.ids[value]
+        except KeyError:
+            if self.frozen:
+                return UNKNOWN_ID
+            return self.add(value)
+
+    def add(self, value):
+        if value not in self.ids:
+            self.ids[value] = len(self.items)
+            self.items.append(value)
+        return self.ids[value]
+
+
+class Vocabularies(object):
+    """ Vocabularies for wordforms (``text``), lemmas (``lex``) and tags (``gr``). """
+
+    FIELDS = ('text', 'lex', 'gr')
+
+    def __init__(self, text=None, lex=None, gr=None):
+        self.text = text or Vocabulary()
+        self.lex = lex or Vocabulary()
+        self.gr = gr or Vocabulary()
+        self._category_table = None
+
+    def freeze(self):
+        for field in self.FIELDS:
+            getattr(self, field).frozen = True
+
+    def save(self, path):
+        data = dict(
+            (field, getattr(self, field).items[UNKNOWN_ID + 1:])
+            for field in self.FIELDS
+        )
+        with io.open(path, 'w', encoding='utf8') as f:
+            f.write(json.dumps(data, ensure_ascii=False))
+
+    @classmethod
+    def load(cls, path, frozen=False):
+        with io.open(path, 'r', encoding='utf8') as f:
+            data = json.loads(f.read())
+        return cls(*[
+            Vocabulary(data[field], frozen=frozen) for field in cls.FIELDS
+        ])
+
+    def category_table(self):
+        """
+        Return an array of shape (len(self.gr), len(CATEGORY_VALUES))
+        with category value ids for each tag id.
+        """
+        _require_numpy()
+        table = self._category_table
+        start = 0 if table is None else len(table)
+        if start == len(self.gr):
+            return table
+
+        rows = np.zeros((len(self.gr) - start, len(CATEGORY_VALUES)), dtype=np.uint8)
+        for row, gr in enumerate(self.gr.items[start:], start):
+            if row <= UNKNOWN_ID:
+                continue
+            tag = Tag.from_string(gr)
+            for col, (name, values) in enumerate(CATEGORY_VALUES):
+                rows[row - start, col] = CATEGORY_VALUE_IDS[col].get(getattr(tag, name), 0)
+
+        if table is not None:
+            rows = np.concatenate([table, rows])
+        self._category_table = rows
+        return rows
+
+
+def iter_batches(sents, vocabs, batch_size=1024, padded=False,
+                 categories=True):
+    """
+    Convert ``sents`` (simplified sentences, FlatToken lists) to NumPy arrays
+    in batches of ``batch_size`` sentences. Return an iterator over dicts
+    with 'text', 'lex' and 'gr' id arrays, per-category arrays
+    (keys from ``CATEGORY_VALUES``, if ``categories`` is True) and
+    'offsets' (ragged) or 'lengths' (padded) arrays.
+    """
+    _require_numpy()
+    batch = []
+    for sent in sents:
+        batch.append(sent)
+        if len(batch) == batch_size:
+            yield _batch_arrays(batch, vocabs, padded, categories)
+            batch = []
+    if batch:
+        yield _batch_arrays(batch, vocabs, padded, categories)
+
+
+def compiled_arrays(corpus, vocabs, padded=False, categories=True):
+    """
+    Convert a whole ``ruscorpora.CompiledCorpus`` to arrays (see
+    ``iter_batches`` for the result format). Token data is remapped
+    with array operations; only distinct strings are looked up
+    in vocabularies.
+    """
+    _require_numpy()
+    tokens = np.frombuffer(corpus.tokens, dtype=np.int32).reshape(-1, 4)
+    result = {}
+    for col, (field, table) in enumerate(zip(
+            Vocabularies.FIELDS, (corpus.texts, corpus.lexemes, corpus.tags))):
+        vocab = getattr(vocabs, field)
+        # the last element is used for -1 (None) ids
+        mapping = np.array([vocab[value] for value in table] + [PAD_ID], dtype=np.int32)
+        result[field] = mapping[tokens[:, col]]
+
+    offsets = np.frombuffer(corpus.sent_offsets, dtype=np.uint64).astype(np.int64)
+    return _finish(result, offsets, vocabs, padded, categories)
+
+
+def pad(flat, offsets):
+    """ Convert ragged array (``flat`` values + ``offsets``) to a padded 2D array. """
+    _require_numpy()
+    lengths = np.diff(offsets)
+    max_len = int(lengths.max()) if len(lengths) else 0
+    result = np.zeros((len(lengths), max_len), dtype=flat.dtype)
+    result[np.arange(max_len) < lengths[:, None]] = flat
+    return result
+
+
+def _batch_arrays(batch, vocabs, padded, categories):
+    lengths = np.fromiter((len(sent) for sent in batch), dtype=np.int64, count=len(batch))
+    offsets = np.zeros(len(batch) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    size = int(offsets[-1])
+
+    result = {}
+    for field in Vocabularies.FIELDS:
+        get_id = getattr(vocabs, field).__getitem__
+        result[field] = np.fromiter(
+            (get_id(tok_field) for tok_field in _field_values(batch, field)),
+            dtype=np.int32, count=size
+        )
+    return _finish(result, offsets, vocabs, padded, categories)
+
+
+def _field_values(batch, field):
+    if field != 'gr':
+        for sent in batch:
+            for tok in sent:
+                yield getattr(tok, field)
+        return
+
+    for sent in batch:
+        for tok in sent:
+            gr = tok.gr
+            yield str(gr) if gr is not None else None
+
+
+def _finish(result, offsets, vocabs, padded, categories):
+    if categories:
+        table = vocabs.category_table()
+        cat_ids = table[result['gr']]
+        for col, (name, values) in enumerate(CATEGORY_VALUES):
+            result[name] = cat_ids[:, col]
+
+    if padded:
+        for key in list(result):
+            result[key] = pad(result[key], offsets)
+        result['lengths'] = np.diff(offsets)
+    else:
+        result['offsets'] = offsets
+    return result
+
+
+def _require_numpy():
+    global np
+    if np is not None:
+        return
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("NumPy is required for array export; "
+                          "install it with 'pip install numpy'")
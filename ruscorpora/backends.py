@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+XML parser backends for ``ruscorpora.parse_xml``.
+
+* ``lxml`` - ``lxml.etree.iterparse`` (if lxml is installed);
+* ``etree`` - ``xml.etree.ElementTree.iterparse`` from the standard
+  library;
+* ``expat`` - callbacks of the standard ``xml.parsers.expat`` parser
+  build tokens directly, without element trees.
+
+All backends return the same sentences. The default backend (``'auto'``)
+is the first available one from ``PREFERRED_BACKENDS``, which are sorted
+by speed as measured by ``benchmarks/bench.py``: ``etree`` builds its
+tree in C, while with lxml creating Python proxies for elements costs
+more than the faster parsing saves, so lxml is only used when it
+is requested explicitly.
+"""
+from __future__ import absolute_import, unicode_literals
+import functools
+from xml.parsers import expat
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+from .reader import (Token, Annotation, ElementTree, _iter_sentence_elements,
+                     _sentence_tokens, _append_punct_tokens)
+
+PREFERRED_BACKENDS = ('etree', 'expat', 'lxml')
+
+_READ_SIZE = 64 * 1024
+
+
+def parse_etree(source):
+    for se in _iter_sentence_elements(source):
+        yield _sentence_tokens(se)
+
+
+def parse_lxml(source):
+    if lxml_etree is None:
+        raise ImportError("lxml is not installed")
+    # lxml keeps comments and processing instructions as elements, and text
+    # after them is their tail; they are dropped to get the same texts
+    # as other backends
+    iterparse = functools.partial(lxml_etree.iterparse, remove_comments=True,
+                                  remove_pis=True)
+    for se in _iter_sentence_elements(source, iterparse):
+        yield _sentence_tokens(se)
+
+
+def parse_expat(source):
+    if isinstance(source, str):
+        with open(source, 'rb') as fp:
+            for sent in _parse_expat(fp):
+                yield sent
+    else:
+        for sent in _parse_expat(source):
+            yield sent
+
+
+BACKENDS = {
+    'lxml': parse_lxml,
+    'etree': parse_etree,
+    'expat': parse_expat,
+}
+
+
+def available_backends():
+    """ Return a list of names of backends which can be used. """
+    return [
+        name for name in PREFERRED_BACKENDS
+        if name != 'lxml' or lxml_etree is not None
+    ]
+
+
+def get_backend(name='auto'):
+    """ Return parse(source) function of backend ``name``. """
+    if name == 'auto':
+        name = available_backends()[0]
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError("Unknown parser backend: %s" % name)
+    if name not in available_backends():
+        raise ValueError("Parser backend is not available: %s" % name)
+    return backend
+
+
+# ======== expat backend =========
+
+# roles of open elements
+_ROOT, _SE, _W, _ANA, _OTHER = range(5)
+
+# where character data goes
+_PUNCT, _WORD = 1, 2
+
+
+class _ExpatSentenceBuilder(object):
+    """
+    Expat handlers which build sentences the same way as
+    ``ruscorpora.reader._sentence_tokens`` does for ``<se>`` elements.
+    """
+
+    def __init__(self):
+        self.sents = []  # finished sentences
+        self.stack = []  # roles of open elements
+        self.target = None
+        self.data = []
+        self.sent = None
+        self.sent_finished = False
+        self.annotations = None
+        self.word = ''
+
+    def flush(self):
+        """ Process character data collected since the last tag. """
+        if self.data:
+            text = ''.join(self.data)
+            self.data = []
+            if self.target == _PUNCT:
+                if not text.isspace():
+                    _append_punct_tokens(text, self.sent.append)
+            elif self.target == _WORD:
+                self.word = text
+        if self.sent_finished:
+            # the tail of the last <se> is complete
+            self.sents.append(self.sent)
+            self.sent = None
+            self.sent_finished = False
+
+    def start(self, name, attrs):
+        self.flush()
+        stack = self.stack
+        parent = stack[-1] if stack else None
+        self.target = None
+        if parent is None:
+            role = _ROOT
+        elif parent == _ROOT and name == 'se':
+            role = _SE
+            self.sent = []
+            self.target = _PUNCT
+        elif parent == _SE and name == 'w':
+            role = _W
+            self.annotations = []
+            self.word = ''
+        elif parent == _W and name == 'ana':
+            role = _ANA
+            self.annotations.append(Annotation(
+                attrs.get('lex'), attrs.get('gr'), attrs.get('joined')
+            ))
+            self.word = ''
+        else:
+            role = _OTHER
+        stack.append(role)
+
+    def end(self, name):
+        self.flush()
+        role = self.stack.pop()
+        self.target = None
+        if role == _ANA:
+            # text after the last annotation is a word
+            self.target = _WORD
+        elif role == _W:
+            word = self.word
+            if word and not word.isspace():
+                self.sent.append(Token(word, self.annotations))
+            self.target = _PUNCT
+        elif role == _SE:
+            self.target = _PUNCT
+            self.sent_finished = True
+
+    def char_data(self, data):
+        if self.target is not None:
+            self.data.append(data)
+
+
+def _parse_expat(fp):
+    builder = _ExpatSentenceBuilder()
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = builder.start
+    parser.EndElementHandler = builder.end
+    parser.CharacterDataHandler = builder.char_data
+
+    sents = builder.sents
+    while True:
+        data = fp.read(_READ_SIZE)
+        try:
+            parser.Parse(data, not data)
+        except expat.ExpatError as e:
+            error = ElementTree.ParseError(str(e))
+            error.code, error.position = e.code, (e.lineno, e.offset)
+            # sentences parsed before the error are still returned
+            for sent in sents:
+                yield sent
+            raise error
+        for sent in sents:
+            yield sent
+        del sents[:]
+        if not data:
+            break
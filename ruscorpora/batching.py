@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Length-bucketed batches of sentences for training loops.
+
+Sentences are read into a window of ``window`` sentences; the window is
+sorted by sentence length and cut into batches which fit a token budget,
+so sentences of similar length are padded together. Only one window is
+kept in memory::
+
+    >>> for batch in corpus_batches('corpus/', max_tokens=4096, seed=epoch):
+    ...     train(batch)
+
+The token budget is for padded batches: the number of sentences times
+the length of the longest one doesn't exceed ``max_tokens`` (a sentence
+longer than ``max_tokens`` gets a batch of its own). With ``shuffle``,
+the order of files, of sentences of the same length and of batches
+within a window is random, but it is the same for the same ``seed``.
+"""
+from __future__ import absolute_import, unicode_literals
+import random
+
+from .corpus import iter_files, parse_corpus
+
+
+def bucket_batches(sents, max_tokens=4096, window=10000, max_sentences=None,
+                   shuffle=True, seed=0, length=len):
+    """
+    Return an iterator over batches (lists) of sentences from ``sents``
+    bucketed by ``length(sent)``; see the module docstring.
+    ``max_sentences`` limits the number of sentences in a batch.
+    """
+    rng = random.Random(seed)
+    buf = []
+    for sent in sents:
+        buf.append(sent)
+        if len(buf) >= window:
+            for batch in _window_batches(buf, max_tokens, max_sentences,
+                                         shuffle and rng, length):
+                yield batch
+            buf = []
+    if buf:
+        for batch in _window_batches(buf, max_tokens, max_sentences,
+                                     shuffle and rng, length):
+            yield batch
+
+
+def corpus_batches(paths, max_tokens=4096, window=10000, max_sentences=None,
+                   shuffle=True, seed=0, workers=None, **simplify_kwargs):
+    """
+    Parse and simplify corpus files from ``paths`` in ``workers`` processes
+    (see ``ruscorpora.parse_corpus``) and return an iterator over batches
+    of simplified sentences (see ``bucket_batches``). The result doesn't
+    depend on the number of workers.
+    """
+    paths = list(iter_files(paths))
+    if shuffle:
+        random.Random(seed).shuffle(paths)
+    sents = parse_corpus(paths, workers, **simplify_kwargs)
+    return bucket_batches(sents, max_tokens, window, max_sentences,
+                          shuffle, seed, len)
+
+
+def padding_ratio(batches, length=len):
+    """
+    Return the fraction of padding in ``batches`` if each batch
+    is padded to its longest sentence.
+    """
+    tokens = padded = 0
+    for batch in batches:
+        lengths = [length(sent) for sent in batch]
+        tokens += sum(lengths)
+        padded += max(lengths) * len(lengths)
+    if not padded:
+        return 0.0
+    return 1.0 - tokens / float(padded)
+
+
+def _window_batches(buf, max_tokens, max_sentences, rng, length):
+    if rng:
+        # sentences of the same length are shuffled (sort is stable)
+        rng.shuffle(buf)
+    buf.sort(key=length)
+
+    batches = []
+    batch = []
+    for sent in buf:
+        # sentences are sorted, so the new one is the longest in the batch
+        size = len(batch) + 1
+        if batch and (size * length(sent) > max_tokens or
+                      (max_sentences is not None and size > max_sentences)):
+            batches.append(batch)
+            batch = []
+        batch.append(sent)
+    if batch:
+        batches.append(batch)
+
+    if rng:
+        rng.shuffle(batches)
+    return batches
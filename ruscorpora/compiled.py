@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+Binary cache of preprocessed (simplified) corpus.
+
+The corpus is parsed once and saved to a compact binary file which
+is memory-mapped later; reading sentences from it doesn't require
+XML parsing.
+
+File layout (all integers are in native byte order)::
+
+    preamble: magic, format version, trailer offset
+    tokens:   int32 (text id, lex id, gr id, joined code) for each token
+    sents:    uint64 offset of the first token for each sentence (+ total)
+    strings:  3 tables (text, lex, gr); each is uint64 offsets + utf-8 data
+    trailer:  JSON with source file stats, simplify options and sections
+
+String ids are indices in the corresponding tables; -1 means None.
+"""
+from __future__ import absolute_import, unicode_literals
+import os
+import sys
+import mmap
+import json
+import array
+import struct
+
+from .reader import FlatToken
+from .tagset import Tag
+from .corpus import iter_files, parse_corpus, source_stat, _warn_error
+
+MAGIC = b'RNCCACHE'
+VERSION = 1
+
+JOINED_VALUES = (None, 'together', 'hyphen')
+JOINED_CODES = dict((value, code) for code, value in enumerate(JOINED_VALUES))
+
+_PREAMBLE = struct.Struct(str('<8sIIQ'))
+_FIELDS = 4  # text, lex, gr, joined
+_TABLES = ('text', 'lex', 'gr')
+
+# simplify options which change the compiled data
+_SIMPLIFY_OPTIONS = {
+    'remove_accents': True,
+    'join_split': True,
+    'join_hyphenated': True,
+    'punct_tag': 'PNCT',
+}
+
+
+def compile_corpus(paths, cache_path, workers=1, **simplify_kwargs):
+    """
+    Parse and simplify corpus files from ``paths`` (a file name,
+    a directory or a list of them) and save the result to ``cache_path``.
+    Extra keyword arguments are passed to ``ruscorpora.simplify``.
+
+    Files which fail to parse are reported with a warning and recorded
+    in the cache; such a cache is never considered fresh (see ``is_fresh``).
+    """
+    sources = [source_stat(path) for path in iter_files(paths)]
+    options = _options(simplify_kwargs)
+    errors = []
+
+    def on_error(path, exception):
+        _warn_error(path, exception)
+        errors.append([os.path.abspath(path), repr(exception)])
+
+    sents = parse_corpus([s[0] for s in sources], workers=workers,
+                         on_error=on_error, wrap_tags=False, **options)
+
+    tables = dict((name, {}) for name in _TABLES)
+    texts, lexemes, tags = [tables[name] for name in _TABLES]
+
+    def intern(table, value):
+        if value is None:
+            return -1
+        try:
+            return table[value]
+        except KeyError:
+            table[value] = len(table)
+            return table[value]
+
+    sent_offsets = array.array(str('Q'), [0])
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, 0, 0))
+        sections = {}
+
+        start = f.tell()
+        size = 0
+        for sent in sents:
+            ids = array.array(str('i'))
+            for tok in sent:
+                ids.extend((
+                    intern(texts, tok.text),
+                    intern(lexemes, tok.lex),
+                    intern(tags, tok.gr),
+                    JOINED_CODES[tok.joined],
+                ))
+            f.write(ids.tobytes())
+            size += len(sent)
+            sent_offsets.append(size)
+        sections['tokens'] = (start, 'i', size * _FIELDS)
+
+        sections['sents'] = _write_array(f, sent_offsets)
+        for name in _TABLES:
+            offsets, data = _encode_table(tables[name])
+            sections[name + '_offsets'] = _write_array(f, offsets)
+            sections[name + '_data'] = _write_array(f, array.array(str('B'), data))
+
+        trailer = {
+            'byteorder': sys.byteorder,
+            'sources': sources,
+            'options': options,
+            'errors': errors,
+            'sections': sections,
+        }
+        trailer_offset = f.tell()
+        f.write(json.dumps(trailer).encode('utf8'))
+        f.seek(0)
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, 0, trailer_offset))
+
+    os.replace(tmp_path, cache_path)
+
+
+def is_fresh(cache_path, paths, **simplify_kwargs):
+    """
+    Return True if ``cache_path`` exists and was compiled from the current
+    versions of ``paths`` with the same simplify options, and all files
+    were parsed without errors.
+    """
+    try:
+        trailer = _read_trailer(cache_path)
+    except (IOError, OSError, ValueError):
+        return False
+
+    sources = [source_stat(path) for path in iter_files(paths)]
+    return (
+        trailer['byteorder'] == sys.byteorder and
+        [list(s) for s in sources] == trailer['sources'] and
+        _options(simplify_kwargs) == trailer['options'] and
+        not trailer.get('errors')
+    )
+
+
+def parse_cached(paths, cache_path=None, workers=1, wrap_tags=True,
+                 **simplify_kwargs):
+    """
+    Return an iterator over simplified sentences from ``paths``; sentences
+    are read from ``cache_path`` compiled file which is (re)built when
+    it is missing or outdated. By default the cache file for a single
+    corpus file is stored next to it.
+    """
+    if cache_path is None:
+        if not isinstance(paths, str) or not os.path.isfile(paths):
+            raise ValueError("cache_path is required for multiple files")
+        cache_path = paths + '.rnc'
+
+    if not is_fresh(cache_path, paths, **simplify_kwargs):
+        compile_corpus(paths, cache_path, workers, **simplify_kwargs)
+
+    return _iter_compiled(cache_path, wrap_tags)
+
+
+def _iter_compiled(cache_path, wrap_tags):
+    with CompiledCorpus(cache_path) as corpus:
+        for sent in corpus.sentences(wrap_tags):
+            yield sent
+
+
+class StringTable(object):
+    """ Lazily decoded table of interned strings. """
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+        self._strings = [None] * (len(offsets) - 1)
+
+    def __len__(self):
+        return len(self._strings)
+
+    def __getitem__(self, index):
+        if index < 0:
+            return None
+        value = self._strings[index]
+        if value is None:
+            start, end = self._offsets[index], self._offsets[index + 1]
+            value = self._strings[index] = self._data[start:end].tobytes().decode('utf8')
+        return value
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class CompiledCorpus(object):
+    """
+    Memory-mapped compiled corpus (see ``compile_corpus``).
+
+    Integer data is available without decoding:
+
+    * ``tokens`` - int32 memoryview with (text id, lex id, gr id, joined code)
+      for each token;
+    * ``sent_offsets`` - uint64 memoryview with offsets of sentences
+      in ``tokens`` (measured in tokens); it has len(corpus)+1 elements;
+    * ``texts``, ``lexemes``, ``tags`` - StringTable instances for decoding
+      string ids.
+
+    ``errors`` is a list of [path, error] for files which failed to parse.
+    """
+
+    def __init__(self, cache_path):
+        self.path = cache_path
+        trailer = _read_trailer(cache_path)
+        if trailer['byteorder'] != sys.byteorder:
+            raise ValueError("%s is compiled on a platform with different "
+                             "byte order" % cache_path)
+        self.sources = trailer['sources']
+        self.options = trailer['options']
+        self.errors = trailer.get('errors', [])
+
+        with open(cache_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        self._views = []
+
+        def section(name):
+            offset, typecode, length = trailer['sections'][name]
+            itemsize = array.array(str(typecode)).itemsize
+            view = self._buffer[offset:offset + length * itemsize]
+            self._views.append(view)
+            view = view.cast(str(typecode))
+            self._views.append(view)
+            return view
+
+        self.tokens = section('tokens')
+        self.sent_offsets = section('sents')
+        self.texts, self.lexemes, self.tags = [
+            StringTable(section(name + '_offsets'), section(name + '_data'))
+            for name in _TABLES
+        ]
+        self._wrapped_tags = {}
+
+    def __len__(self):
+        return len(self.sent_offsets) - 1
+
+    def __iter__(self):
+        return self.sentences()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def sentence_ids(self, index):
+        """
+        Return a memoryview with (text id, lex id, gr id, joined code)
+        for tokens of sentence ``index``.
+        """
+        start, end = self.sent_offsets[index], self.sent_offsets[index + 1]
+        return self.tokens[start * _FIELDS:end * _FIELDS]
+
+    def sentences(self, wrap_tags=True):
+        """
+        Return an iterator over sentences; each sentence is a list of
+        FlatToken instances.
+        """
+        texts, lexemes = self.texts, self.lexemes
+        tags = self._tag if wrap_tags else self.tags.__getitem__
+        offsets = self.sent_offsets
+
+        for index in range(len(self)):
+            ids = self.tokens[offsets[index] * _FIELDS:offsets[index + 1] * _FIELDS].tolist()
+            yield [
+                FlatToken(texts[ids[i]], lexemes[ids[i + 1]], tags(ids[i + 2]),
+                          JOINED_VALUES[ids[i + 3]])
+                for i in range(0, len(ids), _FIELDS)
+            ]
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._buffer.release()
+        self._mmap.close()
+
+    def _tag(self, gr_id):
+        try:
+            return self._wrapped_tags[gr_id]
+        except KeyError:
+            gr = self.tags[gr_id]
+            tag = self._wrapped_tags[gr_id] = Tag.from_string(gr) if gr is not None else None
+            return tag
+
+
+def _options(simplify_kwargs):
+    unknown = set(simplify_kwargs) - set(_SIMPLIFY_OPTIONS)
+    if unknown:
+        raise TypeError("unsupported options: %s" % ", ".join(sorted(unknown)))
+    options = dict(_SIMPLIFY_OPTIONS)
+    options.update(simplify_kwargs)
+    return options
+
+
+def _encode_table(table):
+    strings = sorted(table, key=table.get)
+    offsets = array.array(str('Q'), [0])
+    data = bytearray()
+    for value in strings:
+        data.extend(value.encode('utf8'))
+        offsets.append(len(data))
+    return offsets, data
+
+
+def _write_array(f, arr):
+    """ Write array aligned to 8 bytes; return its section description. """
+    f.write(b'\0' * (-f.tell() % 8))
+    offset = f.tell()
+    f.write(arr.tobytes())
+    return (offset, arr.typecode, len(arr))
+
+
+def _read_trailer(cache_path):
+    with open(cache_path, 'rb') as f:
+        try:
+            magic, version, _, trailer_offset = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        except struct.error:
+            raise ValueError("%s is not a compiled corpus file" % cache_path)
+        if magic != MAGIC or version != VERSION or not trailer_offset:
+            raise ValueError("%s is not a compiled corpus file" % cache_path)
+        f.seek(trailer_offset)
+        return json.loads(f.read().decode('utf8'))
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Inverted index over lemmas, wordforms and grammemes for concordance search.
+
+Index is stored in a directory; each corpus file gets its own segment
+with postings (sentence number, token position) for each term, so adding
+or changing corpus files only rebuilds their segments::
+
+    >>> index = ConcordanceIndex('index/')
+    >>> index.update('corpus/', workers=4)
+    >>> for hit in index.search(lex='школа', gr=['pl']):
+    ...     print(hit.left, hit.token, hit.right)
+
+Terms are ``lex:<lemma>``, ``text:<lowercased wordform>`` and
+``gr:<grammeme>``. Postings are delta-encoded varints.
+"""
+from __future__ import absolute_import, unicode_literals
+import os
+import io
+import json
+import struct
+import hashlib
+import functools
+from collections import namedtuple
+
+from .reader import simplify, parse_simple
+from .corpus import iter_files, map_files, source_stat
+from .offsets import load_offset_index
+
+Hit = namedtuple('Hit', 'path sentence position left token right')
+
+MANIFEST = 'manifest.json'
+_SEGMENT_MAGIC = b'RNCPOST1'
+
+
+def make_terms(token):
+    """ Return index terms for FlatToken ``token``. """
+    terms = ['text:' + token.text.lower()]
+    if token.lex is not None:
+        terms.append('lex:' + token.lex)
+    if token.gr is not None:
+        gr = str(token.gr)
+        terms.extend('gr:' + grammeme for grammeme in set(gr.replace('=', ',').split(',')))
+    return terms
+
+
+class ConcordanceIndex(object):
+    """ Inverted index stored in ``index_dir`` directory. """
+
+    def __init__(self, index_dir, **simplify_kwargs):
+        self.index_dir = index_dir
+        if not os.path.isdir(index_dir):
+            os.makedirs(index_dir)
+        self.manifest = self._load_manifest()
+        if self.manifest['simplify'] != simplify_kwargs:
+            # segments were built with different options
+            self.manifest = {'simplify': simplify_kwargs, 'files': {}}
+        self._segments = {}
+
+    def update(self, paths, workers=1, remove_missing=False):
+        """
+        Index corpus files from ``paths``; files which are already indexed
+        and not changed are skipped. If ``remove_missing`` is True, files
+        which are not in ``paths`` are removed from the index.
+        Return a list of (re)indexed files.
+        """
+        files = self.manifest['files']
+        # compressed files can't be indexed: search needs random access
+        stats = dict(
+            (os.path.abspath(path), source_stat(path))
+            for path in iter_files(paths, ('.xml',))
+        )
+        outdated = [
+            path for path, stat in sorted(stats.items())
+            if path not in files or files[path]['stat'] != stat
+        ]
+
+        func = functools.partial(_build_segment, self.index_dir,
+                                 self.manifest['simplify'])
+        for path, segment, sentences in map_files(func, outdated, workers):
+            files[path] = {
+                'stat': stats[path],
+                'segment': segment,
+                'sentences': sentences,
+            }
+            self._segments.pop(path, None)
+
+        if remove_missing:
+            for path in set(files) - set(stats):
+                self._remove_segment(files.pop(path)['segment'])
+                self._segments.pop(path, None)
+
+        self._save_manifest()
+        return outdated
+
+    def files(self):
+        return sorted(self.manifest['files'])
+
+    def postings(self, term):
+        """ Return a list of (path, sentence number, position) for ``term``. """
+        result = []
+        for path in self.files():
+            for sent_no, pos in self._segment(path).get(term, ()):
+                result.append((path, sent_no, pos))
+        return result
+
+    def find(self, *terms, **fields):
+        """
+        Return a sorted list of (path, sentence number, position) of tokens
+        having all ``terms``. Terms can also be passed as keyword arguments:
+        ``lex``, ``text`` (lowercased automatically) and ``gr`` (a grammeme
+        or a list of grammemes).
+        """
+        terms = list(terms) + _field_terms(fields)
+        if not terms:
+            raise ValueError("no terms given")
+
+        result = []
+        for path in self.files():
+            segment = self._segment(path)
+            # start from the rarest term
+            postings = sorted((segment.get(term, ()) for term in terms), key=len)
+            matches = set(postings[0])
+            for other in postings[1:]:
+                if not matches:
+                    break
+                matches.intersection_update(other)
+            result.extend((path, sent_no, pos) for sent_no, pos in sorted(matches))
+        return result
+
+    def search(self, *terms, **fields):
+        """
+        Return an iterator over Hit instances for tokens having all terms
+        (see ``find``); ``window`` keyword argument sets the number of
+        context tokens on each side (default is 5).
+        """
+        window = fields.pop('window', 5)
+        simplify_kwargs = self.manifest['simplify']
+        current_path, fp, offsets = None, None, None
+        try:
+            for path, sent_no, pos in self.find(*terms, **fields):
+                if path != current_path:
+                    if fp is not None:
+                        fp.close()
+                    current_path = path
+                    segment = self.manifest['files'][path]['segment']
+                    offsets = load_offset_index(path, self._path(segment + '.sents'))
+                    fp = open(path, 'rb')
+
+                raw_sent = offsets.parse(fp, sent_no)
+                sent = next(simplify([raw_sent], **simplify_kwargs))
+                yield Hit(path, sent_no, pos, sent[max(pos - window, 0):pos],
+                          sent[pos], sent[pos + 1:pos + 1 + window])
+        finally:
+            if fp is not None:
+                fp.close()
+
+    def _segment(self, path):
+        if path not in self._segments:
+            segment = self.manifest['files'][path]['segment']
+            self._segments[path] = _LazyPostings(self._path(segment))
+        return self._segments[path]
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _remove_segment(self, segment):
+        for name in (segment, segment + '.sents'):
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+
+    def _load_manifest(self):
+        try:
+            with io.open(self._path(MANIFEST), encoding='utf8') as f:
+                return json.loads(f.read())
+        except (IOError, OSError):
+            return {'simplify': {}, 'files': {}}
+
+    def _save_manifest(self):
+        tmp_path = self._path(MANIFEST + '.tmp')
+        with io.open(tmp_path, 'w', encoding='utf8') as f:
+            f.write(json.dumps(self.manifest, ensure_ascii=False))
+        os.replace(tmp_path, self._path(MANIFEST))
+
+
+def _field_terms(fields):
+    terms = []
+    for name, values in sorted(fields.items()):
+        if name not in ('lex', 'text', 'gr'):
+            raise TypeError("unknown field: %s" % name)
+        if isinstance(values, str):
+            values = [values]
+        for value in values:
+            if name == 'text':
+                value = value.lower()
+            terms.append('%s:%s' % (name, value))
+    return terms
+
+
+def _build_segment(index_dir, simplify_kwargs, path):
+    """ Index file ``path``; return [(path, segment name, number of sentences)]. """
+    postings = {}
+    sent_no = -1
+    for sent_no, sent in enumerate(parse_simple(path, **simplify_kwargs)):
+        for pos, token in enumerate(sent):
+            for term in make_terms(token):
+                postings.setdefault(term, []).append((sent_no, pos))
+
+    segment = hashlib.md5(os.path.abspath(path).encode('utf8')).hexdigest() + '.seg'
+    segment_path = os.path.join(index_dir, segment)
+    write_segment(segment_path, postings)
+    load_offset_index(path, segment_path + '.sents')
+    return [(path, segment, sent_no + 1)]
+
+
+# ======== Segment format =========
+#
+# magic, uint64 length of a JSON term table, JSON {term: [offset, size]},
+# postings data. Postings of a term are varints: for each (sentence, position)
+# pair a sentence delta and a position (delta from the previous position
+# in the same sentence).
+
+def write_segment(path, postings):
+    terms = {}
+    data = bytearray()
+    for term in sorted(postings):
+        start = len(data)
+        data.extend(encode_postings(postings[term]))
+        terms[term] = [start, len(data) - start]
+
+    table = json.dumps(terms, ensure_ascii=False).encode('utf8')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_SEGMENT_MAGIC)
+        f.write(struct.pack(str('<Q'), len(table)))
+        f.write(table)
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class _LazyPostings(object):
+    """ Segment reader; postings are decoded on first access. """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(_SEGMENT_MAGIC)) != _SEGMENT_MAGIC:
+                raise ValueError("%s is not a postings segment" % path)
+            size, = struct.unpack(str('<Q'), f.read(8))
+            self._terms = json.loads(f.read(size).decode('utf8'))
+            self._data = f.read()
+        self._decoded = {}
+
+    def get(self, term, default=None):
+        if term not in self._terms:
+            return default
+        if term not in self._decoded:
+            start, size = self._terms[term]
+            self._decoded[term] = decode_postings(self._data[start:start + size])
+        return self._decoded[term]
+
+
+def encode_postings(postings):
+    """ Encode sorted (sentence, position) pairs as delta varints. """
+    result = bytearray()
+    prev_sent, prev_pos = 0, 0
+    for sent_no, pos in postings:
+        if sent_no != prev_sent:
+            prev_pos = 0
+        _write_varint(result, sent_no - prev_sent)
+        _write_varint(result, pos - prev_pos)
+        prev_sent, prev_pos = sent_no, pos
+    return bytes(result)
+
+
+def decode_postings(data):
+    values = _read_varints(bytearray(data))
+    result = []
+    sent_no, pos = 0, 0
+    for i in range(0, len(values), 2):
+        if values[i]:
+            sent_no += values[i]
+            pos = 0
+        pos += values[i + 1]
+        result.append((sent_no, pos))
+    return result
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varints(data):
+    values = []
+    value, shift = 0, 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value, shift = 0, 0
+    return values
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Processing of many corpus files in parallel.
+"""
+from __future__ import absolute_import, unicode_literals
+import os
+import warnings
+import functools
+
+from .reader import parse_simple
+from .sources import CORPUS_EXTENSIONS
+
+
+def iter_files(paths, extensions=CORPUS_EXTENSIONS):
+    """
+    Return an iterator over corpus files. ``paths`` is a file name,
+    a directory name or a list of them; directories are searched
+    recursively for files with one of the ``extensions`` (XML files,
+    compressed XML files and zip archives by default). Files
+    are returned in a deterministic (sorted) order.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.endswith(tuple(extensions)):
+                    yield os.path.join(dirpath, name)
+
+
+def source_stat(path):
+    """
+    Return [absolute path, mtime, size] of file ``path``; it is used
+    to check if files derived from the corpus file are up to date.
+    """
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_mtime, stat.st_size]
+
+
+def map_files(func, paths, workers=None, ordered=True, chunk_size=500,
+              on_error=None):
+    """
+    Call ``func(path)`` for each file from ``paths`` (see ``iter_files``)
+    in a pool of ``workers`` processes and return an iterator over
+    the items of the returned iterables. ``func`` must be picklable.
+
+    Items are sent back from workers in chunks of ``chunk_size`` items
+    as soon as they are ready. If ``ordered`` is True, items are returned
+    in file order; otherwise they are returned as they are produced.
+
+    An exception raised for a file doesn't stop processing of other files;
+    it is passed to ``on_error(path, exception)`` callback (by default
+    a warning is issued). Items produced for the file before the error
+    are kept. If a worker process dies (e.g. it is killed), its file
+    is reported the same way (as well as the files processed by it
+    earlier whose output was not sent yet).
+
+    In ordered mode, items of files which are finished before the
+    current file are kept in memory; up to ``2 * workers`` files
+    are processed at the same time.
+    """
+    paths = list(iter_files(paths))
+    if on_error is None:
+        on_error = _warn_error
+    if workers is None:
+        import multiprocessing
+        workers = multiprocessing.cpu_count()
+    workers = min(workers, len(paths))
+
+    if workers <= 1:
+        return _map_files_serial(func, paths, on_error)
+    return _map_files_parallel(func, paths, workers, ordered, chunk_size,
+                               on_error)
+
+
+def parse_corpus(paths, workers=None, ordered=True, chunk_size=500,
+                 on_error=None, **simplify_kwargs):
+    """
+    Parse and simplify corpus files from ``paths`` (a file name,
+    a directory or a list of them) using a pool of ``workers`` processes;
+    return an iterator over simplified sentences.
+
+    See ``map_files`` for the meaning of other arguments; extra keyword
+    arguments are passed to ``ruscorpora.simplify``.
+    """
+    func = functools.partial(_parse_file, **simplify_kwargs)
+    return map_files(func, paths, workers, ordered, chunk_size, on_error)
+
+
+def _parse_file(path, **simplify_kwargs):
+    return parse_simple(path, **simplify_kwargs)
+
+
+def _warn_error(path, exception):
+    warnings.warn("error processing %s: %r" % (path, exception))
+
+
+def _map_files_serial(func, paths, on_error):
+    for path in paths:
+        try:
+            for item in func(path):
+                yield item
+        except Exception as e:
+            on_error(path, e)
+
+
+# Messages sent from workers: (file index, items, exception, is_done)
+_queue = None
+# pid of the worker which processes each file (0 if it is not started)
+_started = None
+
+# seconds to wait for a message before checking that workers are alive
+_POLL_INTERVAL = 1.0
+
+
+def _init_worker(queue, started):
+    global _queue, _started
+    _queue = queue
+    _started = started
+
+
+def _process_file(func, index, path, chunk_size):
+    _started[index] = os.getpid()
+    chunk = []
+    try:
+        for item in func(path):
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                _queue.put((index, chunk, None, False))
+                chunk = []
+        if chunk:
+            _queue.put((index, chunk, None, False))
+    except Exception as e:
+        import pickle
+        # items produced before the error are kept, as in a serial run
+        if chunk:
+            _queue.put((index, chunk, None, False))
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(repr(e))
+        _queue.put((index, None, e, False))
+    _queue.put((index, None, None, True))
+
+
+def _map_files_parallel(func, paths, workers, ordered, chunk_size, on_error):
+    import multiprocessing
+    from queue import Empty
+
+    # bound the number of chunks in flight
+    queue = multiprocessing.Queue(maxsize=workers * 4)
+    started = multiprocessing.Array('i', len(paths), lock=False)
+    pool = multiprocessing.Pool(workers, _init_worker, (queue, started))
+
+    # Files are submitted to the pool when there are less than
+    # ``max_files`` files which are not returned yet. In ordered mode
+    # the output of files finished before the current one is kept
+    # in memory, so this also bounds the number of buffered files.
+    max_files = workers * 2
+    try:
+        results = {}           # file index -> AsyncResult of unfinished files
+        suspects = set()       # files whose worker is not found
+        submitted = 0
+        finished = 0
+        current = 0            # file which is returned now (if ordered)
+        pending = {}           # file index -> messages received early
+        lost = False
+
+        while finished < len(paths):
+            returned = current if ordered else finished
+            while submitted < len(paths) and submitted - returned < max_files:
+                results[submitted] = pool.apply_async(
+                    _process_file, (func, submitted, paths[submitted], chunk_size)
+                )
+                submitted += 1
+                if submitted == len(paths):
+                    pool.close()
+
+            try:
+                messages = [queue.get(timeout=_POLL_INTERVAL)]
+            except Empty:
+                messages = _lost_files(results, started, suspects)
+                lost = lost or bool(messages)
+
+            for message in messages:
+                index, items, error, done = message
+                if index not in results:
+                    continue  # the file is already reported as lost
+                if done:
+                    del results[index]
+                    finished += 1
+
+                if ordered and index != current:
+                    pending.setdefault(index, []).append(message)
+                    continue
+
+                if items:
+                    for item in items:
+                        yield item
+                if error is not None:
+                    on_error(paths[index], error)
+
+                if ordered and done:
+                    # return the files which were finished while waiting
+                    current += 1
+                    while current in pending:
+                        file_messages = pending.pop(current)
+                        for _index, items, error, done in file_messages:
+                            if items:
+                                for item in items:
+                                    yield item
+                            if error is not None:
+                                on_error(paths[current], error)
+                        if not done:
+                            break
+                        current += 1
+
+        if not lost:
+            # tasks of lost files are never completed, so the pool
+            # can't be joined then
+            pool.join()
+    finally:
+        pool.terminate()
+
+
+def _lost_files(results, started, suspects):
+    """
+    Return 'done' messages with errors for unfinished files whose task
+    failed or whose worker process died (e.g. it was killed).
+    """
+    import multiprocessing
+    alive = set(process.pid for process in multiprocessing.active_children())
+    messages = []
+    for index, result in sorted(results.items()):
+        if result.ready() and not result.successful():
+            try:
+                result.get()
+            except Exception as e:
+                messages.append((index, None, e, True))
+        elif started[index] and started[index] not in alive:
+            # the 'done' message may still be on its way; the worker
+            # is considered dead if it is not received until the next check
+            if index in suspects:
+                messages.append((index, None, RuntimeError(
+                    "worker process %d died" % started[index]), True))
+            suspects.add(index)
+    return messages
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Export of simplified sentences to line-oriented formats.
+
+Formats:
+
+* ``conllu`` - CoNLL-U; UPOS and FEATS are converted from ruscorpora
+  tags (see ``ruscorpora.tagset.to_ud``), XPOS is the original tag,
+  HEAD/DEPREL/DEPS are empty; ``joined`` is stored in MISC as
+  ``Joined=...``;
+* ``tsv`` - text, lemma, tag and joined columns, sentences are separated
+  by empty lines;
+* ``jsonl`` - a JSON list of [text, lemma, tag, joined] lists per line.
+
+Files are converted in worker processes; the output is written in large
+blocks, optionally gzipped and split into shards::
+
+    >>> export_corpus('corpus/', 'corpus.conllu.gz', workers=8)
+    >>> export_corpus('corpus/', 'out.jsonl', 'jsonl', shard_size=100 * 2 ** 20)
+
+The same is available from the command line (``python -m ruscorpora``).
+"""
+from __future__ import absolute_import, unicode_literals
+import io
+import os
+import sys
+import gzip
+import json
+import functools
+
+from .reader import parse_simple
+from .corpus import map_files
+from .tagset import get_converter
+
+
+def format_conllu(sent, sent_id=None):
+    """ Return CoNLL-U block for a simplified sentence (with string tags). """
+    to_ud = get_converter('ud')
+    lines = []
+    if sent_id is not None:
+        lines.append('# sent_id = %s\n' % sent_id)
+    for i, tok in enumerate(sent, 1):
+        gr = tok.gr
+        if gr is None:
+            upos, feats, xpos = 'X', '_', '_'
+        else:
+            xpos = str(gr)
+            upos, feats = to_ud(xpos)
+        lines.append('%d\t%s\t%s\t%s\t%s\t%s\t_\t_\t_\t%s\n' % (
+            i, _conllu_field(tok.text), _conllu_field(tok.lex), upos, xpos,
+            feats, 'Joined=%s' % tok.joined if tok.joined else '_'
+        ))
+    lines.append('\n')
+    return ''.join(lines)
+
+
+def format_tsv(sent, sent_id=None):
+    """ Return TSV block for a simplified sentence. """
+    lines = [
+        '%s\t%s\t%s\t%s\n' % (
+            _tsv_field(tok.text), _tsv_field(tok.lex),
+            '' if tok.gr is None else tok.gr, tok.joined or ''
+        )
+        for tok in sent
+    ]
+    lines.append('\n')
+    return ''.join(lines)
+
+
+def format_jsonl(sent, sent_id=None):
+    """ Return JSON line for a simplified sentence. """
+    return json.dumps([
+        [tok.text, tok.lex, None if tok.gr is None else str(tok.gr), tok.joined]
+        for tok in sent
+    ], ensure_ascii=False) + '\n'
+
+
+FORMATS = {
+    'conllu': format_conllu,
+    'tsv': format_tsv,
+    'jsonl': format_jsonl,
+}
+
+
+class ShardedWriter(object):
+    """
+    Buffered writer of text blocks to ``path``. The output is gzipped
+    if ``path`` ends with '.gz'. If ``shard_size`` is set, a new file is
+    started when the current one has at least ``shard_size`` bytes
+    (uncompressed); shard number is inserted before the extension:
+    ``out.conllu.gz`` -> ``out-00000.conllu.gz``. ``path`` can also be
+    a binary file object (sharding is not supported then).
+    """
+
+    def __init__(self, path, shard_size=None, buffer_size=1024 * 1024):
+        if shard_size is not None and not isinstance(path, str):
+            raise ValueError("shard_size requires an output path")
+        self.path = path
+        self.shard_size = shard_size
+        self.buffer_size = buffer_size
+        self.paths = []
+        self._fp = None
+        self._buffer = []
+        self._buffered = 0
+        self._written = 0
+
+    def write(self, block):
+        data = block.encode('utf8')
+        if self._fp is None:
+            self._open()
+        self._buffer.append(data)
+        self._buffered += len(data)
+        self._written += len(data)
+        if self._buffered >= self.buffer_size:
+            self._flush()
+        if self.shard_size is not None and self._written >= self.shard_size:
+            self._close_shard()
+
+    def close(self):
+        if self._fp is None and not self.paths:
+            self._open()  # an empty output file
+        self._close_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open(self):
+        path = self.path
+        if not isinstance(path, str):
+            self._fp, self._owned = path, False
+            return
+        if self.shard_size is not None:
+            path = _shard_path(path, len(self.paths))
+        self.paths.append(path)
+        if path.endswith('.gz'):
+            self._fp = gzip.open(path, 'wb')
+        else:
+            self._fp = io.open(path, 'wb')
+        self._owned = True
+
+    def _flush(self):
+        if self._buffer:
+            self._fp.write(b''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+    def _close_shard(self):
+        if self._fp is None:
+            return
+        self._flush()
+        if self._owned:
+            self._fp.close()
+        else:
+            self._fp.flush()
+        self._fp = None
+        self._written = 0
+
+
+def export_corpus(paths, output, fmt='conllu', workers=None, shard_size=None,
+                  **simplify_kwargs):
+    """
+    Convert corpus files from ``paths`` to ``fmt`` format (one of
+    ``FORMATS``) in ``workers`` processes and write the result to
+    ``output`` (see ShardedWriter). Sentences are written in file order.
+    Return a list of written files.
+    """
+    if fmt not in FORMATS:
+        raise ValueError("Unknown format: %s" % fmt)
+    func = functools.partial(_format_file, fmt, simplify_kwargs)
+    with ShardedWriter(output, shard_size) as writer:
+        for block in map_files(func, paths, workers):
+            writer.write(block)
+    return writer.paths
+
+
+def _format_file(fmt, simplify_kwargs, path):
+    format_sent = FORMATS[fmt]
+    simplify_kwargs = dict(simplify_kwargs, wrap_tags=False)
+    name = os.path.basename(path)
+    for i, sent in enumerate(parse_simple(path, **simplify_kwargs)):
+        yield format_sent(sent, '%s:%d' % (name, i))
+
+
+def _shard_path(path, number):
+    dirname, name = os.path.split(path)
+    base, dot, ext = name.partition('.')
+    return os.path.join(dirname, '%s-%05d%s%s' % (base, number, dot, ext))
+
+
+def _conllu_field(value):
+    value = (value or '').strip()
+    if not value:
+        return '_'
+    return value.replace('\t', ' ').replace('\n', ' ')
+
+
+def _tsv_field(value):
+    if value is None:
+        return ''
+    return value.replace('\t', ' ').replace('\n', ' ')
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='python -m ruscorpora',
+        description="Convert ruscorpora XML files to CoNLL-U, TSV or JSONL."
+    )
+    parser.add_argument('paths', nargs='+', help="XML files or directories")
+    parser.add_argument('-f', '--format', default='conllu', choices=sorted(FORMATS))
+    parser.add_argument('-o', '--output', help="output file (stdout if not set); "
+                        "output is gzipped if the name ends with .gz")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('--shard-size', type=int, default=None, metavar='BYTES',
+                        help="start a new output file after BYTES bytes")
+    parser.add_argument('--keep-accents', action='store_true')
+    parser.add_argument('--no-join', action='store_true',
+                        help="don't join split and hyphenated words")
+    args = parser.parse_args(argv)
+
+    if args.output is None:
+        if args.shard_size is not None:
+            parser.error("--shard-size requires --output")
+        output = getattr(sys.stdout, 'buffer', sys.stdout)
+    else:
+        output = args.output
+
+    simplify_kwargs = {}
+    if args.keep_accents:
+        simplify_kwargs['remove_accents'] = False
+    if args.no_join:
+        simplify_kwargs.update(join_split=False, join_hyphenated=False)
+
+    export_corpus(args.paths, output, args.format, args.workers,
+                  args.shard_size, **simplify_kwargs)
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Frequency and n-gram statistics over simplified sentences.
+
+Counts are computed in one pass; corpus files are counted in worker
+processes and partial counts are merged::
+
+    >>> stats = count_corpus('corpus/', workers=8)
+    >>> stats.tables['lex'].most_common(10)
+    >>> stats.save('freqs.tsv.gz')
+    >>> stats = FrequencyStats.load('freqs.tsv.gz')
+
+Tables (keys are strings or tuples of strings):
+
+* ``lex`` - lemma frequencies;
+* ``text`` - lowercased wordform frequencies;
+* ``text_lex`` - (lowercased wordform, lemma) pairs, i.e. wordform → lemma
+  distribution;
+* ``gr`` - tag frequencies (tags are stored as strings);
+* ``lex_2``, ``lex_3``, ``gr_2``, ``gr_3`` - lemma and tag bigrams and
+  trigrams within sentences.
+
+For memory-bounded counting either pass ``max_items`` (approximate
+counting: rare entries are pruned when a table grows too large)
+or use ``count_corpus_to_file`` which spills sorted partial counts
+to disk and merges them (exact counting).
+"""
+from __future__ import absolute_import, unicode_literals
+import os
+import io
+import re
+import gzip
+import heapq
+import shutil
+import tempfile
+import functools
+import itertools
+from collections import Counter
+
+from .reader import parse_simple
+from .corpus import map_files
+
+TABLES = ('lex', 'text', 'text_lex', 'gr', 'lex_2', 'lex_3', 'gr_2', 'gr_3')
+
+
+class FrequencyStats(object):
+    """ A set of frequency tables (``tables`` dict of Counter instances). """
+
+    def __init__(self, max_items=None):
+        self.max_items = max_items
+        self.tables = dict((name, Counter()) for name in TABLES)
+        self.pruned = 0  # max count of pruned entries (approximation error)
+
+    def update(self, sents):
+        """ Count tokens of simplified ``sents``. """
+        tables = self.tables
+        lex_table, text_table, text_lex_table, gr_table = [
+            tables[name] for name in ('lex', 'text', 'text_lex', 'gr')
+        ]
+        for sent in sents:
+            texts = [tok.text.lower() for tok in sent]
+            lexemes = [tok.lex for tok in sent]
+            tags = [str(tok.gr) if tok.gr is not None else None for tok in sent]
+
+            lex_table.update(lexemes)
+            text_table.update(texts)
+            text_lex_table.update(zip(texts, lexemes))
+            gr_table.update(tags)
+            for n in (2, 3):
+                tables['lex_%d' % n].update(_ngrams(lexemes, n))
+                tables['gr_%d' % n].update(_ngrams(tags, n))
+
+            if self.max_items is not None:
+                self._prune_tables()
+        return self
+
+    def merge(self, other):
+        """ Add counts from ``other`` FrequencyStats. """
+        for name in TABLES:
+            self.tables[name].update(other.tables[name])
+        self.pruned = max(self.pruned, other.pruned)
+        if self.max_items is not None:
+            self._prune_tables()
+        return self
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables.values())
+
+    def save(self, path):
+        """ Save tables to a gzipped TSV file; tabs and line breaks in keys are escaped. """
+        with _open_tsv(path, 'w') as f:
+            for line in _format_lines(self._sorted_items()):
+                f.write(line)
+
+    @classmethod
+    def load(cls, path):
+        stats = cls()
+        with _open_tsv(path, 'r') as f:
+            for name, key, count in _parse_lines(f):
+                stats.tables[name][key] = count
+        return stats
+
+    def _sorted_items(self):
+        """ Return an iterator over (name, key, count) sorted by name and key. """
+        for name in sorted(TABLES):
+            table = self.tables[name]
+            for key in sorted(table, key=_sort_key):
+                yield name, key, table[key]
+
+    def _prune_tables(self):
+        for table in self.tables.values():
+            if len(table) > self.max_items:
+                self.pruned = max(self.pruned, _prune(table, self.max_items // 2))
+
+
+def count_sentences(sents, max_items=None):
+    """ Return FrequencyStats for simplified sentences ``sents``. """
+    return FrequencyStats(max_items).update(sents)
+
+
+def count_corpus(paths, workers=None, max_items=None, **simplify_kwargs):
+    """
+    Count frequencies for corpus files from ``paths`` using ``workers``
+    processes; return FrequencyStats. If ``max_items`` is set, tables are
+    pruned to keep at most ``max_items`` entries (approximate counting).
+    """
+    result = FrequencyStats(max_items)
+    for stats in _count_files(paths, workers, max_items, simplify_kwargs):
+        result.merge(stats)
+    return result
+
+
+def count_corpus_to_file(paths, output, workers=None, max_items=1000000,
+                         tmp_dir=None, **simplify_kwargs):
+    """
+    Count frequencies for corpus files from ``paths`` exactly using bounded
+    memory and save them to ``output`` (see ``FrequencyStats.save``).
+    Merged partial counts are spilled to sorted files in ``tmp_dir``
+    when they have more than ``max_items`` entries.
+    """
+    spill_dir = tempfile.mkdtemp(dir=tmp_dir)
+    try:
+        runs = []
+        partial = FrequencyStats()
+
+        def spill():
+            path = os.path.join(spill_dir, '%05d.tsv.gz' % len(runs))
+            partial.save(path)
+            runs.append(path)
+
+        for stats in _count_files(paths, workers, None, simplify_kwargs):
+            partial.merge(stats)
+            if len(partial) > max_items:
+                spill()
+                partial = FrequencyStats()
+        if len(partial) or not runs:
+            spill()
+
+        files = [_open_tsv(path, 'r') for path in runs]
+        try:
+            merged = heapq.merge(*[_parse_lines(f, sort_keys=True) for f in files])
+            with _open_tsv(output, 'w') as out:
+                for line in _format_lines(_sum_counts(merged)):
+                    out.write(line)
+        finally:
+            for f in files:
+                f.close()
+    finally:
+        shutil.rmtree(spill_dir)
+
+
+def _count_file(max_items, simplify_kwargs, path):
+    return [count_sentences(parse_simple(path, **simplify_kwargs), max_items)]
+
+
+def _count_files(paths, workers, max_items, simplify_kwargs):
+    func = functools.partial(_count_file, max_items, simplify_kwargs)
+    return map_files(func, paths, workers, ordered=False)
+
+
+def _ngrams(items, n):
+    return zip(*[items[i:] for i in range(n)])
+
+
+def _prune(table, size):
+    """
+    Remove the least frequent entries from Counter ``table`` so that
+    at most ``size`` entries remain; return the max removed count.
+    """
+    threshold = sorted(table.values(), reverse=True)[size]
+    for key, count in list(table.items()):
+        if count <= threshold:
+            del table[key]
+    return threshold
+
+
+def _sort_key(key):
+    if not isinstance(key, tuple):
+        key = (key,)
+    return tuple('' if k is None else k for k in key)
+
+
+# ======== TSV format =========
+#
+# table name, count, key parts separated by tabs; None is written as
+# an empty field. Backslashes, tabs and line breaks in keys are escaped
+# as \\, \t, \n and \r.
+
+_ESCAPES = {'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'}
+_ESCAPE_TABLE = dict((ord(char), escaped) for char, escaped in _ESCAPES.items())
+_UNESCAPES = dict((escaped[1], char) for char, escaped in _ESCAPES.items())
+_ESCAPED = re.compile(r'\\(.)')
+
+
+def _open_tsv(path, mode):
+    return io.TextIOWrapper(gzip.open(path, mode + 'b'), encoding='utf8')
+
+
+def _format_lines(items):
+    for name, key, count in items:
+        parts = key if isinstance(key, tuple) else (key,)
+        yield "%s\t%d\t%s\n" % (name, count, "\t".join(
+            '' if part is None else part.translate(_ESCAPE_TABLE) for part in parts
+        ))
+
+
+def _parse_lines(f, sort_keys=False):
+    for line in f:
+        fields = line.rstrip('\n').split('\t')
+        name, count = fields[0], int(fields[1])
+        key = tuple(_unescape(part) if part else None for part in fields[2:])
+        if len(key) == 1:
+            key = key[0]
+        if sort_keys:
+            yield (name, _sort_key(key)), key, count
+        else:
+            yield name, key, count
+
+
+def _unescape(part):
+    if '\\' not in part:
+        return part
+    return _ESCAPED.sub(lambda match: _UNESCAPES[match.group(1)], part)
+
+
+def _sum_counts(merged):
+    for sort_key, group in itertools.groupby(merged, lambda item: item[0]):
+        group = list(group)
+        yield sort_key[0], group[0][1], sum(item[2] for item in group)
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental ingest: only new or changed sentences are returned.
+
+Files and sentences are fingerprinted by content hashes which are stored
+in a SQLite manifest; a refresh over an updated corpus parses only
+changed files and returns only sentences which were not seen before.
+Sentence counts are kept per file, so when a file is changed its old
+sentences are not counted again and removed ones are uncounted::
+
+    >>> with IncrementalIngest('manifest.sqlite') as ingest:
+    ...     for path, index, sent in ingest.ingest('corpus/'):
+    ...         process(sent)
+    ...     print(ingest.counts)
+    ...     print(ingest.duplicates()[:10])
+
+A file is skipped without reading if its size and mtime are not changed,
+and without parsing if its content hash is known (sentences of a copy
+of another file are counted as duplicates). Sentence hashes are
+computed from parsed tokens, so they don't depend on XML formatting
+and simplify options.
+"""
+from __future__ import absolute_import, unicode_literals
+import hashlib
+import sqlite3
+
+from .reader import parse_xml, simplify
+from .corpus import iter_files, source_stat
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER,
+    digest TEXT
+);
+CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+CREATE TABLE IF NOT EXISTS sentences (
+    digest TEXT PRIMARY KEY,
+    path TEXT,
+    position INTEGER,
+    count INTEGER
+);
+CREATE TABLE IF NOT EXISTS file_sentences (
+    path TEXT,
+    digest TEXT,
+    position INTEGER,
+    count INTEGER,
+    PRIMARY KEY (path, digest)
+);
+CREATE INDEX IF NOT EXISTS file_sentences_digest ON file_sentences (digest);
+"""
+
+
+class IncrementalIngest(object):
+    """
+    Incremental ingest with a manifest stored in ``db_path`` SQLite file.
+    ``counts`` dict has statistics of the last ``ingest`` call.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(_SCHEMA)
+        self.counts = {}
+
+    def ingest(self, paths, **simplify_kwargs):
+        """
+        Return an iterator over (path, sentence number, sentence) for
+        new sentences from corpus files ``paths``; sentences are simplified
+        using ``simplify_kwargs`` (see ``ruscorpora.simplify``).
+
+        The manifest is updated after each file is processed completely,
+        so an interrupted ingest can be restarted.
+        """
+        self.counts = dict.fromkeys([
+            'files_unchanged', 'files_duplicate', 'files_parsed',
+            'sentences_new', 'sentences_duplicate'
+        ], 0)
+
+        for path in iter_files(paths):
+            path, mtime, size = source_stat(path)
+            row = self.conn.execute(
+                "SELECT mtime, size, digest FROM files WHERE path=?", (path,)
+            ).fetchone()
+            if row is not None and tuple(row[:2]) == (mtime, size):
+                self.counts['files_unchanged'] += 1
+                continue
+
+            digest = file_digest(path)
+            if row is not None and row[2] == digest:
+                # the file was touched, but its content is the same
+                self.counts['files_unchanged'] += 1
+                self._save_file(path, mtime, size, digest)
+                self.conn.commit()
+                continue
+
+            known = self.conn.execute(
+                "SELECT path FROM files WHERE digest=? AND path!=? LIMIT 1",
+                (digest, path)
+            ).fetchone()
+            if known is not None:
+                # the same content was ingested before under another name
+                self.counts['files_duplicate'] += 1
+                self._copy_file_sentences(known[0], path)
+                self._save_file(path, mtime, size, digest)
+                self.conn.commit()
+                continue
+
+            self.counts['files_parsed'] += 1
+            try:
+                for index, sent in self._ingest_file(path, simplify_kwargs):
+                    yield path, index, sent
+            except BaseException:
+                # sentences of a partially processed file are not saved
+                self.conn.rollback()
+                raise
+            self._save_file(path, mtime, size, digest)
+            self.conn.commit()
+
+    def duplicates(self, min_count=2):
+        """
+        Return a list of (sentence hash, path, sentence number, count)
+        for sentences seen at least ``min_count`` times, most frequent
+        first; path and sentence number are of the first occurrence.
+        """
+        return [tuple(row) for row in self.conn.execute(
+            "SELECT digest, path, position, count FROM sentences "
+            "WHERE count >= ? ORDER BY count DESC, path, position", (min_count,)
+        )]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _ingest_file(self, path, simplify_kwargs):
+        new = []  # numbers of new sentences
+        raw_sents = self._new_sentences(path, new)
+        for i, sent in enumerate(simplify(raw_sents, **simplify_kwargs)):
+            yield new[i], sent
+
+    def _new_sentences(self, path, new):
+        conn = self.conn
+        # sentences the file had when it was ingested before
+        old_counts = self._file_sentences(path)
+        file_counts = {}
+        positions = {}  # the first position of each sentence in the file
+        for position, sent in enumerate(parse_xml(path)):
+            digest = sentence_digest(sent)
+            occurrence = file_counts[digest] = file_counts.get(digest, 0) + 1
+            if occurrence == 1:
+                positions[digest] = position
+            if occurrence <= old_counts.get(digest, 0):
+                # the sentence is already counted for this file
+                continue
+
+            updated = conn.execute(
+                "UPDATE sentences SET count=count+1 WHERE digest=?", (digest,)
+            ).rowcount
+            if updated:
+                self.counts['sentences_duplicate'] += 1
+                continue
+            conn.execute(
+                "INSERT INTO sentences (digest, path, position, count) "
+                "VALUES (?, ?, ?, 1)", (digest, path, position)
+            )
+            self.counts['sentences_new'] += 1
+            new.append(position)
+            yield sent
+        self._save_file_sentences(path, file_counts, positions, old_counts)
+
+    def _file_sentences(self, path):
+        return dict(self.conn.execute(
+            "SELECT digest, count FROM file_sentences WHERE path=?", (path,)
+        ))
+
+    def _copy_file_sentences(self, source, path):
+        """
+        Count sentences of file ``path`` which has the same content
+        as file ``source``.
+        """
+        file_counts = {}
+        positions = {}
+        for digest, position, count in self.conn.execute(
+                "SELECT digest, position, count FROM file_sentences WHERE path=?",
+                (source,)):
+            file_counts[digest] = count
+            positions[digest] = position
+
+        old_counts = self._file_sentences(path)
+        for digest, count in file_counts.items():
+            added = count - old_counts.get(digest, 0)
+            if added > 0:
+                self.conn.execute(
+                    "UPDATE sentences SET count=count+? WHERE digest=?",
+                    (added, digest)
+                )
+                self.counts['sentences_duplicate'] += added
+        self._save_file_sentences(path, file_counts, positions, old_counts)
+
+    def _save_file_sentences(self, path, file_counts, positions, old_counts=None):
+        """
+        Save sentence counts and positions of file ``path``; sentences
+        removed from the file are uncounted.
+        """
+        conn = self.conn
+        if old_counts is None:
+            old_counts = self._file_sentences(path)
+        conn.execute("DELETE FROM file_sentences WHERE path=?", (path,))
+        conn.executemany(
+            "INSERT INTO file_sentences (path, digest, position, count) "
+            "VALUES (?, ?, ?, ?)",
+            [(path, digest, positions[digest], count)
+             for digest, count in file_counts.items()]
+        )
+
+        for digest, count in old_counts.items():
+            removed = count - file_counts.get(digest, 0)
+            if removed > 0:
+                conn.execute(
+                    "UPDATE sentences SET count=count-? WHERE digest=?",
+                    (removed, digest)
+                )
+            if digest not in file_counts:
+                # the first occurrence moves to another file
+                conn.execute(
+                    "UPDATE sentences SET (path, position) = ("
+                    "SELECT path, position FROM file_sentences WHERE digest=? "
+                    "ORDER BY path LIMIT 1) WHERE digest=? AND path=?",
+                    (digest, digest, path)
+                )
+        conn.execute("DELETE FROM sentences WHERE count <= 0")
+        conn.executemany(
+            "UPDATE sentences SET position=? WHERE digest=? AND path=?",
+            [(position, digest, path) for digest, position in positions.items()]
+        )
+
+    def _save_file(self, path, mtime, size, digest):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, mtime, size, digest) "
+            "VALUES (?, ?, ?, ?)", (path, mtime, size, digest)
+        )
+
+
+def file_digest(path, block_size=1024 * 1024):
+    """ Return SHA-1 hex digest of file ``path`` content. """
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+def sentence_digest(sent):
+    """ Return SHA-1 hex digest of a sentence (a list of Token instances). """
+    parts = []
+    for tok in sent:
+        parts.append(tok.text)
+        for ann in tok.annotations or ():
+            parts.extend('' if value is None else value for value in ann)
+        parts.append('\x1e')
+    return hashlib.sha1('\x1f'.join(parts).encode('utf8')).hexdigest()
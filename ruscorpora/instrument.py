@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation of the reader pipeline.
+
+Pass a ``PipelineStats`` instance as ``stats`` argument to
+``ruscorpora.parse_xml``, ``ruscorpora.simplify`` or
+``ruscorpora.parse_simple``::
+
+    >>> stats = PipelineStats()
+    >>> for sent in rnc.parse_simple('fiction.xml', stats=stats):
+    ...     pass
+    >>> stats.as_dict()
+
+Stages (cumulative time in seconds and number of sentences):
+
+* ``parse`` - XML parsing in ``parse_xml`` (including file reading);
+* ``input`` - waiting for input sentences in ``simplify``
+  (it includes ``parse`` when ``simplify`` consumes ``parse_xml`` output);
+* ``simplify`` - token joining and token creation in ``simplify``;
+* ``tags`` - Tag wrapping in ``simplify``;
+* ``consumer`` - time between ``simplify`` yielding a sentence and
+  asking for the next one, i.e. time spent in downstream code.
+
+When ``stats`` is not passed the uninstrumented code path is used.
+"""
+from __future__ import absolute_import, unicode_literals
+from time import perf_counter as timer
+
+from .tagset import Tag
+
+
+class PipelineStats(object):
+    """
+    Cumulative timings and counts of the reader pipeline.
+
+    If ``callback`` is given, it is called with ``as_dict()`` result
+    every ``interval`` sentences (if ``interval`` is set) and when
+    a stream is exhausted.
+    """
+    STAGES = ('parse', 'input', 'simplify', 'tags', 'consumer')
+
+    def __init__(self, callback=None, interval=None):
+        self.callback = callback
+        self.interval = interval
+        self.reset()
+
+    def reset(self):
+        self.times = dict((stage, 0.0) for stage in self.STAGES)
+        self.calls = dict((stage, 0) for stage in self.STAGES)
+        self.counts = {
+            'bytes_read': 0,
+            'sentences_parsed': 0,
+            'tokens_parsed': 0,
+            'sentences': 0,
+            'tokens': 0,
+            'tag_cache_hits': 0,
+            'tag_cache_misses': 0,
+            'unconsumed_tokens_warnings': 0,
+        }
+
+    def add_time(self, stage, seconds, calls=1):
+        self.times[stage] += seconds
+        self.calls[stage] += calls
+
+    def as_dict(self):
+        return {
+            'stages': dict(
+                (stage, {'seconds': self.times[stage], 'calls': self.calls[stage]})
+                for stage in self.STAGES
+            ),
+            'counts': dict(self.counts),
+        }
+
+    def report(self):
+        if self.callback is not None:
+            self.callback(self.as_dict())
+
+    def __repr__(self):
+        return "PipelineStats(%r)" % self.as_dict()
+
+
+class _CountingReader(object):
+    """ File wrapper which counts bytes read. """
+    def __init__(self, fp, counts):
+        self._fp = fp
+        self._counts = counts
+
+    def read(self, size=-1):
+        data = self._fp.read(size)
+        self._counts['bytes_read'] += len(data)
+        return data
+
+
+def instrumented_parse(parse, source, stats):
+    """ Instrumented version of ``parse(source)`` iterator. """
+    if isinstance(source, str):
+        with open(source, 'rb') as fp:
+            for sent in _timed_parse(parse, fp, stats):
+                yield sent
+    else:
+        for sent in _timed_parse(parse, source, stats):
+            yield sent
+
+
+def _timed_parse(parse, fp, stats):
+    counts = stats.counts
+    sents = parse(_CountingReader(fp, counts))
+    while True:
+        start = timer()
+        try:
+            sent = next(sents)
+        except StopIteration:
+            stats.add_time('parse', timer() - start, 0)
+            return
+        stats.add_time('parse', timer() - start)
+        counts['sentences_parsed'] += 1
+        counts['tokens_parsed'] += len(sent)
+        yield sent
+
+
+def instrumented_simplify(simplify, sents, stats, make_tag, warn, **options):
+    """
+    Instrumented version of ``simplify(sents, make_tag=..., warn=..., **options)``
+    iterator.
+    """
+    state = {'input': 0.0, 'tags': 0.0}
+    counts = stats.counts
+
+    def timed_sents():
+        sents_iter = iter(sents)
+        while True:
+            start = timer()
+            try:
+                sent = next(sents_iter)
+            except StopIteration:
+                state['input'] += timer() - start
+                return
+            state['input'] += timer() - start
+            yield sent
+
+    def timed_make_tag(gr):
+        start = timer()
+        tag = make_tag(gr)
+        state['tags'] += timer() - start
+        return tag
+
+    def counting_warn(message):
+        counts['unconsumed_tokens_warnings'] += 1
+        warn(message)
+
+    def update_cache_counts():
+        info = Tag.cache_info()
+        counts['tag_cache_hits'] += info.hits - cache_info[0].hits
+        counts['tag_cache_misses'] += info.misses - cache_info[0].misses
+        cache_info[0] = info
+
+    cache_info = [Tag.cache_info()]
+    result = simplify(timed_sents(), make_tag=timed_make_tag,
+                      warn=counting_warn, **options)
+    while True:
+        state['input'] = state['tags'] = 0.0
+        start = timer()
+        try:
+            sent = next(result)
+        except StopIteration:
+            elapsed = timer() - start
+            stats.add_time('input', state['input'], 0)
+            stats.add_time('simplify', elapsed - state['input'], 0)
+            update_cache_counts()
+            stats.report()
+            return
+
+        elapsed = timer() - start
+        stats.add_time('input', state['input'])
+        stats.add_time('tags', state['tags'])
+        stats.add_time('simplify', elapsed - state['input'] - state['tags'])
+        counts['sentences'] += 1
+        counts['tokens'] += len(sent)
+        update_cache_counts()
+        if stats.interval and counts['sentences'] % stats.interval == 0:
+            stats.report()
+
+        start = timer()
+        yield sent
+        stats.add_time('consumer', timer() - start)
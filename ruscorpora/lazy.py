@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy sentences with compact token storage.
+
+``parse_xml_lazy`` yields LazySentence instances instead of Token lists.
+A sentence keeps token texts in a list and annotation attributes of each
+word in a flat tuple of strings; the parsed ``<se>`` element is not kept.
+Token and Annotation instances are created only when they are accessed,
+so jobs which only need wordforms or tags don't pay for the rest, and
+retained sentences take less memory than ``parse_xml`` results::
+
+    >>> for sent in parse_xml_lazy('fiction.xml'):
+    ...     print(sent.texts(), sent.tags())
+
+LazySentence behaves like a list of Token instances: it can be indexed,
+iterated and passed to ``ruscorpora.simplify``; LazyToken unpacks and
+compares like a ``(text, annotations)`` tuple. ``simplify`` only creates
+the last annotation of each word.
+"""
+from __future__ import absolute_import, unicode_literals
+
+from .reader import Token, Annotation, _iter_sentence_elements
+
+
+def parse_xml_lazy(source):
+    """
+    Parse XML file ``source``; return an iterator over LazySentence
+    instances. Tokens are the same as ``ruscorpora.parse_xml`` tokens.
+    """
+    for se in _iter_sentence_elements(source):
+        yield LazySentence(*_sentence_data(se))
+
+
+class LazySentence(object):
+    """
+    A sentence stored as a list of token texts and a list of annotation
+    attributes: None for punctuation and a flat ``(lex, gr, joined, ...)``
+    tuple for words.
+    """
+    __slots__ = ('_texts', '_anas')
+
+    def __init__(self, texts, anas):
+        self._texts = texts
+        self._anas = anas
+
+    def texts(self):
+        """ Return a list of token texts. """
+        return list(self._texts)
+
+    def lexemes(self):
+        """ Return a list of lemmas (of the last annotation; None for punctuation). """
+        return [None if anas is None else anas[-3] for anas in self._anas]
+
+    def tags(self):
+        """ Return a list of tag strings (of the last annotation; None for punctuation). """
+        return [None if anas is None else anas[-2] for anas in self._anas]
+
+    def materialize(self):
+        """ Return a list of Token instances (the same as ``parse_xml`` result). """
+        return [
+            Token(text, None if anas is None else list(_iter_annotations(anas)))
+            for text, anas in zip(self._texts, self._anas)
+        ]
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [LazyToken(text, anas) for text, anas
+                    in zip(self._texts[index], self._anas[index])]
+        return LazyToken(self._texts[index], self._anas[index])
+
+    def __iter__(self):
+        for text, anas in zip(self._texts, self._anas):
+            yield LazyToken(text, anas)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "LazySentence(%r)" % self._texts
+
+
+class LazyToken(object):
+    """
+    A token compatible with ``Token(text, annotations)``; ``annotations``
+    is None for punctuation and a LazyAnnotations instance for words.
+    ``lex``, ``gr`` and ``joined`` are attributes of the last annotation.
+    """
+    __slots__ = ('text', 'annotations', '_anas')
+
+    def __init__(self, text, anas):
+        self.text = text
+        self.annotations = None if anas is None else LazyAnnotations(anas)
+        self._anas = anas
+
+    @property
+    def lex(self):
+        return None if self._anas is None else self._anas[-3]
+
+    @property
+    def gr(self):
+        return None if self._anas is None else self._anas[-2]
+
+    @property
+    def joined(self):
+        return None if self._anas is None else self._anas[-1]
+
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, index):
+        return (self.text, self.annotations)[index]
+
+    def __iter__(self):
+        yield self.text
+        yield self.annotations
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.text)
+
+    def __repr__(self):
+        return "LazyToken(text=%r, annotations=%r)" % tuple(self)
+
+
+class LazyAnnotations(object):
+    """ A list of Annotation instances created on access. """
+    __slots__ = ('_anas',)
+
+    def __init__(self, anas):
+        self._anas = anas
+
+    def __len__(self):
+        return len(self._anas) // 3
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        if index == -1:
+            # the annotation used by simplify
+            return Annotation(*self._anas[-3:])
+        i = range(len(self))[index] * 3
+        return Annotation(*self._anas[i:i + 3])
+
+    def __iter__(self):
+        return _iter_annotations(self._anas)
+
+    def __eq__(self, other):
+        return other is not None and list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def _sentence_data(se):
+    """
+    Return (texts, anas) lists for the same tokens as
+    ``ruscorpora.reader._sentence_tokens``.
+    """
+    texts = []
+    anas = []
+
+    txt = se.text
+    if txt and not txt.isspace():
+        _add_punct(txt, texts, anas)
+
+    for w in se.iterfind('w'):
+        ana_elems = w.findall('ana')
+
+        # text after the last annotation is a word
+        word = ana_elems[-1].tail
+        if word and not word.isspace():
+            texts.append(word)
+            if len(ana_elems) == 1:
+                a = ana_elems[0]
+                anas.append((a.get('lex'), a.get('gr'), a.get('joined')))
+            else:
+                attrs = []
+                for a in ana_elems:
+                    attrs.extend((a.get('lex'), a.get('gr'), a.get('joined')))
+                anas.append(tuple(attrs))
+
+        txt = w.tail
+        if txt and not txt.isspace():
+            _add_punct(txt, texts, anas)
+
+    txt = se.tail
+    if txt and not txt.isspace():
+        _add_punct(txt, texts, anas)
+    return texts, anas
+
+
+def _add_punct(txt, texts, anas):
+    for tok in txt.split('\n'):
+        if tok and not tok.isspace():
+            texts.append(tok)
+            anas.append(None)
+
+
+def _iter_annotations(anas):
+    for i in range(0, len(anas), 3):
+        yield Annotation(anas[i], anas[i + 1], anas[i + 2])
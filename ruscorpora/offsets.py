@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Random access to corpus sentences.
+
+Byte offsets of ``<se>`` elements are recorded in a sidecar index file,
+so a sentence can be read by seeking to it and parsing only its XML.
+"""
+from __future__ import absolute_import, unicode_literals
+import sys
+import json
+import array
+import bisect
+import random
+from xml.parsers import expat
+
+from .reader import ElementTree, parse_xml, simplify, _sentence_tokens
+from .corpus import iter_files, source_stat
+from .sources import is_compressed
+
+INDEX_MAGIC = b'RNCSENTS'
+
+
+class SentenceIndex(object):
+    """
+    Offsets of sentences in a single corpus file. Sentence ``i`` occupies
+    ``starts[i]:ends[i]`` bytes; the range includes the text after
+    the ``</se>`` tag.
+    """
+
+    def __init__(self, path, encoding, starts, ends):
+        self.path = path
+        self.encoding = encoding
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def read(self, fp, index):
+        """ Return raw XML of sentence ``index`` from file object ``fp``. """
+        fp.seek(self.starts[index])
+        return fp.read(self.ends[index] - self.starts[index])
+
+    def parse(self, fp, index):
+        """
+        Parse sentence ``index`` from file object ``fp``; return a list
+        of Token instances (the same as ``ruscorpora.parse_xml`` returns).
+        """
+        return parse_sentence_xml(self.read(fp, index), self.encoding)
+
+    def save(self, index_path):
+        header = {
+            'byteorder': sys.byteorder,
+            'source': source_stat(self.path),
+            'encoding': self.encoding,
+            'size': len(self),
+        }
+        with open(index_path, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            f.write(json.dumps(header).encode('utf8') + b'\n')
+            f.write(self.starts.tobytes())
+            f.write(self.ends.tobytes())
+
+    @classmethod
+    def load(cls, index_path, path):
+        """
+        Load index of ``path`` from ``index_path``; raise ValueError
+        if the index is outdated or invalid.
+        """
+        with open(index_path, 'rb') as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError("%s is not a sentence index" % index_path)
+            header = json.loads(f.readline().decode('utf8'))
+            if header['byteorder'] != sys.byteorder:
+                raise ValueError("%s has a different byte order" % index_path)
+            if header['source'] != source_stat(path):
+                raise ValueError("%s is outdated" % index_path)
+
+            starts = array.array(str('Q'))
+            ends = array.array(str('Q'))
+            starts.fromfile(f, header['size'])
+            ends.fromfile(f, header['size'])
+        return cls(path, header['encoding'], starts, ends)
+
+
+def parse_sentence_xml(data, encoding='utf-8'):
+    """
+    Parse raw XML of a single ``<se>`` element (with the text after it)
+    in ``encoding``; return a list of Token instances.
+    """
+    xml = (
+        ('<?xml version="1.0" encoding="%s"?><root>' % encoding).encode('ascii') +
+        data +
+        b'</root>'
+    )
+    root = ElementTree.fromstring(xml)
+    return _sentence_tokens(root[0])
+
+
+def build_offset_index(path):
+    """
+    Scan corpus file ``path`` and return SentenceIndex for it. Only
+    ``<se>`` elements which are children of the root element are indexed
+    (the same sentences ``ruscorpora.parse_xml`` returns). Compressed
+    files are not supported.
+    """
+    if is_compressed(path):
+        raise ValueError("Random access is not supported for compressed file %s" % path)
+    starts = array.array(str('Q'))
+    ends = array.array(str('Q'))
+    state = {'depth': 0, 'encoding': 'utf-8', 'in_tail': False}
+
+    parser = expat.ParserCreate()
+
+    def finish_tail():
+        # text after </se> ends at the next tag
+        if state['in_tail']:
+            ends.append(parser.CurrentByteIndex)
+            state['in_tail'] = False
+
+    def xml_decl(version, encoding, standalone):
+        if encoding:
+            state['encoding'] = encoding
+
+    def start(name, attrs):
+        finish_tail()
+        state['depth'] += 1
+        if state['depth'] == 2 and name == 'se':
+            starts.append(parser.CurrentByteIndex)
+
+    def end(name):
+        finish_tail()
+        state['depth'] -= 1
+        if state['depth'] == 1 and name == 'se':
+            state['in_tail'] = True
+
+    parser.XmlDeclHandler = xml_decl
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+
+    with open(path, 'rb') as f:
+        parser.ParseFile(f)
+    return SentenceIndex(path, state['encoding'], starts, ends)
+
+
+def load_offset_index(path, index_path=None):
+    """
+    Return SentenceIndex for corpus file ``path``. The index is loaded
+    from ``index_path`` (``path + '.sents'`` by default) or built and
+    saved there if it is missing or outdated.
+    """
+    if index_path is None:
+        index_path = path + '.sents'
+    try:
+        return SentenceIndex.load(index_path, path)
+    except (IOError, OSError, ValueError):
+        index = build_offset_index(path)
+        index.save(index_path)
+        return index
+
+
+class Corpus(object):
+    """
+    Random-access corpus over XML files from ``paths`` (a file name,
+    a directory or a list of them)::
+
+        >>> corpus = Corpus('corpus/')
+        >>> len(corpus)
+        >>> corpus[10]
+        >>> corpus[10:20]
+        >>> corpus.sample(5)
+
+    Sentences are simplified using ``simplify_kwargs``
+    (see ``ruscorpora.simplify``); pass ``raw=True`` to get sentences
+    in ``ruscorpora.parse_xml`` format. Sentence indices are stored
+    in sidecar files (see ``load_offset_index``); iteration reads files
+    sequentially and doesn't use them.
+    """
+
+    def __init__(self, paths, raw=False, **simplify_kwargs):
+        self.indices = [
+            load_offset_index(path) for path in iter_files(paths, ('.xml',))
+        ]
+        self.raw = raw
+        self.simplify_kwargs = simplify_kwargs
+
+        self._cumulative = []  # number of sentences before each file
+        total = 0
+        for index in self.indices:
+            self._cumulative.append(total)
+            total += len(index)
+        self._size = total
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self._get_many(range(*item.indices(len(self))))
+
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("sentence index out of range")
+        return self._get_many([item])[0]
+
+    def __iter__(self):
+        # files are read sequentially, without seeking to each sentence
+        for index in self.indices:
+            sents = parse_xml(index.path)
+            if not self.raw:
+                sents = simplify(sents, **self.simplify_kwargs)
+            for sent in sents:
+                yield sent
+
+    def sample(self, k, seed=None):
+        """ Return ``k`` random sentences. """
+        rng = random.Random(seed)
+        return self._get_many(rng.sample(range(len(self)), k))
+
+    def _get_many(self, positions):
+        # read sentences file by file, in file order
+        raw_sents = {}
+        for file_no, pos_list in self._group_by_file(positions):
+            index = self.indices[file_no]
+            offset = self._cumulative[file_no]
+            with open(index.path, 'rb') as fp:
+                for pos in sorted(pos_list):
+                    raw_sents[pos] = index.parse(fp, pos - offset)
+
+        sents = [raw_sents[pos] for pos in positions]
+        if self.raw:
+            return sents
+        return list(simplify(sents, **self.simplify_kwargs))
+
+    def _group_by_file(self, positions):
+        groups = {}
+        for pos in positions:
+            file_no = bisect.bisect_right(self._cumulative, pos) - 1
+            groups.setdefault(file_no, []).append(pos)
+        return sorted(groups.items())
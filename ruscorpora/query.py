@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+Token queries over grammemes, lemmas and wordforms.
+
+A query is compiled once and then matched against FlatToken instances::
+
+    >>> query = compile_query('S,gen,pl')
+    >>> query = compile_query('V & pf & !partcp')
+    >>> query = compile_query('(A | A-PRO), case=ins, lex=/^сам/')
+    >>> for sent, positions in query.find(rnc.parse_simple('fiction.xml')):
+    ...     print([sent[i].text for i in positions])
+
+Syntax:
+
+* ``gen`` - token tag contains a grammeme;
+* ``POS=S`` - token POS (the first grammeme of the tag) is ``S``;
+* ``case=gen`` - token has ``gen`` value of ``case`` category
+  (category names are Tag attribute names);
+* ``lex=школа``, ``lex="школа"``, ``lex=/^шк/`` - lemma is equal to
+  a string or matches a regular expression (``/.../i`` for case-insensitive
+  match);
+* ``text=...`` - the same for wordforms;
+* ``,`` or ``&`` or ``and`` - AND; ``|`` or ``or`` - OR;
+  ``!`` or ``not`` - NOT; parentheses for grouping.
+
+Grammemes and category values are validated when a query is compiled.
+Results of grammeme checks are cached per distinct tag.
+"""
+from __future__ import absolute_import, unicode_literals
+import re
+
+from .tagset import Tag, ALLOWED_GRAMMEMES, GRAMMEME_BITS, CATEGORIES
+
+_TOKEN_RE = re.compile(r'''
+    \s*(?:
+        (?P<regex>/(?:[^/\\]|\\.)*/i?) |
+        (?P<string>"(?:[^"\\]|\\.)*") |
+        (?P<op>[(),&|!=]) |
+        (?P<word>[^\s(),&|!=/"]+)
+    )\s*
+''', re.VERBOSE | re.UNICODE)
+
+_KEYWORDS = {'and': '&', 'or': '|', 'not': '!', ',': '&'}
+
+_CATEGORIES = dict(CATEGORIES)
+
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+def compile_query(expression):
+    """ Compile query ``expression``; return a Query instance. """
+    return Query(expression)
+
+
+class Query(object):
+    """ Compiled token query. """
+
+    def __init__(self, expression):
+        self.expression = expression
+        node = _Parser(expression).parse()
+        self._match = node.token_func()
+
+    def __repr__(self):
+        return "Query(%r)" % self.expression
+
+    def match(self, token):
+        """ Return True if FlatToken ``token`` matches the query. """
+        return self._match(token.text, token.lex, token.gr)
+
+    __call__ = match
+
+    def filter(self, tokens):
+        """ Return an iterator over matching tokens. """
+        match = self._match
+        for tok in tokens:
+            if match(tok.text, tok.lex, tok.gr):
+                yield tok
+
+    def find(self, sents):
+        """
+        Return an iterator over (sentence, positions) pairs for simplified
+        sentences with matching tokens.
+        """
+        match = self._match
+        for sent in sents:
+            positions = [
+                i for i, tok in enumerate(sent)
+                if match(tok.text, tok.lex, tok.gr)
+            ]
+            if positions:
+                yield sent, positions
+
+    def count(self, sents):
+        """ Return the number of matching tokens in ``sents``. """
+        return sum(len(positions) for sent, positions in self.find(sents))
+
+    def find_compiled(self, corpus):
+        """
+        Return an iterator over (sentence index, positions) pairs for
+        ``ruscorpora.CompiledCorpus`` sentences with matching tokens.
+        Strings and tags are decoded once per distinct id.
+        """
+        match = self._match
+        texts, lexemes, tag = corpus.texts, corpus.lexemes, corpus._tag
+        results = {}  # (text id, lex id, gr id) -> bool
+
+        for index in range(len(corpus)):
+            ids = corpus.sentence_ids(index).tolist()
+            positions = []
+            for pos, i in enumerate(range(0, len(ids), 4)):
+                key = (ids[i], ids[i + 1], ids[i + 2])
+                try:
+                    matched = results[key]
+                except KeyError:
+                    matched = results[key] = match(
+                        texts[key[0]], lexemes[key[1]], tag(key[2])
+                    )
+                if matched:
+                    positions.append(pos)
+            if positions:
+                yield index, positions
+
+
+# ======== Query tree =========
+
+class _Node(object):
+    tag_only = False
+
+    def token_func(self):
+        """ Return f(text, lex, gr) -> bool function. """
+        raise NotImplementedError()
+
+
+class _TagNode(_Node):
+    """ Node which only depends on the tag. """
+    tag_only = True
+
+    def tag_func(self):
+        """ Return f(mask, pos) -> bool function. """
+        raise NotImplementedError()
+
+    def token_func(self):
+        return _cached_tag_match(self.tag_func())
+
+
+def _cached_tag_match(tag_func):
+    """ Convert f(mask, pos) to f(text, lex, gr) with results cached per tag. """
+    cache = {}
+
+    def match(text, lex, gr):
+        try:
+            return cache[gr]
+        except KeyError:
+            if gr is None:
+                result = False
+            else:
+                tag = gr if isinstance(gr, Tag) else Tag.from_string(gr)
+                result = tag_func(tag._mask, tag._pos)
+            cache[gr] = result
+            return result
+    return match
+
+
+class _Grammeme(_TagNode):
+    def __init__(self, grammeme):
+        self.bit = GRAMMEME_BITS[grammeme]
+
+    def tag_func(self):
+        bit = self.bit
+        return lambda mask, pos: bool(mask & bit)
+
+
+class _POS(_TagNode):
+    def __init__(self, pos):
+        self.pos = pos
+
+    def tag_func(self):
+        value = self.pos
+        return lambda mask, pos: pos == value
+
+
+class _Field(_Node):
+    """ lex/text check """
+    def __init__(self, field, value, regex):
+        self.field = field
+        self.value = value
+        self.regex = regex
+
+    def token_func(self):
+        value = self.value
+        if self.regex is None:
+            if self.field == 'lex':
+                return lambda text, lex, gr: lex == value
+            return lambda text, lex, gr: text == value
+
+        search = self.regex.search
+        cache = {}
+
+        def matches(string):
+            try:
+                return cache[string]
+            except KeyError:
+                result = cache[string] = string is not None and search(string) is not None
+                return result
+
+        if self.field == 'lex':
+            return lambda text, lex, gr: matches(lex)
+        return lambda text, lex, gr: matches(text)
+
+
+class _Not(_Node):
+    def __init__(self, child):
+        self.child = child
+        self.tag_only = child.tag_only
+
+    def tag_func(self):
+        func = self.child.tag_func()
+        return lambda mask, pos: not func(mask, pos)
+
+    def token_func(self):
+        if self.tag_only:
+            return _cached_tag_match(self.tag_func())
+        func = self.child.token_func()
+        return lambda text, lex, gr: not func(text, lex, gr)
+
+
+class _BoolOp(_Node):
+    def __init__(self, children):
+        self.children = children
+        self.tag_only = all(child.tag_only for child in children)
+
+    def tag_func(self):
+        funcs = [child.tag_func() for child in self.children]
+        return self.combine_tag_funcs(funcs)
+
+    def token_func(self):
+        if self.tag_only:
+            return _cached_tag_match(self.tag_func())
+
+        # tag-only children are combined and cached together
+        tag_children = [child for child in self.children if child.tag_only]
+        other = [child for child in self.children if not child.tag_only]
+        if len(tag_children) > 1:
+            other.insert(0, type(self)(tag_children))
+        else:
+            other = tag_children + other
+        funcs = [child.token_func() for child in other]
+        return self.combine_token_funcs(funcs)
+
+
+class _And(_BoolOp):
+    def combine_tag_funcs(self, funcs):
+        return lambda mask, pos: all(f(mask, pos) for f in funcs)
+
+    def combine_token_funcs(self, funcs):
+        return lambda text, lex, gr: all(f(text, lex, gr) for f in funcs)
+
+
+class _Or(_BoolOp):
+    def combine_tag_funcs(self, funcs):
+        return lambda mask, pos: any(f(mask, pos) for f in funcs)
+
+    def combine_token_funcs(self, funcs):
+        return lambda text, lex, gr: any(f(text, lex, gr) for f in funcs)
+
+
+# ======== Parser =========
+
+class _Parser(object):
+    """ Recursive descent parser for query expressions. """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = self._tokenize(expression)
+        self.pos = 0
+
+    def parse(self):
+        node = self._or()
+        if self.pos != len(self.tokens):
+            self._error("unexpected %r" % self.tokens[self.pos][1])
+        return node
+
+    def _tokenize(self, expression):
+        tokens = []
+        pos = 0
+        while pos < len(expression):
+            m = _TOKEN_RE.match(expression, pos)
+            if not m or m.end() == pos:
+                raise QuerySyntaxError("Invalid query %r at position %d" % (expression, pos))
+            kind = m.lastgroup
+            value = m.group(kind)
+            if kind == 'word' and value.lower() in _KEYWORDS:
+                kind, value = 'op', _KEYWORDS[value.lower()]
+            elif kind == 'op' and value in _KEYWORDS:
+                value = _KEYWORDS[value]
+            tokens.append((kind, value))
+            pos = m.end()
+        return tokens
+
+    def _error(self, message):
+        raise QuerySyntaxError("Invalid query %r: %s" % (self.expression, message))
+
+    def _peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None, None
+
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            self._error("unexpected end")
+        self.pos += 1
+        return token
+
+    def _expect_op(self, op):
+        kind, value = self._next()
+        if (kind, value) != ('op', op):
+            self._error("%r is expected, got %r" % (op, value))
+
+    def _or(self):
+        children = [self._and()]
+        while self._peek() == ('op', '|'):
+            self.pos += 1
+            children.append(self._and())
+        return children[0] if len(children) == 1 else _Or(children)
+
+    def _and(self):
+        children = [self._unary()]
+        while self._peek() == ('op', '&'):
+            self.pos += 1
+            children.append(self._unary())
+        return children[0] if len(children) == 1 else _And(children)
+
+    def _unary(self):
+        if self._peek() == ('op', '!'):
+            self.pos += 1
+            return _Not(self._unary())
+        return self._atom()
+
+    def _atom(self):
+        kind, value = self._next()
+        if (kind, value) == ('op', '('):
+            node = self._or()
+            self._expect_op(')')
+            return node
+
+        if kind != 'word':
+            self._error("unexpected %r" % value)
+
+        if self._peek() != ('op', '='):
+            if value not in ALLOWED_GRAMMEMES:
+                self._error("unknown grammeme %r" % value)
+            return _Grammeme(value)
+
+        self.pos += 1
+        return self._condition(value, *self._next())
+
+    def _condition(self, name, kind, value):
+        if name in ('lex', 'text'):
+            if kind == 'regex':
+                flags = re.UNICODE
+                if value.endswith('i'):
+                    flags |= re.IGNORECASE
+                    value = value[:-1]
+                try:
+                    return _Field(name, None, re.compile(value[1:-1], flags))
+                except re.error as e:
+                    self._error("invalid regular expression %s: %s" % (value, e))
+            if kind == 'string':
+                value = re.sub(r'\\(.)', r'\1', value[1:-1])
+            elif kind != 'word':
+                self._error("unexpected %r" % value)
+            return _Field(name, value, None)
+
+        if kind != 'word':
+            self._error("unexpected %r" % value)
+
+        if name == 'POS':
+            if value not in ALLOWED_GRAMMEMES:
+                self._error("unknown grammeme %r" % value)
+            return _POS(value)
+
+        if name not in _CATEGORIES:
+            self._error("unknown category %r" % name)
+        if value not in _CATEGORIES[name]:
+            self._error("%r is not a value of %r category" % (value, name))
+        return _Grammeme(value)
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Reader for XML files from ruscorpora.ru.
+"""
+from __future__ import absolute_import, unicode_literals, print_function
+from xml.etree import ElementTree
+
+import warnings
+from collections import namedtuple
+from .tagset import Tag, get_converter
+from .instrument import instrumented_parse, instrumented_simplify
+from .sources import iter_sources, is_compressed
+
+Token = namedtuple('Token', 'text annotations')
+Annotation = namedtuple('Annotation', 'lex gr joined')
+
+FlatToken = namedtuple('FlatToken', 'text lex gr joined')
+
+def parse_xml(source, stats=None, backend='auto'):
+    """
+    Parse XML file ``source`` (which can be obtained from ruscorpora.ru);
+    return an iterator of sentences. Each sentence is a list of Token
+    instances.
+
+    The file is parsed incrementally: each sentence is yielded as soon
+    as it is read and its XML element is discarded afterwards, so memory
+    usage doesn't depend on the file size.
+
+    Compressed files (``.xml.gz``, ``.xml.bz2``, ``.xml.xz``) are
+    decompressed on the fly; for ``.zip`` archives sentences of all XML
+    members are returned (see ``ruscorpora.sources``).
+
+    ``backend`` is a name of XML parser backend ('etree', 'lxml', 'expat'
+    or 'auto'; see ``ruscorpora.backends``).
+
+    Pass ``ruscorpora.instrument.PipelineStats`` instance as ``stats``
+    to collect timings and counts.
+    """
+    from .backends import get_backend
+    parse = get_backend(backend)
+    if isinstance(source, str) and is_compressed(source):
+        return _parse_compressed(source, stats, backend)
+    if stats is not None:
+        return instrumented_parse(parse, source, stats)
+    return parse(source)
+
+
+def _parse_compressed(path, stats, backend):
+    for name, fp in iter_sources(path):
+        for sent in parse_xml(fp, stats, backend):
+            yield sent
+
+
+def _iter_sentence_elements(source, iterparse=None):
+    """
+    Parse XML file ``source`` incrementally; return an iterator over
+    ``<se>`` elements which are children of the root element. Elements
+    are detached from the tree, so they can be kept after iteration.
+    ``iterparse`` is ElementTree.iterparse or a compatible function.
+    """
+    if iterparse is None:
+        iterparse = ElementTree.iterparse
+    root = None
+    depth = 0
+    pending = None  # finished <se> element whose tail may be incomplete
+
+    for event, elem in iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if pending is not None:
+                # the tail of the previous <se> is complete now
+                yield pending
+                pending = None
+                root.clear()
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if pending is not None:
+            # the parent of the pending <se> is closed
+            yield pending
+            pending = None
+            root.clear()
+
+        if depth == 1:
+            if elem.tag == 'se':
+                pending = elem
+            else:
+                root.clear()
+
+    if pending is not None:
+        yield pending
+
+
+def _sentence_tokens(se):
+    """
+    Convert <se> element to a list of Token instances in a single pass
+    over its children; whitespace-only texts don't produce tokens.
+    """
+    sent = []
+    append = sent.append
+
+    txt = se.text
+    if txt and not txt.isspace():
+        _append_punct_tokens(txt, append)
+
+    for w in se.iterfind('w'):
+        ana_elems = w.findall('ana')
+
+        # text after the last annotation is a word
+        word = ana_elems[-1].tail
+        if word and not word.isspace():
+            append(Token(word, [
+                Annotation(a.get('lex'), a.get('gr'), a.get('joined'))
+                for a in ana_elems
+            ]))
+
+        txt = w.tail
+        if txt and not txt.isspace():
+            _append_punct_tokens(txt, append)
+
+    txt = se.tail
+    if txt and not txt.isspace():
+        _append_punct_tokens(txt, append)
+    return sent
+
+
+def _append_punct_tokens(txt, append):
+    for tok in txt.split('\n'):
+        if tok and not tok.isspace():
+            append(Token(tok, None))
+
+
+# The original sentence builder; it is kept as a reference implementation
+# for tests and benchmarks.
+
+def _punct_tokens(txt):
+    if not txt:
+        return []
+
+    tokens = [tok for tok in txt.split('\n')]
+    return [Token(tok, None) for tok in tokens if tok]
+
+
+def _sentence_tokens_reference(se):
+    """ Convert <se> element to a list of Token instances """
+    sent = []
+    sent.extend(_punct_tokens(se.text))
+
+    for w in se.findall('w'):
+        ana_elems = w.findall('ana')
+
+        # text after the last annotation is a word
+        word = ana_elems[-1].tail or ''
+
+        annotations = [
+            Annotation(a.get('lex'), a.get('gr'), a.get('joined'))
+            for a in ana_elems
+        ]
+        sent.append(Token(word, annotations))
+        sent.extend(_punct_tokens(w.tail))
+
+    sent.extend(_punct_tokens(se.tail))
+    return [t for t in sent if t.text.strip()]
+
+
+def simplify(sents, remove_accents=True, join_split=True,
+             join_hyphenated=True, punct_tag='PNCT', wrap_tags=True,
+             flat_tokens=True, stats=None, tag_format=None):
+    """
+    Simplify the result of ``sents`` parsing:
+
+    * keep only a single annotation per word part;
+    * annotate punctuation with ``punct_tag``;
+    * join split words into a single token (if ``join_split==True``);
+    * join hyphenated words to a single token (if ``join_hyphenated==True``);
+    * remove accents (if ``remove_accents==True``);
+    * convert string tag representation to ruscorpora.Tag instances
+      (if ``wrap_tags==True``); instances are shared between tokens
+      with the same tag (see ``Tag.from_string``);
+    * return tokens as FlatToken instances (if ``flat_tokens==True``).
+
+    If ``tag_format`` is set ('ud' or 'opencorpora'), tags are converted
+    to this format instead of being wrapped (see ``ruscorpora.tagset.convert_many``).
+
+    All transformations are done in a single pass over each sentence.
+
+    Pass ``ruscorpora.instrument.PipelineStats`` instance as ``stats``
+    to collect timings and counts.
+    """
+    if tag_format is not None:
+        make_tag = get_converter(tag_format)
+    elif wrap_tags:
+        make_tag = Tag.from_string
+    else:
+        make_tag = _identity
+    options = dict(remove_accents=remove_accents, join_split=join_split,
+                   join_hyphenated=join_hyphenated, punct_tag=punct_tag,
+                   flat_tokens=flat_tokens)
+    if stats is not None:
+        return instrumented_simplify(_simplify, sents, stats, make_tag,
+                                     warnings.warn, **options)
+    return _simplify(sents, make_tag=make_tag, warn=warnings.warn, **options)
+
+
+def _simplify(sents, remove_accents, join_split, join_hyphenated, punct_tag,
+              flat_tokens, make_tag, warn):
+
+    def add_token(text, annotations, out):
+        """ annotate punctuation, wrap tags and create the final token """
+        ann = annotations[0]
+        if len(annotations) == 1:
+            if ann is None:
+                gr = make_tag(punct_tag)
+                if flat_tokens:
+                    out.append(FlatToken(text, text, gr, None))
+                else:
+                    out.append(Token(text, [Annotation(text, gr, None)]))
+                return
+
+            gr = make_tag(ann.gr)
+            if not flat_tokens:
+                out.append(Token(text, [Annotation(ann.lex, gr, ann.joined)]))
+            elif ann.joined == 'together':
+                out.append(FlatToken(text, "".join([ann.lex]), gr, 'together'))
+            else:
+                out.append(FlatToken(text, ann.lex, gr, ann.joined))
+            return
+
+        tags = [make_tag(a.gr) for a in annotations]
+        if not flat_tokens:
+            out.append(Token(text, [
+                Annotation(a.lex, tag, a.joined)
+                for a, tag in zip(annotations, tags)
+            ]))
+        elif all(a.joined == 'together' for a in annotations):
+            out.append(FlatToken(
+                text, "".join(a.lex for a in annotations), tags[-1], 'together'
+            ))
+        elif len(annotations) == 2 and all(a.joined == 'hyphen' for a in annotations):
+            ann1, ann2 = annotations
+            tag = tags[1]
+            if ann2.gr in _HYPHEN_SECOND_PART_TAGS:
+                tag = tags[0]
+            out.append(FlatToken(
+                text, "-".join([ann1.lex, ann2.lex]), tag, 'hyphen'
+            ))
+        else:
+            out.append(FlatToken(text, ann.lex, tags[0], ann.joined))
+
+    def add_split_joined(text, annotations, hyphen_accum, out):
+        """ join hyphenated words: "word" + "-" + "word" """
+        if not join_hyphenated:
+            add_token(text, annotations, out)
+            return
+
+        ann = annotations[0]
+        if ((ann is not None and ann.joined == 'hyphen') or
+                (hyphen_accum and text.strip() == '-')):
+            hyphen_accum.append((text, annotations))
+            if len(hyphen_accum) == 3:
+                text, annotations = _combine_tokens(hyphen_accum)
+                del hyphen_accum[:]
+                add_token(text, annotations, out)
+            return
+
+        if hyphen_accum:
+            warn("unconsumed tokens: %s" % hyphen_accum)
+            for tok in hyphen_accum:
+                add_token(tok[0], tok[1], out)
+            del hyphen_accum[:]
+        add_token(text, annotations, out)
+
+    for sent in sents:
+        out = []
+        split_accum = []
+        hyphen_accum = []
+
+        for token in sent:
+            # keep only a single annotation
+            ann = token.annotations[-1] if token.annotations is not None else None
+            text = token.text
+            if remove_accents:
+                text = text.replace('`', '')
+
+            if not join_split:
+                add_split_joined(text, [ann], hyphen_accum, out)
+                continue
+
+            # join split words: "word" + "word"
+            if ann is not None and ann.joined == 'together':
+                split_accum.append((text, [ann]))
+                if len(split_accum) == 2:
+                    text, annotations = _combine_tokens(split_accum)
+                    split_accum = []
+                    add_split_joined(text, annotations, hyphen_accum, out)
+                continue
+
+            if split_accum:
+                warn("unconsumed tokens: %s" % split_accum)
+                for tok in split_accum:
+                    add_split_joined(tok[0], tok[1], hyphen_accum, out)
+                split_accum = []
+            add_split_joined(text, [ann], hyphen_accum, out)
+
+        yield out
+
+
+_HYPHEN_SECOND_PART_TAGS = frozenset(['PART', 'NUM=ciph', 'PR'])
+
+def _identity(value):
+    return value
+
+def _combine_tokens(tokens):
+    text = "".join(t[0] for t in tokens)
+    annotations = [ann for t in tokens for ann in t[1] if ann]
+    return (text, annotations)
+
+
+def parse_simple(source, stats=None, backend='auto', **simplify_kwargs):
+    return simplify(parse_xml(source, stats, backend), stats=stats,
+                    **simplify_kwargs)
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+Resumable processing of large corpora.
+
+``ResumableIngest`` records checkpoints (byte offset of the next sentence
+of each file and finished files) in a SQLite file, so a restarted run
+continues where the previous one stopped::
+
+    >>> with ResumableIngest('checkpoints.sqlite') as ingest:
+    ...     for path, index, sent in ingest.ingest('corpus/'):
+    ...         process(sent)
+    ...     print(ingest.counts)
+    ...     print(ingest.errors())
+
+Files are read with a recovering parser (``parse_xml_recover``): each
+``<se>`` element is parsed separately, and a malformed or truncated
+sentence is skipped and reported with its file and byte offset instead
+of stopping the whole file.
+
+A sentence is checkpointed when the next one is requested, so after
+a crash at most ``checkpoint_every`` sentences per file are returned
+again; sentences are never lost.
+"""
+from __future__ import absolute_import, unicode_literals
+import re
+import sqlite3
+import warnings
+from collections import deque
+
+from .reader import ElementTree, simplify
+from .offsets import parse_sentence_xml
+from .corpus import iter_files, source_stat
+from .sources import iter_sources
+
+_READ_SIZE = 1024 * 1024
+_HEAD_SIZE = 1024  # XML declaration is searched here
+
+_MAX_SENTENCE_SIZE = 16 * 1024 * 1024  # an unclosed <se> is broken after this
+
+_SE_END = b'</se>'
+_MARKUP = re.compile(br'<se[\s>/]|</se>|<!--|<!\[CDATA\[|<\?')
+_MARKUP_SIZE = len(b'<![CDATA[')  # the longest _MARKUP match
+# tags are not searched in these sections
+_SECTION_ENDS = {b'<!--': b'-->', b'<![CDATA[': b']]>', b'<?': b'?>'}
+_ENCODING = re.compile(br'<\?xml[^>]*encoding=["\']([A-Za-z0-9._-]+)["\']')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER,
+    encoding TEXT,
+    offset INTEGER,
+    position INTEGER,
+    done INTEGER
+);
+CREATE TABLE IF NOT EXISTS errors (
+    name TEXT,
+    offset INTEGER,
+    message TEXT,
+    PRIMARY KEY (name, offset)
+);
+"""
+
+
+def parse_xml_recover(source, on_error=None):
+    """
+    Parse XML file ``source`` (a file name or a binary file object);
+    return an iterator of sentences (lists of Token instances, the same
+    as ``ruscorpora.parse_xml`` returns).
+
+    Each ``<se>`` element is parsed separately: a broken sentence is
+    skipped and ``on_error(name, byte offset, exception)`` is called
+    (by default a warning is issued). Unlike ``parse_xml``, ``<se>``
+    elements are found at any depth and the rest of the document
+    is not checked. Only ASCII-compatible encodings are supported.
+    Tags in comments, CDATA sections and processing instructions are
+    ignored (attribute values can't contain ``<``). A ``<se>`` which
+    is not closed in 16MB and is not followed by another ``<se>``
+    is reported as broken, and the search continues after these 16MB.
+    """
+    if on_error is None:
+        on_error = _warn_error
+    if isinstance(source, str):
+        with open(source, 'rb') as fp:
+            for sent in _recover(fp, source, on_error):
+                yield sent
+    else:
+        name = getattr(source, 'name', repr(source))
+        for sent in _recover(source, name, on_error):
+            yield sent
+
+
+def _recover(fp, name, on_error):
+    head = fp.read(_HEAD_SIZE)
+    encoding = detect_encoding(head)
+    for start, end, sent in _iter_recovered(fp, name, encoding, on_error, 0, head):
+        yield sent
+
+
+class ResumableIngest(object):
+    """
+    Resumable ingest with checkpoints stored in ``db_path`` SQLite file.
+    Broken sentences are passed to ``on_error(name, byte offset, exception)``
+    (by default a warning is issued) and saved; see ``errors``.
+    ``counts`` dict has statistics of the last ``ingest`` call.
+    """
+
+    def __init__(self, db_path, checkpoint_every=1000, on_error=None):
+        self.db_path = db_path
+        self.checkpoint_every = checkpoint_every
+        self.on_error = on_error or _warn_error
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(_SCHEMA)
+        self.counts = {}
+
+    def ingest(self, paths, **simplify_kwargs):
+        """
+        Return an iterator over (name, sentence number, sentence) for
+        sentences of corpus files ``paths`` which were not processed
+        in the previous runs; sentences are simplified using
+        ``simplify_kwargs`` (see ``ruscorpora.simplify``). Names of
+        zip archive members are ``<archive path>/<member name>``.
+
+        A file which was changed since its checkpoint is processed again
+        from the start. A file which can't be read is reported and skipped.
+        """
+        self.counts = dict.fromkeys([
+            'files_done', 'files_resumed', 'files_parsed', 'files_failed',
+            'sentences', 'sentences_broken',
+        ], 0)
+
+        for path in iter_files(paths):
+            try:
+                stat = source_stat(path)[1:]
+                for name, fp in iter_sources(path):
+                    for item in self._ingest_source(name, fp, stat, simplify_kwargs):
+                        yield item
+            except Exception as e:
+                # e.g. a missing file or a broken archive
+                self.counts['files_failed'] += 1
+                self._error(path, -1, e)
+                self.conn.commit()
+
+    def errors(self, name=None):
+        """
+        Return a list of (name, byte offset, message) for broken sentences
+        (of file ``name`` or of all files); the offset is -1 for errors
+        which are not related to a sentence.
+        """
+        query = "SELECT name, offset, message FROM errors"
+        args = ()
+        if name is not None:
+            query += " WHERE name=?"
+            args = (name,)
+        return [tuple(row) for row in self.conn.execute(query + " ORDER BY name, offset", args)]
+
+    def reset(self, name=None):
+        """ Forget checkpoints and errors of file ``name`` (or of all files). """
+        for table in ('files', 'errors'):
+            if name is None:
+                self.conn.execute("DELETE FROM %s" % table)
+            else:
+                self.conn.execute("DELETE FROM %s WHERE name=?" % table, (name,))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _ingest_source(self, name, fp, stat, simplify_kwargs):
+        conn = self.conn
+        row = conn.execute(
+            "SELECT mtime, size, encoding, offset, position, done "
+            "FROM files WHERE name=?", (name,)
+        ).fetchone()
+        if row is not None and list(row[:2]) == stat:
+            encoding, offset, position, done = row[2:]
+            if done:
+                self.counts['files_done'] += 1
+                return
+            self.counts['files_resumed'] += 1
+            _seek(fp, offset)
+            head = b''
+        else:
+            if row is not None:
+                # the file was changed; start it again
+                conn.execute("DELETE FROM errors WHERE name=?", (name,))
+            self.counts['files_parsed'] += 1
+            head = fp.read(_HEAD_SIZE)
+            encoding = detect_encoding(head)
+            offset, position = 0, 0
+
+        state = {'offset': offset, 'position': position}
+        ends = deque()  # end offsets of parsed sentences not returned yet
+
+        def on_error(name, offset, e):
+            self.counts['sentences_broken'] += 1
+            self._error(name, offset, e)
+
+        def raw_sents():
+            for start, end, sent in _iter_recovered(fp, name, encoding, on_error,
+                                                   offset, head):
+                ends.append(end)
+                yield sent
+
+        try:
+            for sent in simplify(raw_sents(), **simplify_kwargs):
+                yield name, state['position'], sent
+                # the sentence is processed
+                state['offset'] = ends.popleft()
+                state['position'] += 1
+                self.counts['sentences'] += 1
+                if state['position'] % self.checkpoint_every == 0:
+                    self._checkpoint(name, stat, encoding, state, False)
+        except BaseException:
+            # keep the progress if the iteration is stopped
+            self._checkpoint(name, stat, encoding, state, False)
+            raise
+        self._checkpoint(name, stat, encoding, state, True)
+
+    def _checkpoint(self, name, stat, encoding, state, done):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files "
+            "(name, mtime, size, encoding, offset, position, done) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (name, stat[0], stat[1], encoding, state['offset'],
+             state['position'], int(done))
+        )
+        self.conn.commit()
+
+    def _error(self, name, offset, e):
+        self.on_error(name, offset, e)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO errors (name, offset, message) VALUES (?, ?, ?)",
+            (name, offset, repr(e))
+        )
+
+
+def detect_encoding(head):
+    """ Return encoding from XML declaration in ``head`` bytes ('utf-8' by default). """
+    match = _ENCODING.search(head[:_HEAD_SIZE])
+    if match is None:
+        return 'utf-8'
+    return match.group(1).decode('ascii')
+
+
+def _iter_recovered(fp, name, encoding, on_error, offset=0, head=b''):
+    """
+    Return an iterator over (start offset, end offset, sentence) for
+    ``<se>`` elements read from ``fp`` (positioned at ``offset`` after
+    ``head`` bytes were read from it).
+    """
+    for start, data in _iter_sentence_chunks(fp, offset, head):
+        if data is None:
+            on_error(name, start, ElementTree.ParseError(
+                "<se> is not closed in %d bytes" % _MAX_SENTENCE_SIZE))
+            continue
+        try:
+            sent = parse_sentence_xml(data, encoding)
+        except ElementTree.ParseError as e:
+            on_error(name, start, e)
+            continue
+        yield start, start + len(data), sent
+
+
+def _iter_sentence_chunks(fp, offset=0, head=b''):
+    """
+    Return an iterator over (byte offset, data) for raw XML of ``<se>``
+    elements with the text after them. A chunk ends before the next
+    tag after ``</se>``; an unclosed ``<se>`` ends at the next ``<se>``.
+    data is None for an unclosed ``<se>`` which is too long.
+    """
+    buf = head
+    base = offset  # file offset of buf[0]
+    pos = 0
+    eof = False
+    while True:
+        match, pos = _find_markup(buf, pos)
+        if match is not None and match.group() == _SE_END:
+            # </se> without <se>
+            pos = match.end()
+            continue
+        if match is not None:
+            start = match.start()
+            end, resume = _find_markup(buf, match.end())
+            if end is not None and end.group() != _SE_END:
+                # <se> is not closed
+                yield base + start, buf[start:end.start()]
+                pos = end.start()
+                continue
+            if end is not None:
+                tail_end = buf.find(b'<', end.end())
+                if tail_end != -1:
+                    yield base + start, buf[start:tail_end]
+                    pos = tail_end
+                    continue
+            elif len(buf) - start > _MAX_SENTENCE_SIZE:
+                # <se> is not closed and there is no <se> after it;
+                # an unclosed comment in it is not skipped
+                yield base + start, None
+                pos = max(resume, len(buf) - _MARKUP_SIZE + 1)
+                continue
+            if eof:
+                yield base + start, buf[start:]
+                return
+        elif eof:
+            return
+
+        data = fp.read(_READ_SIZE)
+        buf = buf[pos:] + data
+        base += pos
+        pos = 0
+        eof = not data
+
+
+def _find_markup(buf, pos):
+    """
+    Return (match, pos) for the first ``<se`` or ``</se>`` after ``pos``
+    in ``buf`` which is not in a comment, a CDATA section or a processing
+    instruction. If it is not found, match is None and the search should
+    be continued from the returned pos when more data is read.
+    """
+    while True:
+        match = _MARKUP.search(buf, pos)
+        if match is None:
+            # markup can be split between blocks
+            return None, max(pos, len(buf) - _MARKUP_SIZE + 1)
+        section_end = _SECTION_ENDS.get(match.group())
+        if section_end is None:
+            return match, match.start()
+        end = buf.find(section_end, match.end())
+        if end == -1:
+            # the section is not closed yet
+            return None, match.start()
+        pos = end + len(section_end)
+
+
+def _seek(fp, offset):
+    try:
+        fp.seek(offset)
+    except (AttributeError, IOError, OSError, ValueError):
+        # not seekable
+        while offset > 0:
+            data = fp.read(min(offset, _READ_SIZE))
+            if not data:
+                break
+            offset -= len(data)
+
+
+def _warn_error(name, offset, exception):
+    if offset < 0:
+        warnings.warn("error processing %s: %r" % (name, exception))
+    else:
+        warnings.warn("broken sentence in %s at byte %d: %r" % (name, offset, exception))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Compressed corpus files.
+
+``.xml.gz``, ``.xml.bz2`` and ``.xml.xz`` files and ``.zip`` archives
+of XML files are decompressed while they are parsed; nothing is
+unpacked to disk. All XML members of a zip archive are read in
+archive order; members can be compressed themselves.
+"""
+from __future__ import absolute_import, unicode_literals
+from contextlib import closing
+
+
+# decompression modules are imported when they are needed
+
+def _open_gzip(fp):
+    import gzip
+    return gzip.GzipFile(fileobj=fp, mode='rb')
+
+
+def _open_bz2(fp):
+    import bz2
+    return bz2.BZ2File(fp)
+
+
+def _open_xz(fp):
+    try:
+        import lzma
+    except ImportError:  # Python is built without lzma
+        raise ImportError("lzma module is required to read .xz files")
+    return lzma.LZMAFile(fp)
+
+
+DECOMPRESSORS = {
+    '.gz': _open_gzip,
+    '.bz2': _open_bz2,
+    '.xz': _open_xz,
+}
+
+XML_EXTENSIONS = ('.xml',) + tuple('.xml' + ext for ext in sorted(DECOMPRESSORS))
+CORPUS_EXTENSIONS = XML_EXTENSIONS + ('.zip',)
+
+
+def is_compressed(path):
+    """ Return True if ``path`` is a compressed file or a zip archive. """
+    return path.lower().endswith(tuple(DECOMPRESSORS) + ('.zip',))
+
+
+def iter_sources(path):
+    """
+    Return an iterator over (name, file object) pairs for XML documents
+    of corpus file ``path``: a single pair for XML files and compressed
+    XML files, a pair per XML member for zip archives (names are
+    ``<archive path>/<member name>``). A file object is closed
+    when the next pair is requested.
+    """
+    if not path.lower().endswith('.zip'):
+        with open(path, 'rb') as fp:
+            with closing(_decompress(fp, path)) as decompressed:
+                yield path, decompressed
+        return
+
+    import zipfile
+    archive = zipfile.ZipFile(path)
+    try:
+        for info in archive.infolist():
+            if not info.filename.lower().endswith(XML_EXTENSIONS):
+                continue
+            with closing(archive.open(info)) as member:
+                with closing(_decompress(member, info.filename)) as decompressed:
+                    yield '%s/%s' % (path, info.filename), decompressed
+    finally:
+        archive.close()
+
+
+def _decompress(fp, name):
+    for ext, open_func in DECOMPRESSORS.items():
+        if name.lower().endswith(ext):
+            return open_func(fp)
+    return fp
@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 """
 Python wrapper for tags used in http://www.ruscorpora.ru/
+
+Tag instances compare equal to tag strings with the same grammemes,
+but they are hashed by grammemes, not as strings: Tags and raw strings
+don't mix as dict keys or set members.
 """
 from __future__ import absolute_import, unicode_literals
+from collections import namedtuple, OrderedDict
 
 # Часть речи:
 POS_TAGS = frozenset([
@@ -183,113 +188,472 @@ ALLOWED_GRAMMEMES = (POS_TAGS | GENDERS | ANIMACY | NUMBERS | CASES |
                      TENSES | PERSONS | OTHER_GRAMMEMES |
                      NON_STANDARD_GRAMMEMES | CUSTOM_GRAMMEMES)
 
+# Grammatical categories available as Tag attributes:
+CATEGORIES = (
+    ('gender', GENDERS),
+    ('animacy', ANIMACY),
+    ('number', NUMBERS),
+    ('case', CASES),
+    ('short_full', SHORT_FULL),
+    ('degree_of_comparison', DEGREES_OF_COMPARISON),
+    ('aspect', ASPECTS),
+    ('transitivity', TRANSITIVITY),
+    ('voice', VOICES),
+    ('verb_form', VERB_FORMS),
+    ('mood', GRAMMATICAL_MOODS),
+    ('tense', TENSES),
+    ('person', PERSONS),
+)
+
+# Each grammeme is encoded as a bit; a tag is encoded as a bitmask.
+GRAMMEME_BITS = dict(
+    (grammeme, 1 << index)
+    for index, grammeme in enumerate(sorted(ALLOWED_GRAMMEMES))
+)
+_BIT_GRAMMEMES = dict((bit, gr) for gr, bit in GRAMMEME_BITS.items())
+
+def _category_mask(grammemes):
+    mask = 0
+    for grammeme in grammemes:
+        mask |= GRAMMEME_BITS[grammeme]
+    return mask
+
+CATEGORY_MASKS = dict(
+    (name, _category_mask(grammemes)) for name, grammemes in CATEGORIES
+)
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+class _TagCache(object):
+    """
+    Cache of Tag instances keyed by tag string. When ``maxsize`` is None
+    the cache is unbounded; otherwise least recently used tags are evicted.
+    """
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, tag, factory):
+        data = self._data
+        try:
+            value = data[tag]
+        except KeyError:
+            self.misses += 1
+            value = factory(tag)
+            data[tag] = value
+            if self.maxsize is not None and len(data) > self.maxsize:
+                data.popitem(last=False)
+            return value
+
+        self.hits += 1
+        if self.maxsize is not None:
+            # mark as recently used
+            del data[tag]
+            data[tag] = value
+        return value
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def clear(self):
+        self.hits = self.misses = 0
+        self._data.clear()
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        if maxsize is not None:
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
 
 class Tag(object):
+    """
+    Wrapper for a ruscorpora tag string. Tags are immutable and hashable;
+    use ``Tag.from_string`` to get a shared cached instance.
+
+    Grammemes are stored as an integer bitmask (see ``GRAMMEME_BITS``),
+    so attribute access, ``in`` checks, comparison and hashing
+    are cheap.
+
+    A tag is equal to a string with the same grammemes in any order,
+    but a string is not found in a dict or set with Tag keys (and vice
+    versa); convert strings with ``Tag.from_string`` first.
+    """
+    __slots__ = ('_tag', '_pos', '_mask')
+
+    _cache = _TagCache()
+
     def __init__(self, tag):
         self._tag = tag
 
         # Example: V,ipf,intr,act=n,sg,praet,indic
-        self._grammemes = self._split_to_grammemes(tag)
-        self._grammeme_set = frozenset(self._grammemes)
+        grammemes = self._split_to_grammemes(tag)
+        self._pos = grammemes[0]
+        self._mask = self._grammemes_to_mask(grammemes)
+
+    @classmethod
+    def from_string(cls, tag):
+        """
+        Return a Tag instance for ``tag`` string. Instances are cached,
+        so the same object is returned for the same string.
+        """
+        return cls._cache.get(tag, cls)
+
+    @classmethod
+    def cache_info(cls):
+        """ Return (hits, misses, maxsize, currsize) of the Tag cache. """
+        return cls._cache.info()
 
-        self._assert_grammemes_are_valid(self._grammeme_set)
+    @classmethod
+    def cache_clear(cls):
+        cls._cache.clear()
+
+    @classmethod
+    def set_cache_size(cls, maxsize):
+        """
+        Limit the Tag cache to ``maxsize`` tags (least recently used
+        tags are evicted); ``None`` means unbounded cache.
+        """
+        cls._cache.resize(maxsize)
 
     @property
     def POS(self):
-        return self._grammemes[0]
+        return self._pos
+
+    @property
+    def grammemes(self):
+        """ A frozenset with all grammemes of this tag. """
+        grammemes = []
+        mask = self._mask
+        while mask:
+            bit = mask & -mask
+            grammemes.append(_BIT_GRAMMEMES[bit])
+            mask ^= bit
+        return frozenset(grammemes)
 
     @property
     def gender(self):
-        return self._grammatical_feature(GENDERS)
+        return self._grammatical_feature(CATEGORY_MASKS['gender'])
 
     @property
     def animacy(self):
-        return self._grammatical_feature(ANIMACY)
+        return self._grammatical_feature(CATEGORY_MASKS['animacy'])
 
     @property
     def number(self):
-        return self._grammatical_feature(NUMBERS)
+        return self._grammatical_feature(CATEGORY_MASKS['number'])
 
     @property
     def case(self):
-        return self._grammatical_feature(CASES)
+        return self._grammatical_feature(CATEGORY_MASKS['case'])
 
     @property
     def short_full(self):
-        return self._grammatical_feature(SHORT_FULL)
+        return self._grammatical_feature(CATEGORY_MASKS['short_full'])
 
     @property
     def degree_of_comparison(self):
-        return self._grammatical_feature(DEGREES_OF_COMPARISON)
+        return self._grammatical_feature(CATEGORY_MASKS['degree_of_comparison'])
 
     @property
     def aspect(self):
-        return self._grammatical_feature(ASPECTS)
+        return self._grammatical_feature(CATEGORY_MASKS['aspect'])
 
     @property
     def transitivity(self):
-        return self._grammatical_feature(TRANSITIVITY)
+        return self._grammatical_feature(CATEGORY_MASKS['transitivity'])
 
     @property
     def voice(self):
-        return self._grammatical_feature(VOICES)
+        return self._grammatical_feature(CATEGORY_MASKS['voice'])
 
     @property
     def verb_form(self):
-        return self._grammatical_feature(VERB_FORMS)
+        return self._grammatical_feature(CATEGORY_MASKS['verb_form'])
 
     @property
     def mood(self):
-        return self._grammatical_feature(GRAMMATICAL_MOODS)
+        return self._grammatical_feature(CATEGORY_MASKS['mood'])
 
     @property
     def tense(self):
-        return self._grammatical_feature(TENSES)
+        return self._grammatical_feature(CATEGORY_MASKS['tense'])
 
     @property
     def person(self):
-        return self._grammatical_feature(PERSONS)
+        return self._grammatical_feature(CATEGORY_MASKS['person'])
 
     def __contains__(self, grammeme):
-        if grammeme in self._grammeme_set:
-            return True
-        else:
-            if grammeme in ALLOWED_GRAMMEMES:
-                return False
-            else:
-                raise ValueError("Grammeme is unknown: %s" % grammeme)
+        try:
+            return bool(self._mask & GRAMMEME_BITS[grammeme])
+        except KeyError:
+            raise ValueError("Grammeme is unknown: %s" % grammeme)
 
     def __eq__(self, other):
         if isinstance(other, Tag):
-            return other._grammeme_set == self._grammeme_set
+            return other._mask == self._mask
 
-        grammemes = frozenset(self._split_to_grammemes(other))
-        self._assert_grammemes_are_valid(grammemes)
-
-        return grammemes == self._grammeme_set
+        mask = self._grammemes_to_mask(self._split_to_grammemes(other))
+        return mask == self._mask
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        return hash(self._mask)
+
+    def __reduce__(self):
+        # unpickled tags (e.g. sent from worker processes) are shared
+        return Tag.from_string, (self._tag,)
+
     def __repr__(self): # XXX: this is incorrect in Python 2.x
         return "Tag(%r)" % self._tag
 
     def __str__(self): # XXX: this is incorrect in Python 2.x
         return self._tag
 
-    def _assert_grammemes_are_valid(self, grammemes):
-        unknown_grammemes = grammemes - ALLOWED_GRAMMEMES
-        if unknown_grammemes:
+    @classmethod
+    def _grammemes_to_mask(cls, grammemes):
+        mask = 0
+        try:
+            for grammeme in grammemes:
+                mask |= GRAMMEME_BITS[grammeme]
+        except KeyError:
+            unknown_grammemes = frozenset(grammemes) - ALLOWED_GRAMMEMES
             msg = "Unknown grammemes: %s" % str(unknown_grammemes)
             raise ValueError(msg)
+        return mask
 
-    def _grammatical_feature(self, feature_set):
-        grammemes = feature_set & self._grammeme_set
-        if not grammemes:
+    def _grammatical_feature(self, category_mask):
+        bits = self._mask & category_mask
+        if not bits:
             return None
-        return next(iter(grammemes))
+        return _BIT_GRAMMEMES[bits & -bits]
 
     @classmethod
     def _split_to_grammemes(cls, tag_txt):
         return tag_txt.replace('=', ',').split(',')
 
+
+# ======== Tag conversion =========
+
+UDTag = namedtuple('UDTag', 'upos feats')
+
+# ruscorpora POS -> Universal Dependencies UPOS
+UD_POS = {
+    'S': 'NOUN',
+    'A': 'ADJ',
+    'NUM': 'NUM',
+    'A-NUM': 'ADJ',
+    'ANUM': 'ADJ',
+    'V': 'VERB',
+    'ADV': 'ADV',
+    'PRAEDIC': 'ADV',
+    'PARENTH': 'ADV',
+    'S-PRO': 'PRON',
+    'A-PRO': 'DET',
+    'ADV-PRO': 'ADV',
+    'PRAEDIC-PRO': 'PRON',
+    'PR': 'ADP',
+    'CONJ': 'CCONJ',
+    'PART': 'PART',
+    'INTJ': 'INTJ',
+    'NONLEX': 'X',
+    'PNCT': 'PUNCT',
+}
+
+# ruscorpora grammeme -> Universal Dependencies (feature, value)
+UD_FEATURES = {
+    'm': ('Gender', 'Masc'), 'f': ('Gender', 'Fem'), 'n': ('Gender', 'Neut'),
+    'anim': ('Animacy', 'Anim'), 'inan': ('Animacy', 'Inan'),
+    'sg': ('Number', 'Sing'), 'pl': ('Number', 'Plur'),
+    'nom': ('Case', 'Nom'), 'gen': ('Case', 'Gen'), 'dat': ('Case', 'Dat'),
+    'acc': ('Case', 'Acc'), 'ins': ('Case', 'Ins'), 'loc': ('Case', 'Loc'),
+    'gen2': ('Case', 'Par'), 'acc2': ('Case', 'Acc'), 'loc2': ('Case', 'Loc'),
+    'voc': ('Case', 'Voc'), 'adnum': ('Case', 'Gen'),
+    'brev': ('Variant', 'Short'),
+    'comp': ('Degree', 'Cmp'), 'comp2': ('Degree', 'Cmp'), 'supr': ('Degree', 'Sup'),
+    'pf': ('Aspect', 'Perf'), 'ipf': ('Aspect', 'Imp'),
+    'act': ('Voice', 'Act'), 'pass': ('Voice', 'Pass'), 'med': ('Voice', 'Mid'),
+    'inf': ('VerbForm', 'Inf'), 'partcp': ('VerbForm', 'Part'), 'ger': ('VerbForm', 'Conv'),
+    'indic': ('Mood', 'Ind'), 'imper': ('Mood', 'Imp'), 'imper2': ('Mood', 'Imp'),
+    'praet': ('Tense', 'Past'), 'praes': ('Tense', 'Pres'), 'fut': ('Tense', 'Fut'),
+    '1p': ('Person', '1'), '2p': ('Person', '2'), '3p': ('Person', '3'),
+    'abbr': ('Abbr', 'Yes'),
+    'ciph': ('NumForm', 'Digit'),
+}
+
+_PROPER_NAME_GRAMMEMES = frozenset(['persn', 'patrn', 'famn', 'zoon'])
+
+# ruscorpora grammeme -> OpenCorpora grammeme
+OPENCORPORA_GENDERS = {'m': 'masc', 'f': 'femn', 'n': 'neut', 'm-f': 'ms-f'}
+OPENCORPORA_LEXICAL_GRAMMEMES = {
+    'anim': 'anim', 'inan': 'inan',
+    'pf': 'perf', 'ipf': 'impf',
+    'tran': 'tran', 'intr': 'intr',
+    'persn': 'Name', 'patrn': 'Patr', 'famn': 'Surn', '0': 'Fixd',
+    'abbr': 'Abbr', 'INIT': 'Init', 'obsc': 'Infr', 'distort': 'Dist',
+}
+OPENCORPORA_FORM_GRAMMEMES = {
+    'sg': 'sing', 'pl': 'plur',
+    'nom': 'nomn', 'gen': 'gent', 'dat': 'datv', 'acc': 'accs',
+    'ins': 'ablt', 'loc': 'loct', 'voc': 'voct', 'gen2': 'gen2',
+    'acc2': 'acc2', 'loc2': 'loc2', 'adnum': 'gent',
+    'comp2': 'Cmp2', 'supr': 'Supr',
+    'praet': 'past', 'praes': 'pres', 'fut': 'futr',
+    '1p': '1per', '2p': '2per', '3p': '3per',
+    'indic': 'indc', 'imper': 'impr', 'imper2': 'impr',
+    'act': 'actv', 'pass': 'pssv',
+}
+
+# ruscorpora POS -> OpenCorpora POS
+OPENCORPORA_POS = {
+    'S': 'NOUN',
+    'A': 'ADJF',
+    'NUM': 'NUMR',
+    'A-NUM': 'ADJF',
+    'ANUM': 'ADJF',
+    'V': 'VERB',
+    'ADV': 'ADVB',
+    'PRAEDIC': 'PRED',
+    'PARENTH': 'ADVB',
+    'S-PRO': 'NPRO',
+    'A-PRO': 'ADJF',
+    'ADV-PRO': 'ADVB',
+    'PRAEDIC-PRO': 'PRED',
+    'PR': 'PREP',
+    'CONJ': 'CONJ',
+    'PART': 'PRCL',
+    'INTJ': 'INTJ',
+    'NONLEX': 'UNKN',
+    'PNCT': 'PNCT',
+}
+
+# (lexical, form) grammeme maps; gender is a lexical grammeme for nouns
+# and a form grammeme otherwise
+_OPENCORPORA_NOUN_POS = frozenset(['S', 'S-PRO'])
+_OPENCORPORA_NOUN_MAPS = (
+    dict(OPENCORPORA_LEXICAL_GRAMMEMES, **OPENCORPORA_GENDERS),
+    OPENCORPORA_FORM_GRAMMEMES,
+)
+_OPENCORPORA_MAPS = (
+    OPENCORPORA_LEXICAL_GRAMMEMES,
+    dict(OPENCORPORA_FORM_GRAMMEMES, **OPENCORPORA_GENDERS),
+)
+
+
+def _as_tag(tag):
+    return tag if isinstance(tag, Tag) else Tag.from_string(tag)
+
+
+def _to_ud(tag):
+    tag = _as_tag(tag)
+    grammemes = tag.grammemes
+    upos = UD_POS.get(tag.POS, 'X')
+    if upos == 'NOUN' and grammemes & _PROPER_NAME_GRAMMEMES:
+        upos = 'PROPN'
+
+    feats = {}
+    for grammeme in grammemes:
+        if grammeme in UD_FEATURES:
+            name, value = UD_FEATURES[grammeme]
+            feats.setdefault(name, set()).add(value)
+    if 'm-f' in grammemes:
+        feats.setdefault('Gender', set()).update(['Masc', 'Fem'])
+    if upos == 'VERB' and 'VerbForm' not in feats:
+        feats['VerbForm'] = set(['Fin'])
+
+    if not feats:
+        return UDTag(upos, '_')
+    return UDTag(upos, "|".join(
+        "%s=%s" % (name, ",".join(sorted(feats[name])))
+        for name in sorted(feats, key=lambda name: name.lower())
+    ))
+
+
+def _to_opencorpora(tag):
+    tag = _as_tag(tag)
+    grammemes = tag.grammemes
+    pos = OPENCORPORA_POS.get(tag.POS, 'UNKN')
+    if tag.POS == 'A':
+        if 'brev' in grammemes:
+            pos = 'ADJS'
+        elif 'comp' in grammemes:
+            pos = 'COMP'
+    elif tag.POS == 'V':
+        if 'inf' in grammemes:
+            pos = 'INFN'
+        elif 'ger' in grammemes:
+            pos = 'GRND'
+        elif 'partcp' in grammemes:
+            pos = 'PRTS' if 'brev' in grammemes else 'PRTF'
+
+    if tag.POS in _OPENCORPORA_NOUN_POS:
+        lexical_map, form_map = _OPENCORPORA_NOUN_MAPS
+    else:
+        lexical_map, form_map = _OPENCORPORA_MAPS
+
+    lexical = [pos] + sorted(
+        lexical_map[gr] for gr in grammemes if gr in lexical_map
+    )
+    if tag.POS == 'A-PRO':
+        lexical.append('Apro')
+    elif tag.POS in ('A-NUM', 'ANUM'):
+        lexical.append('Anum')
+
+    form = sorted(form_map[gr] for gr in grammemes if gr in form_map)
+    if not form:
+        return ",".join(lexical)
+    return "%s %s" % (",".join(lexical), ",".join(form))
+
+
+class TagConverter(object):
+    """
+    Memoized tag conversion function: each distinct tag (a string or
+    a Tag instance) is converted once.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.cache = {}
+
+    def __call__(self, tag):
+        try:
+            return self.cache[tag]
+        except KeyError:
+            value = self.cache[tag] = self.func(tag)
+            return value
+
+
+TAG_FORMATS = {
+    'ud': TagConverter(_to_ud),
+    'opencorpora': TagConverter(_to_opencorpora),
+}
+
+
+def to_ud(tag):
+    """ Convert ruscorpora tag to UDTag(upos, feats) (Universal Dependencies). """
+    return TAG_FORMATS['ud'](tag)
+
+
+def to_opencorpora(tag):
+    """ Convert ruscorpora tag to OpenCorpora tag string. """
+    return TAG_FORMATS['opencorpora'](tag)
+
+
+def get_converter(tag_format):
+    """ Return a memoized converter for ``tag_format`` ('ud' or 'opencorpora'). """
+    try:
+        return TAG_FORMATS[tag_format]
+    except KeyError:
+        raise ValueError("Unknown tag format: %s" % tag_format)
+
+
+def convert_many(tags, tag_format):
+    """ Convert a sequence of ruscorpora tags to ``tag_format``; return a list. """
+    converter = get_converter(tag_format)
+    cache = converter.cache
+    return [cache[tag] if tag in cache else converter(tag) for tag in tags]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import io
+import pytest
+
+CORPUS = """<?xml version="1.0" encoding="%s" ?>
+<corpus>
+%s
+</corpus>"""
+
+# a sentence with a single word; %s is appended to the word
+SCHOOL_SENT = '<se><w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола%s</w> .</se>'
+
+# two sentences; %s are the lemma and the wordform of a verb
+VERB_SENTENCES = """<se><w><ana lex="новый" gr="A=pl,gen,plen"></ana>н`овых</w> <w><ana lex="школа" gr="S,f,inan=pl,gen"></ana>шк`ол</w> .</se>
+<se><w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола</w> <w><ana lex="%s" gr="V,ipf,intr=sg,praet,indic,f"></ana>%s</w> .</se>"""
+
+
+def corpus_xml(sentences, encoding='utf-8'):
+    """
+    Return a corpus file with ``sentences`` (a string or a list
+    of ``<se>`` elements) encoded in ``encoding``.
+    """
+    if not isinstance(sentences, type('')):
+        sentences = "\n".join(sentences)
+    return (CORPUS % (encoding, sentences)).encode(encoding)
+
+
+def corpus_fp(sentences, encoding='utf-8'):
+    return io.BytesIO(corpus_xml(sentences, encoding))
+
+
+@pytest.fixture
+def corpus_file():
+    """
+    A function which writes a corpus file ``name`` with ``sentences``
+    to ``directory`` (a py.path.local instance) and returns its path.
+    """
+    def write(directory, sentences, name='corpus.xml', encoding='utf-8'):
+        path = directory.join(name)
+        path.write_binary(corpus_xml(sentences, encoding))
+        return str(path)
+    return write
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import io
+import asyncio
+import pytest
+import ruscorpora as rnc
+from ruscorpora.aio import aparse_simple
+from conftest import SCHOOL_SENT, corpus_xml
+
+
+def _corpus(count):
+    return corpus_xml([SCHOOL_SENT % i for i in range(count)])
+
+
+async def _collect(sents, limit=None):
+    result = []
+    async for sent in sents:
+        result.append(sent)
+        if len(result) == limit:
+            break
+    return result
+
+
+class _AsyncStream(object):
+    def __init__(self, data):
+        self._fp = io.BytesIO(data)
+        self.reads = 0
+
+    async def read(self, size=-1):
+        self.reads += 1
+        await asyncio.sleep(0)
+        return self._fp.read(size)
+
+
+def test_same_as_sync(tmpdir, corpus_file):
+    data = _corpus(250)
+    path = corpus_file(tmpdir, [SCHOOL_SENT % i for i in range(250)])
+    expected = list(rnc.parse_simple(io.BytesIO(data)))
+
+    assert asyncio.run(_collect(aparse_simple(path, chunk_size=7))) == expected
+    assert asyncio.run(_collect(aparse_simple(io.BytesIO(data)))) == expected
+
+
+def test_async_stream():
+    data = _corpus(250)
+    stream = _AsyncStream(data)
+    sents = asyncio.run(_collect(aparse_simple(stream, read_size=100)))
+    assert sents == list(rnc.parse_simple(io.BytesIO(data)))
+    assert stream.reads > 10
+
+
+def test_early_exit():
+    stream = _AsyncStream(_corpus(2000))
+
+    async def main():
+        sents = aparse_simple(stream, chunk_size=10, max_chunks=1, read_size=100)
+        result = await _collect(sents, limit=5)
+        await sents.aclose()
+        return result
+
+    assert len(asyncio.run(main())) == 5
+    assert stream._fp.tell() < len(stream._fp.getvalue())
+
+
+def test_cancel():
+    stream = _AsyncStream(_corpus(2000))
+
+    async def main():
+        task = asyncio.ensure_future(_collect(aparse_simple(stream, read_size=100)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert stream._fp.tell() < len(stream._fp.getvalue())
+
+
+def test_errors():
+    data = _corpus(10)[:-20]
+    result = []
+
+    async def main():
+        async for sent in aparse_simple(io.BytesIO(data), chunk_size=4):
+            result.append(sent)
+
+    with pytest.raises(SyntaxError):
+        asyncio.run(main())
+    # sentences parsed before the error are returned
+    assert result == list(rnc.parse_simple(io.BytesIO(_corpus(9))))
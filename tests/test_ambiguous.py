@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import ruscorpora as rnc
+from ruscorpora.ambiguous import parse_ambiguous
+
+from conftest import corpus_fp
+
+SENTENCES = """<se><w><ana lex="стать" gr="V,pf,intr=praet,sg,indic,n"></ana><ana lex="стало" gr="ADV"></ana>ст`ало</w> ,
+<w><ana lex="пол" gr="NUM" joined="together"></ana><ana lex="пола" gr="S,f,inan=sg,nom" joined="together"></ana>пол</w><w><ana lex="дюжина" gr="S,f,inan=sg,gen" joined="together"></ana>дюжины</w>
+<w><ana lex="Сегодня" gr="ADV" joined="hyphen"></ana>Сег`одня</w>-<w><ana lex="завтра" gr="ADV" joined="hyphen"></ana><ana lex="завтра" gr="S,n,inan=sg,nom" joined="hyphen"></ana>з`автра</w></se>
+<se><w><ana lex="сми" gr="S,0=sg,nom"></ana>СМИ</w></se>"""
+
+
+def _batches(**kwargs):
+    return list(parse_ambiguous(corpus_fp(SENTENCES), **kwargs))
+
+
+def test_candidates():
+    batch, = _batches()
+    assert len(batch) == 2
+    sent = batch[0]
+    assert sent.texts() == ['стало', ' ,', 'полдюжины', 'Сегодня-завтра']
+    assert sent.candidate_counts() == [2, 1, 2, 2]
+    assert sent.candidates(0) == [
+        ('стало', 'стать', 'V,pf,intr=praet,sg,indic,n', None),
+        ('стало', 'стало', 'ADV', None),
+    ]
+    assert [tok.lex for tok in sent.candidates(2)] == ['полдюжина', 'поладюжина']
+    assert [tok.gr for tok in sent.candidates(3)] == ['ADV', 'S,n,inan=sg,nom']
+    assert batch[-1].texts() == ['СМИ']
+
+
+def test_same_as_simplify():
+    for kwargs in [{}, {'join_split': False}, {'join_hyphenated': False}]:
+        expected = list(rnc.simplify(rnc.parse_xml(corpus_fp(SENTENCES)), **kwargs))
+        batches = _batches(batch_size=1, **kwargs)
+        assert len(batches) == 2
+        assert [sent.simplified() for batch in batches for sent in batch] == expected
+
+
+def test_shared_vocabularies():
+    batches = _batches(batch_size=1)
+    assert batches[0].vocabs is batches[1].vocabs
+    vocabs = batches[0].vocabs
+    assert [vocabs.gr.items[i] for i in batches[1].gr_ids] == ['S,0=sg,nom']
+    assert list(batches[0].token_offsets) == [0, 2, 3, 5, 7]
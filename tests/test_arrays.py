@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import pytest
+import ruscorpora as rnc
+
+np = pytest.importorskip('numpy')
+from ruscorpora.arrays import (Vocabularies, iter_batches, compiled_arrays,
+                               CATEGORY_VALUES)
+
+from conftest import corpus_fp
+
+SENTENCES = """<se>«
+<w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола</w>
+ <w><ana lex="злословие" gr="S,n,inan=sg,gen"></ana>злосл`овия</w> !</se>
+<se><w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>шк`ола</w></se>"""
+
+
+def _sents():
+    return list(rnc.parse_simple(corpus_fp(SENTENCES)))
+
+
+def test_ragged():
+    vocabs = Vocabularies()
+    batch, = list(iter_batches(_sents(), vocabs))
+    assert batch['offsets'].tolist() == [0, 4, 5]
+    assert [vocabs.text.items[i] for i in batch['text']] == [
+        '«', 'Школа', 'злословия', ' !', 'школа'
+    ]
+    assert batch['lex'][1] == batch['lex'][4]
+
+    cases = dict(CATEGORY_VALUES)['case']
+    assert [cases[i] for i in batch['case']] == [None, 'nom', 'gen', None, 'nom']
+    pos = dict(CATEGORY_VALUES)['POS']
+    assert [pos[i] for i in batch['POS']] == ['PNCT', 'S', 'S', 'PNCT', 'S']
+
+
+def test_padded():
+    batches = list(iter_batches(_sents(), Vocabularies(), batch_size=1, padded=True))
+    assert len(batches) == 2
+    assert batches[0]['text'].shape == (1, 4)
+    assert batches[1]['lengths'].tolist() == [1]
+
+
+def test_vocabularies_persist(tmpdir):
+    vocabs = Vocabularies()
+    first, = list(iter_batches(_sents(), vocabs))
+    path = str(tmpdir.join('vocabs.json'))
+    vocabs.save(path)
+
+    loaded = Vocabularies.load(path, frozen=True)
+    second, = list(iter_batches(_sents(), loaded))
+    assert (first['gr'] == second['gr']).all()
+    assert loaded.text['unknown word'] == 1
+
+
+def test_compiled_arrays(tmpdir, corpus_file):
+    source = corpus_file(tmpdir, SENTENCES)
+    cache = str(tmpdir.join('corpus.rnc'))
+    rnc.compile_corpus(source, cache)
+
+    expected, = list(iter_batches(_sents(), Vocabularies(), padded=True))
+    with rnc.CompiledCorpus(cache) as corpus:
+        result = compiled_arrays(corpus, Vocabularies(), padded=True)
+    for key in expected:
+        assert (result[key] == expected[key]).all()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import io
+import pytest
+import ruscorpora as rnc
+from ruscorpora.backends import BACKENDS, available_backends, get_backend
+from conftest import corpus_fp, corpus_xml
+
+SENTENCES = """<se> \n«\n <w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк<!-- c -->`ол<?pi x?>а</w>\n\n
+<w><ana lex="x" gr="S"></ana> \n</w><w><ana lex="пол" gr="NUM" joined="together"></ana>пол</w> ,<!-- c -->\n<?pi x?>- <b>bold</b> ;
+<w>ignored<ana lex="стать" gr="V">ignored</ana>ст`<ana lex="стать" gr="S"/>ало<i>i</i>!</w>…</se>\n !
+<p><se><w><ana lex="a" gr="S"></ana>b</w></se></p> tail
+<se><w><ana lex="сми" gr="S,0=sg,nom"></ana>СМИ</w></se>
+<se></se>"""
+
+BACKEND_NAMES = sorted(BACKENDS)
+
+
+def _fp(encoding='utf-8'):
+    return corpus_fp(SENTENCES, encoding)
+
+
+def _parse(backend, fp):
+    if backend not in available_backends():
+        pytest.skip("%s backend is not available" % backend)
+    return list(rnc.parse_xml(fp, backend=backend))
+
+
+@pytest.mark.parametrize('backend', BACKEND_NAMES)
+@pytest.mark.parametrize('encoding', ['utf-8', 'windows-1251'])
+def test_conformance(backend, encoding):
+    sents = _parse(backend, _fp(encoding))
+    assert sents == list(rnc.parse_xml(_fp(), backend='etree'))
+    assert len(sents) == 3
+    assert sents[0] == [
+        ('«', None),
+        ('Шк`ола', [('школа', 'S,f,inan=sg,nom', None)]),
+        ('пол', [('пол', 'NUM', 'together')]),
+        (' ,', None),
+        ('- ', None),
+        ('ало', [('стать', 'V', None), ('стать', 'S', None)]),
+        ('…', None),
+        (' !', None),
+    ]
+    assert sents[2] == []
+
+
+@pytest.mark.parametrize('backend', BACKEND_NAMES)
+def test_conformance_errors(backend):
+    data = corpus_xml(SENTENCES)
+    fp = io.BytesIO(data[:data.index(b'<se><w><ana lex="\xd1\x81\xd0\xbc')])
+    if backend not in available_backends():
+        pytest.skip("%s backend is not available" % backend)
+    sents = rnc.parse_xml(fp, backend=backend)
+    assert next(sents)[0] == ('«', None)
+    with pytest.raises(SyntaxError):
+        next(sents)
+
+
+def test_get_backend():
+    assert get_backend('auto') is BACKENDS[available_backends()[0]]
+    with pytest.raises(ValueError):
+        get_backend('sax')
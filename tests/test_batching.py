@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import random
+import pytest
+from ruscorpora.batching import bucket_batches, corpus_batches, padding_ratio
+
+
+def _sents(count, seed=0):
+    rng = random.Random(seed)
+    return [list(range(rng.randint(1, 40))) for _ in range(count)]
+
+
+@pytest.mark.parametrize('shuffle', [True, False])
+def test_bucket_batches(shuffle):
+    sents = _sents(500)
+    batches = list(bucket_batches(iter(sents), max_tokens=100, window=200,
+                                  max_sentences=8, shuffle=shuffle))
+    assert sorted(map(len, sents)) == sorted(len(s) for b in batches for s in b)
+    for batch in batches:
+        assert len(batch) <= 8
+        assert len(batch) * max(map(len, batch)) <= 100
+    assert padding_ratio(batches) < padding_ratio([sents[i:i + 4] for i in range(0, 500, 4)])
+
+    again = list(bucket_batches(iter(sents), max_tokens=100, window=200,
+                                max_sentences=8, shuffle=shuffle))
+    assert again == batches
+
+
+def test_bucket_batches_seed():
+    sents = _sents(300)
+    batches = [list(bucket_batches(sents, 100, seed=seed)) for seed in range(2)]
+    assert batches[0] != batches[1]
+    assert sorted(map(len, batches[0])) == sorted(map(len, batches[1]))
+
+
+def test_long_sentence():
+    batches = list(bucket_batches([[0] * 50, [0] * 3], max_tokens=10, shuffle=False))
+    assert batches == [[[0] * 3], [[0] * 50]]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_corpus_batches(tmpdir, corpus_file, workers):
+    # sentences with 1..15 words
+    word = '<w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>школа</w> '
+    for i in range(3):
+        corpus_file(tmpdir, [
+            '<se>%s</se>' % (word * (j + 1)) for j in range(i * 5, i * 5 + 5)
+        ], "%02d.xml" % i)
+
+    batches = list(corpus_batches(str(tmpdir), max_tokens=20, window=4,
+                                  workers=workers, seed=1))
+    assert sorted(len(s) for b in batches for s in b) == list(range(1, 16))
+    assert batches[0][0][0].text == 'школа'
+    assert batches == list(corpus_batches(str(tmpdir), max_tokens=20, window=4,
+                                          workers=1, seed=1))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import os
+import pytest
+import ruscorpora as rnc
+from ruscorpora.compiled import is_fresh
+
+SENTENCES = """<se>«
+<w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола</w>
+ <w><ana lex="злословие" gr="S,n,inan=sg,gen"></ana>злосл`овия</w> » ,-
+<w><ana lex="сми" gr="S,0=sg,nom"></ana>СМИ</w> !</se>
+<se>
+<w><ana lex="Сегодня" gr="ADV" joined="hyphen"></ana>Сег`одня</w>-<w><ana lex="завтра" gr="ADV" joined="hyphen"></ana>з`автра</w>
+<w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>шк`ола</w></se>"""
+
+
+def test_parse_cached(tmpdir, corpus_file):
+    source = corpus_file(tmpdir, SENTENCES)
+    expected = list(rnc.parse_simple(source))
+
+    assert list(rnc.parse_cached(source)) == expected
+    assert os.path.exists(source + '.rnc')
+    assert is_fresh(source + '.rnc', source)
+    assert not is_fresh(source + '.rnc', source, remove_accents=False)
+
+    # read from the cache
+    sents = list(rnc.parse_cached(source))
+    assert sents == expected
+    assert isinstance(sents[0][1].gr, rnc.Tag)
+
+
+def test_cache_invalidation(tmpdir, corpus_file):
+    source = corpus_file(tmpdir, SENTENCES)
+    list(rnc.parse_cached(source))
+
+    with open(source, 'ab') as f:
+        f.write(b'\n')
+    assert not is_fresh(source + '.rnc', source)
+    assert len(list(rnc.parse_cached(source))) == 2
+    assert is_fresh(source + '.rnc', source)
+
+
+def test_cache_with_errors(tmpdir, corpus_file):
+    source = corpus_file(tmpdir, SENTENCES)
+    broken = tmpdir.join("broken.xml")
+    broken.write_binary(b"<corpus><se>")
+    cache = str(tmpdir.join('corpus.rnc'))
+
+    with pytest.warns(UserWarning):
+        rnc.compile_corpus(str(tmpdir), cache)
+    assert not is_fresh(cache, str(tmpdir))
+    with rnc.CompiledCorpus(cache) as corpus:
+        assert len(corpus) == 2
+        assert [path for path, error in corpus.errors] == [str(broken)]
+
+    broken.remove()
+    rnc.compile_corpus(str(tmpdir), cache)
+    assert is_fresh(cache, str(tmpdir))
+
+
+def test_compiled_corpus_ids(tmpdir, corpus_file):
+    source = corpus_file(tmpdir, SENTENCES)
+    cache = str(tmpdir.join('corpus.rnc'))
+    rnc.compile_corpus(str(tmpdir), cache)
+
+    with rnc.CompiledCorpus(cache) as corpus:
+        assert len(corpus) == 2
+        ids = corpus.sentence_ids(1).tolist()
+        assert [corpus.texts[i] for i in ids[0::4]] == ['Сегодня-завтра', 'школа']
+        assert [corpus.lexemes[i] for i in ids[1::4]] == ['Сегодня-завтра', 'школа']
+        # strings are interned
+        assert corpus.sentence_ids(0)[5] == ids[5]
+        assert list(corpus.sentences(wrap_tags=False)) == list(rnc.parse_simple(source, wrap_tags=False))
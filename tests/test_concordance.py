@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import os
+import time
+import ruscorpora as rnc
+from ruscorpora.concordance import (ConcordanceIndex, encode_postings,
+                                    decode_postings)
+
+from conftest import VERB_SENTENCES
+
+
+def test_postings_encoding():
+    postings = [(0, 1), (0, 5), (3, 0), (3, 200), (1000, 2)]
+    assert decode_postings(encode_postings(postings)) == postings
+
+
+def test_search(tmpdir, corpus_file):
+    corpus = tmpdir.mkdir('corpus')
+    a = corpus_file(corpus, VERB_SENTENCES % ('стояла', 'стояла'), 'a.xml')
+    b = corpus_file(corpus, VERB_SENTENCES % ('работала', 'работала'), 'b.xml')
+    index = ConcordanceIndex(str(tmpdir.join('index')))
+    assert index.update(str(corpus)) == [a, b]
+
+    assert index.find(lex='школа', gr='pl') == [(a, 0, 1), (b, 0, 1)]
+    assert index.find('text:школа') == [(a, 1, 0), (b, 1, 0)]
+    assert index.find(lex='школа', gr=['pl', 'nom']) == []
+
+    hits = list(index.search(lex='стояла', window=1))
+    assert len(hits) == 1
+    hit = hits[0]
+    assert (hit.path, hit.sentence, hit.position) == (a, 1, 1)
+    assert [t.text for t in hit.left] == ['Школа']
+    assert hit.token.text == 'стояла'
+    assert [t.text for t in hit.right] == [' .']
+
+
+def test_incremental_update(tmpdir, corpus_file):
+    corpus = tmpdir.mkdir('corpus')
+    a = corpus_file(corpus, VERB_SENTENCES % ('стояла', 'стояла'), 'a.xml')
+    index_dir = str(tmpdir.join('index'))
+    assert ConcordanceIndex(index_dir).update(str(corpus)) == [a]
+
+    b = corpus_file(corpus, VERB_SENTENCES % ('работала', 'работала'), 'b.xml')
+    index = ConcordanceIndex(index_dir)
+    assert index.update(str(corpus)) == [b]
+    assert index.update(str(corpus)) == []
+
+    corpus_file(corpus, VERB_SENTENCES % ('пела', 'пела'), 'a.xml')
+    os.utime(a, (time.time() + 10, time.time() + 10))
+    assert index.update(str(corpus)) == [a]
+    assert index.find(lex='стояла') == []
+    assert index.find(lex='пела') == [(a, 1, 1)]
+
+    os.remove(a)
+    index.update(str(corpus), remove_missing=True)
+    assert index.files() == [b]
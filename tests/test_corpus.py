@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import os
+import time
+import pytest
+import ruscorpora as rnc
+from ruscorpora import corpus
+
+from conftest import SCHOOL_SENT
+
+
+@pytest.fixture
+def write_corpus(tmpdir, corpus_file):
+    """ Write ``size`` files with 10 sentences each to tmpdir. """
+    def write(size):
+        for i in range(size):
+            corpus_file(tmpdir, [SCHOOL_SENT % ('%d_%d' % (i, j)) for j in range(10)],
+                        "%02d.xml" % i)
+    return write
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_parse_corpus_ordered(tmpdir, write_corpus, workers):
+    write_corpus(5)
+    sents = list(rnc.parse_corpus(str(tmpdir), workers=workers, chunk_size=3))
+    assert [s[0].text for s in sents] == [
+        'Школа%d_%d' % (i, j) for i in range(5) for j in range(10)
+    ]
+    assert sents[0][0].gr is sents[-1][0].gr
+
+
+def test_parse_corpus_unordered(tmpdir, write_corpus):
+    write_corpus(5)
+    sents = list(rnc.parse_corpus(str(tmpdir), workers=3, ordered=False))
+    assert sorted(s[0].text for s in sents) == sorted(
+        'Школа%d_%d' % (i, j) for i in range(5) for j in range(10)
+    )
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parse_corpus_errors(tmpdir, write_corpus, workers):
+    write_corpus(2)
+    tmpdir.join("01_broken.xml").write_binary(b"<corpus><se>")
+    errors = []
+    sents = list(rnc.parse_corpus(
+        str(tmpdir), workers=workers,
+        on_error=lambda path, e: errors.append(path)
+    ))
+    assert len(sents) == 20
+    assert errors == [str(tmpdir.join("01_broken.xml"))]
+
+
+def _parse_or_die(path):
+    if 'broken' in path:
+        time.sleep(0.5)  # let the worker send the output of previous files
+        os._exit(1)
+    return rnc.parse_simple(path)
+
+
+def _parse_and_fail(path):
+    for i, sent in enumerate(rnc.parse_simple(path)):
+        if 'broken' in path and i == 3:
+            raise ValueError("broken")
+        yield sent
+
+
+def test_map_files_worker_died(tmpdir, write_corpus, monkeypatch):
+    monkeypatch.setattr(corpus, '_POLL_INTERVAL', 0.1)
+    write_corpus(4)
+    tmpdir.join("01_broken.xml").write_binary(b"")
+    errors = []
+    sents = list(rnc.map_files(
+        _parse_or_die, str(tmpdir), workers=2,
+        on_error=lambda path, e: errors.append(path)
+    ))
+    assert len(sents) == 40
+    assert errors == [str(tmpdir.join("01_broken.xml"))]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_map_files_partial_output(tmpdir, write_corpus, workers):
+    write_corpus(2)
+    tmpdir.join("01_broken.xml").write_binary(tmpdir.join("01.xml").read_binary())
+    errors = []
+    sents = list(rnc.map_files(
+        _parse_and_fail, str(tmpdir), workers=workers, chunk_size=2,
+        on_error=lambda path, e: errors.append(path)
+    ))
+    assert [s[0].text for s in sents] == (
+        ['Школа0_%d' % j for j in range(10)] + ['Школа1_%d' % j for j in range(10)] +
+        ['Школа1_%d' % j for j in range(3)]
+    )
+    assert len(errors) == 1
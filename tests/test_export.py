@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import io
+import gzip
+import json
+import ruscorpora as rnc
+from ruscorpora.export import export_corpus, format_conllu, main
+from conftest import corpus_fp
+
+SENT = """<se><w><ana lex="пол" gr="NUM" joined="together"></ana>пол</w><w><ana lex="дюжина" gr="S,f,inan=sg,gen" joined="together"></ana>дюжины</w> .</se>"""
+
+
+def test_conllu():
+    sent = next(rnc.parse_simple(corpus_fp(SENT), wrap_tags=False))
+    assert format_conllu(sent, 'a:0').splitlines() == [
+        '# sent_id = a:0',
+        '1\tполдюжины\tполдюжина\tNOUN\tS,f,inan=sg,gen\t'
+        'Animacy=Inan|Case=Gen|Gender=Fem|Number=Sing\t_\t_\t_\tJoined=together',
+        '2\t.\t.\tPUNCT\tPNCT\t_\t_\t_\t_\t_',
+        '',
+    ]
+
+
+def test_export_tsv_gzip(tmpdir, corpus_file):
+    corpus_file(tmpdir, [SENT] * 2, 'a.xml')
+    corpus_file(tmpdir, SENT, 'b.xml')
+    output = str(tmpdir.join('out.tsv.gz'))
+    assert export_corpus(str(tmpdir), output, 'tsv', workers=2) == [output]
+    with gzip.open(output, 'rb') as f:
+        blocks = f.read().decode('utf8').split('\n\n')
+    assert len(blocks) == 4  # 3 sentences + the final empty string
+    assert blocks[0].split('\n')[0] == 'полдюжины\tполдюжина\tS,f,inan=sg,gen\ttogether'
+
+
+def test_export_shards(tmpdir, corpus_file):
+    path = corpus_file(tmpdir, [SENT] * 10, 'a.xml')
+    output = str(tmpdir.join('out', 'sents.jsonl'))
+    tmpdir.mkdir('out')
+    paths = export_corpus(path, output, 'jsonl', workers=1, shard_size=300)
+    assert [p[len(str(tmpdir)) + 1:] for p in paths[:2]] == [
+        'out/sents-00000.jsonl', 'out/sents-00001.jsonl'
+    ]
+    lines = []
+    for p in paths:
+        with io.open(p, encoding='utf8') as f:
+            lines.extend(json.loads(line) for line in f)
+    assert len(lines) == 10
+    assert lines[0][1] == [' .', ' .', 'PNCT', None]
+
+
+def test_cli(tmpdir, corpus_file):
+    path = corpus_file(tmpdir, [SENT] * 3, 'a.xml')
+    output = str(tmpdir.join('out.conllu'))
+    main(['-f', 'conllu', '-o', output, '-j', '1', path])
+    with io.open(output, encoding='utf8') as f:
+        assert f.read().count('# sent_id = a.xml:') == 3
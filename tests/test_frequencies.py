@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import pytest
+from ruscorpora.frequencies import (FrequencyStats, count_corpus,
+                                    count_corpus_to_file)
+
+from conftest import VERB_SENTENCES
+
+
+@pytest.fixture
+def corpus(tmpdir, corpus_file):
+    directory = tmpdir.mkdir('corpus')
+    for name, verb in [('a.xml', 'стояла'), ('b.xml', 'работала'), ('c.xml', 'стояла')]:
+        corpus_file(directory, VERB_SENTENCES % (verb, verb), name)
+    return str(directory)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_count_corpus(corpus, workers):
+    stats = count_corpus(corpus, workers=workers)
+    assert stats.tables['lex']['школа'] == 6
+    assert stats.tables['lex']['стояла'] == 2
+    assert stats.tables['text_lex'][('школа', 'школа')] == 3
+    assert stats.tables['gr']['PNCT'] == 6
+    assert stats.tables['gr_2'][('A=pl,gen,plen', 'S,f,inan=pl,gen')] == 3
+    assert stats.tables['lex_3'][('новый', 'школа', ' .')] == 3
+
+
+def test_save_load(tmpdir, corpus):
+    stats = count_corpus(corpus, workers=1)
+    path = str(tmpdir.join('freqs.tsv.gz'))
+    stats.save(path)
+    loaded = FrequencyStats.load(path)
+    assert loaded.tables == stats.tables
+
+
+def test_save_load_escaped(tmpdir):
+    stats = FrequencyStats()
+    stats.tables['text']['a\tb\nc\rd'] = 2
+    stats.tables['text']['\\t\\'] = 1
+    stats.tables['text_lex'][('a\\', None)] = 3
+    path = str(tmpdir.join('freqs.tsv.gz'))
+    stats.save(path)
+    assert FrequencyStats.load(path).tables == stats.tables
+
+
+def test_count_corpus_to_file(tmpdir, corpus):
+    path = str(tmpdir.join('freqs.tsv.gz'))
+    count_corpus_to_file(corpus, path, workers=1, max_items=10)
+    assert FrequencyStats.load(path).tables == count_corpus(corpus, workers=1).tables
+
+
+def test_approximate(corpus):
+    stats = count_corpus(corpus, workers=1, max_items=4)
+    assert all(len(table) <= 4 for table in stats.tables.values())
+    assert stats.tables['lex']['школа'] == 6
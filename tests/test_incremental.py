@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import os
+from ruscorpora.incremental import IncrementalIngest
+from conftest import SCHOOL_SENT, corpus_xml
+
+def _write(tmpdir, name, numbers):
+    path = tmpdir.join(name)
+    path.write_binary(corpus_xml([SCHOOL_SENT % i for i in numbers]))
+    return str(path)
+
+
+def _texts(results):
+    return [(os.path.basename(path), index, sent[0].text) for path, index, sent in results]
+
+
+def test_incremental_ingest(tmpdir):
+    corpus = tmpdir.mkdir('corpus')
+    _write(corpus, 'a.xml', [1, 2, 1])
+    _write(corpus, 'b.xml', [3])
+    db = str(tmpdir.join('manifest.sqlite'))
+
+    with IncrementalIngest(db) as ingest:
+        assert _texts(ingest.ingest(str(corpus))) == [
+            ('a.xml', 0, 'Школа1'), ('a.xml', 1, 'Школа2'), ('b.xml', 0, 'Школа3'),
+        ]
+        assert ingest.counts['sentences_duplicate'] == 1
+        assert [row[2:] for row in ingest.duplicates()] == [(0, 2)]
+
+    # unchanged files are skipped, changed ones only return new sentences
+    path_b = _write(corpus, 'b.xml', [3, 4])
+    os.utime(path_b, (1, 1))
+    _write(corpus, 'c.xml', [2, 1])
+    with IncrementalIngest(db) as ingest:
+        assert _texts(ingest.ingest(str(corpus))) == [('b.xml', 1, 'Школа4')]
+        assert ingest.counts == {
+            'files_unchanged': 1, 'files_duplicate': 0, 'files_parsed': 2,
+            'sentences_new': 1, 'sentences_duplicate': 2,
+        }
+        assert [row[3] for row in ingest.duplicates()] == [3, 2]
+
+        # a copy of a known file is not parsed, its sentences are counted
+        _write(corpus, 'd.xml', [2, 1])
+        assert list(ingest.ingest(str(corpus))) == []
+        assert ingest.counts['files_duplicate'] == 1
+        assert ingest.counts['files_parsed'] == 0
+        assert ingest.counts['sentences_duplicate'] == 2
+        assert [row[3] for row in ingest.duplicates()] == [4, 3]
+
+        # old sentences of a changed file are not counted again,
+        # removed ones are uncounted
+        path_a = _write(corpus, 'a.xml', [2, 5])
+        os.utime(path_a, (1, 1))
+        assert _texts(ingest.ingest(str(corpus))) == [('a.xml', 1, 'Школа5')]
+        assert ingest.counts['sentences_duplicate'] == 0
+        assert [row[3] for row in ingest.duplicates()] == [3, 2]
+        path_c = os.path.join(str(corpus), 'c.xml')
+        assert [row[1:] for row in ingest.duplicates(1)] == [
+            (path_a, 0, 3), (path_c, 1, 2), (path_a, 1, 1), (path_b, 0, 1),
+            (path_b, 1, 1),
+        ]
+
+
+def test_touched_file(tmpdir):
+    corpus = tmpdir.mkdir('corpus')
+    path_a = _write(corpus, 'a.xml', [1, 2])
+    db = str(tmpdir.join('manifest.sqlite'))
+    with IncrementalIngest(db) as ingest:
+        assert len(list(ingest.ingest(str(corpus)))) == 2
+
+        # mtime is changed, content is not
+        os.utime(path_a, (1, 1))
+        assert list(ingest.ingest(str(corpus))) == []
+        assert ingest.counts['files_unchanged'] == 1
+        assert [row[1:] for row in ingest.duplicates(1)] == [
+            (path_a, 0, 1), (path_a, 1, 1),
+        ]
+
+        _write(corpus, 'b.xml', [1])
+        assert list(ingest.ingest(str(corpus))) == []
+        assert ingest.counts['sentences_duplicate'] == 1
+
+
+def test_interrupted_ingest(tmpdir):
+    path = _write(tmpdir, 'a.xml', [1, 2, 3])
+    db = str(tmpdir.join('manifest.sqlite'))
+    with IncrementalIngest(db) as ingest:
+        results = ingest.ingest(path)
+        next(results)
+        results.close()
+
+    with IncrementalIngest(db) as ingest:
+        assert len(list(ingest.ingest(path))) == 3
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import os
+import sys
+import subprocess
+
+import pytest
+import ruscorpora as rnc
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def test_import_is_lazy():
+    code = (
+        "import sys, ruscorpora; ruscorpora.Tag; "
+        "print(' '.join(sorted(sys.modules)))"
+    )
+    modules = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT)
+    modules = modules.decode('ascii').split()
+    assert 'ruscorpora.tagset' in modules
+    for name in ['ruscorpora.reader', 'xml.etree.ElementTree',
+                 'multiprocessing', 'numpy', 'zipfile']:
+        assert name not in modules
+
+
+def test_public_names():
+    for name in rnc.__all__:
+        assert getattr(rnc, name) is not None
+    assert rnc.parse_simple is rnc.reader.parse_simple
+    assert set(rnc.__all__) <= set(dir(rnc))
+    with pytest.raises(AttributeError):
+        rnc.no_such_name
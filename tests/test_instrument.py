@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import pytest
+import ruscorpora as rnc
+from ruscorpora.instrument import PipelineStats
+from conftest import corpus_fp, corpus_xml
+
+SENTENCES = """<se>«
+<w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола</w>
+ <w><ana lex="злословие" gr="S,n,inan=sg,gen"></ana>злосл`овия</w> !</se>
+<se><w><ana lex="пол" gr="NUM" joined="together"></ana>пол</w> !</se>"""
+
+
+def _source():
+    return corpus_fp(SENTENCES)
+
+
+def test_parse_simple_stats():
+    reports = []
+    stats = PipelineStats(callback=reports.append)
+    with pytest.warns(UserWarning):
+        sents = list(rnc.parse_simple(_source(), stats=stats))
+        assert sents == list(rnc.parse_simple(_source()))
+
+    result = stats.as_dict()
+    assert reports == [result]
+    counts = result['counts']
+    assert counts['bytes_read'] == len(corpus_xml(SENTENCES))
+    assert counts['sentences_parsed'] == counts['sentences'] == 2
+    assert counts['tokens'] == 6
+    assert counts['unconsumed_tokens_warnings'] == 1
+    assert counts['tag_cache_hits'] + counts['tag_cache_misses'] == 6
+
+    for stage in ['parse', 'input', 'simplify', 'tags', 'consumer']:
+        assert result['stages'][stage]['calls'] == 2
+        assert result['stages'][stage]['seconds'] >= 0
+
+
+def test_callback_interval(tmpdir):
+    path = tmpdir.join('corpus.xml')
+    path.write_binary(corpus_xml(SENTENCES))
+    reports = []
+    stats = PipelineStats(callback=reports.append, interval=1)
+    with pytest.warns(UserWarning):
+        for sent in rnc.parse_simple(str(path), stats=stats):
+            pass
+    assert [r['counts']['sentences'] for r in reports] == [1, 2, 2]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import ruscorpora as rnc
+from ruscorpora.lazy import parse_xml_lazy
+from conftest import corpus_fp
+
+SENTENCES = """<se>«
+<w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола</w>
+ <w><ana lex="злословие" gr="S,n,inan=sg,gen"></ana>злосл`овия</w> » ,-
+<w><ana lex="пол" gr="NUM" joined="together"></ana>пол</w><w><ana lex="дюжина" gr="S,f,inan=sg,gen" joined="together"></ana>дюжины</w>
+<w><ana lex="стать" gr="V,pf,intr=praet,sg,indic,m"></ana><ana lex="стать" gr="V,pf,intr=praet,sg,indic,n"></ana>ст`ало</w> !</se>
+<se><w><ana lex="сми" gr="S,0=sg,nom"></ana>СМИ</w></se>"""
+
+
+def _fp():
+    return corpus_fp(SENTENCES)
+
+
+def test_same_tokens():
+    eager = list(rnc.parse_xml(_fp()))
+    lazy = list(parse_xml_lazy(_fp()))
+    assert [sent.materialize() for sent in lazy] == eager
+    assert lazy == eager
+    assert [len(sent) for sent in lazy] == [len(sent) for sent in eager]
+
+
+def test_sparse_access():
+    sent = next(parse_xml_lazy(_fp()))
+    assert sent.texts()[:3] == ['«', 'Шк`ола', 'злосл`овия']
+    assert sent.tags()[:2] == [None, 'S,f,inan=sg,nom']
+    assert sent.lexemes()[-2:] == ['стать', None]
+
+    tok = sent[-2]
+    assert tok.gr == 'V,pf,intr=praet,sg,indic,n'
+    assert len(tok.annotations) == 2
+    assert tok.annotations[0].gr == 'V,pf,intr=praet,sg,indic,m'
+    text, annotations = tok
+    assert text == 'ст`ало'
+    assert sent[0].annotations is None
+    assert tok.annotations[-2:] == list(tok.annotations)
+    assert tok.annotations is tok.annotations
+    assert [t.text for t in sent[1:3]] == ['Шк`ола', 'злосл`овия']
+
+
+def test_simplify():
+    eager = list(rnc.simplify(rnc.parse_xml(_fp())))
+    assert list(rnc.simplify(parse_xml_lazy(_fp()))) == eager
+    assert eager[0][4] == ('полдюжины', 'полдюжина', 'S,f,inan=sg,gen', 'together')
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import os
+import ruscorpora as rnc
+from ruscorpora.offsets import SentenceIndex, build_offset_index, load_offset_index
+from conftest import corpus_xml
+
+
+def _write(tmpdir, name, count, encoding='utf-8'):
+    sents = [
+        '<se>«<w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола%s</w> , ...</se> -' % i
+        for i in range(count)
+    ]
+    path = tmpdir.join(name)
+    path.write_binary(corpus_xml(sents, encoding))
+    return str(path)
+
+
+def test_offset_index(tmpdir):
+    path = _write(tmpdir, 'a.xml', 5, 'windows-1251')
+    index = build_offset_index(path)
+    assert len(index) == 5
+    assert index.encoding.lower() == 'windows-1251'
+
+    expected = list(rnc.parse_xml(path))
+    with open(path, 'rb') as fp:
+        assert [index.parse(fp, i) for i in range(5)] == expected
+
+
+def test_offset_index_sidecar(tmpdir):
+    path = _write(tmpdir, 'a.xml', 3)
+    index = load_offset_index(path)
+    assert os.path.exists(path + '.sents')
+    loaded = load_offset_index(path)
+    assert list(loaded.starts) == list(index.starts)
+    assert list(loaded.ends) == list(index.ends)
+
+
+def test_corpus(tmpdir, monkeypatch):
+    _write(tmpdir, 'a.xml', 3)
+    _write(tmpdir, 'b.xml', 0)
+    _write(tmpdir, 'c.xml', 4)
+    expected = list(rnc.parse_corpus(str(tmpdir), workers=1))
+
+    corpus = rnc.Corpus(str(tmpdir))
+    assert len(corpus) == 7
+    assert corpus[0] == expected[0]
+    assert corpus[-1] == expected[-1]
+    assert corpus[2:5] == expected[2:5]
+
+    sample = corpus.sample(3, seed=0)
+    assert len(sample) == 3
+    assert all(sent in expected for sent in sample)
+
+    # iteration reads files sequentially
+    monkeypatch.setattr(SentenceIndex, 'parse', None)
+    assert list(corpus) == expected
+    assert list(rnc.Corpus(str(tmpdir), raw=True)) == [
+        sent for name in ['a.xml', 'c.xml']
+        for sent in rnc.parse_xml(str(tmpdir.join(name)))
+    ]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import pytest
+import ruscorpora as rnc
+from ruscorpora.query import compile_query, QuerySyntaxError
+from conftest import corpus_fp, corpus_xml
+
+SENTENCES = """<se><w><ana lex="школа" gr="S,f,inan=pl,gen"></ana>шк`ол</w> <w><ana lex="читать" gr="V,ipf,tran=partcp,praes,act,sg,nom,m,plen"></ana>чит`ающий</w>
+<w><ana lex="читать" gr="V,pf,tran=sg,praet,indic,m"></ana>прочит`ал</w> .</se>
+<se><w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола</w></se>"""
+
+
+def _sents():
+    return list(rnc.parse_simple(corpus_fp(SENTENCES)))
+
+
+def _texts(query):
+    return [
+        [sent[i].text for i in positions]
+        for sent, positions in compile_query(query).find(_sents())
+    ]
+
+
+def test_grammemes():
+    assert _texts('S,gen,pl') == [['школ']]
+    assert _texts('S & !gen') == [['Школа']]
+    assert _texts('V and not partcp') == [['прочитал']]
+    assert _texts('(pf | partcp), V') == [['читающий', 'прочитал']]
+    assert _texts('POS=PNCT') == [[' .']]
+    assert _texts('case=nom') == [['читающий'], ['Школа']]
+
+
+def test_fields():
+    assert _texts('lex=школа') == [['школ'], ['Школа']]
+    assert _texts('lex="школа", sg') == [['Школа']]
+    assert _texts('text=/^шк/i & !pl') == [['Школа']]
+    assert _texts('lex=/ать$/ | POS=PNCT') == [['читающий', 'прочитал', ' .']]
+    assert compile_query('lex=школа').count(_sents()) == 2
+
+
+@pytest.mark.parametrize('query', [
+    'Foo', 'S,', 'S,(gen', 'case=pl', 'foo=bar', 'lex=/(/', 'POS=Foo', 'S gen',
+])
+def test_invalid(query):
+    with pytest.raises(QuerySyntaxError):
+        compile_query(query)
+
+
+def test_find_compiled(tmpdir):
+    source = tmpdir.join('corpus.xml')
+    source.write_binary(corpus_xml(SENTENCES))
+    cache = str(tmpdir.join('corpus.rnc'))
+    rnc.compile_corpus(str(source), cache)
+
+    query = compile_query('V | lex=школа')
+    with rnc.CompiledCorpus(cache) as corpus:
+        assert list(query.find_compiled(corpus)) == [(0, [0, 1, 2]), (1, [0])]
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals
 import io
+import pytest
 import ruscorpora as rnc
+from ruscorpora.reader import (_iter_sentence_elements, _sentence_tokens,
+                               _sentence_tokens_reference)
 
 def _parse(corpus_xml):
     corpus = '<?xml version="1.0" encoding="utf-8" ?>\n<corpus>\n%s\n</corpus>' % corpus_xml
@@ -74,3 +77,73 @@ def test_joined_together():
             ('полдюжины', 'полдюжина', 'S,f,inan=sg,gen', 'together')
         ]
     ]
+
+
+def test_parse_xml_incremental():
+    corpus = """<?xml version="1.0" encoding="utf-8" ?>
+    <corpus>
+    <se><w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола</w> .</se>
+    <se><w><ana lex="злословие" gr="S,n,inan=sg,gen"></ana>злосл`овия</w>"""
+    fp = io.BytesIO(corpus.encode('utf8'))
+    sents = rnc.parse_xml(fp)
+
+    assert next(sents) == [
+        rnc.Token('Шк`ола', [rnc.Annotation('школа', 'S,f,inan=sg,nom', None)]),
+        rnc.Token(' .', None),
+    ]
+    with pytest.raises(SyntaxError):
+        next(sents)
+
+
+def test_not_flat_tokens():
+    corpus = """<?xml version="1.0" encoding="utf-8" ?>
+    <corpus><se><w><ana lex="пол" gr="NUM" joined="together"></ana>пол</w><w><ana lex="дюжина" gr="S,f,inan=sg,gen" joined="together"></ana>дюжины</w> !</se></corpus>"""
+    fp = io.BytesIO(corpus.encode('utf8'))
+    sents = list(rnc.simplify(rnc.parse_xml(fp), flat_tokens=False))
+    assert sents == [[
+        rnc.Token('полдюжины', [
+            rnc.Annotation('пол', 'NUM', 'together'),
+            rnc.Annotation('дюжина', 'S,f,inan=sg,gen', 'together'),
+        ]),
+        rnc.Token(' !', [rnc.Annotation(' !', 'PNCT', None)]),
+    ]]
+    assert isinstance(sents[0][0].annotations[0].gr, rnc.Tag)
+
+
+def test_unconsumed_tokens_warning():
+    corpus = """
+    <se><w><ana lex="пол" gr="NUM" joined="together"></ana>пол</w> !</se>"""
+    with pytest.warns(UserWarning, match="unconsumed tokens"):
+        assert _parse(corpus) == [[
+            ('пол', 'пол', 'NUM', 'together'),
+            (' !', ' !', 'PNCT', None),
+        ]]
+
+
+def test_tag_format():
+    corpus = """
+    <se><w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола</w> !</se>"""
+    corpus = '<?xml version="1.0" encoding="utf-8" ?>\n<corpus>\n%s\n</corpus>' % corpus
+    fp = io.BytesIO(corpus.encode('utf8'))
+    sents = list(rnc.simplify(rnc.parse_xml(fp), tag_format='ud'))
+    assert [tok.gr for tok in sents[0]] == [
+        ('NOUN', 'Animacy=Inan|Case=Nom|Gender=Fem|Number=Sing'),
+        ('PUNCT', '_'),
+    ]
+
+
+def test_sentence_builder_same_as_reference():
+    corpus = """<?xml version="1.0" encoding="utf-8" ?>
+    <corpus>
+    <se> \n«\n <w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>Шк`ола</w>\n\n
+    <w><ana lex="x" gr="S"></ana> \u00a0</w><w><ana lex="пол" gr="NUM" joined="together"></ana>пол</w> ,\n- <b>bold</b> ;
+    <w><ana lex="стать" gr="V"></ana><ana lex="стать" gr="S"></ana>ст`ало</w></se>\n !
+    <p><se><w><ana lex="a" gr="S"></ana>b</w></se></p>
+    <se></se>
+    </corpus>"""
+    elems = list(_iter_sentence_elements(io.BytesIO(corpus.encode('utf8'))))
+    sents = [_sentence_tokens(se) for se in elems]
+    assert sents == [_sentence_tokens_reference(se) for se in elems]
+    assert [tok.text for tok in sents[0]] == [
+        '«', 'Шк`ола', 'пол', ' ,', '- ', 'ст`ало', ' !'
+    ]
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import io
+import os
+import gzip
+import pytest
+import ruscorpora as rnc
+from ruscorpora import resumable
+from ruscorpora.resumable import ResumableIngest, parse_xml_recover
+from conftest import corpus_xml
+
+SENT = '<se><w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>школа%d</w> .\n</se>\n'
+BROKEN = '<se><w><ana lex="школа" gr="S,f,inan=sg,nom"></ana>школа</w> .\n'
+
+
+def _corpus(count, broken=(), encoding='utf-8'):
+    sents = [BROKEN if i in broken else SENT % i for i in range(count)]
+    return corpus_xml(''.join(sents), encoding)
+
+
+def _texts(sents):
+    return [tok.text for sent in sents for tok in sent]
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'windows-1251'])
+def test_parse_xml_recover(monkeypatch, encoding):
+    monkeypatch.setattr(resumable, '_READ_SIZE', 7)
+    data = _corpus(30, encoding=encoding)
+    assert list(parse_xml_recover(io.BytesIO(data))) == list(rnc.parse_xml(io.BytesIO(data)))
+
+
+def test_parse_xml_recover_broken():
+    data = _corpus(10, broken=(3, 9))
+    errors = []
+    sents = list(parse_xml_recover(io.BytesIO(data),
+                                   lambda name, offset, e: errors.append(offset)))
+    assert _texts(sents) == [
+        t for i in range(10) if i not in (3, 9) for t in ['школа%d' % i, ' .']
+    ]
+    assert [data[offset:offset + 4] for offset in errors] == [b'<se>', b'<se>']
+
+    with pytest.raises(Exception):
+        list(rnc.parse_xml(io.BytesIO(data)))
+
+
+@pytest.mark.parametrize('read_size', [3, 7, 1000])
+def test_parse_xml_recover_comments(monkeypatch, read_size):
+    monkeypatch.setattr(resumable, '_READ_SIZE', read_size)
+    data = corpus_xml(
+        '<!-- <se> --><se><w><ana lex="a" gr="S"></ana>a<!-- </se><se> --></w>'
+        '<![CDATA[</se><se>]]></se>\n<?pi <se>?>' + SENT % 1
+    )
+    sents = list(parse_xml_recover(io.BytesIO(data)))
+    assert sents == list(rnc.parse_xml(io.BytesIO(data)))
+    assert _texts(sents) == ['a', '</se><se>', 'школа1', ' .']
+
+
+def test_parse_xml_recover_unclosed(monkeypatch):
+    monkeypatch.setattr(resumable, '_READ_SIZE', 7)
+    monkeypatch.setattr(resumable, '_MAX_SENTENCE_SIZE', 200)
+    data = corpus_xml(SENT % 1 + '<se>' + 'x' * 2000 + '</p>' + SENT % 2)
+    errors = []
+    sents = list(parse_xml_recover(io.BytesIO(data),
+                                   lambda name, offset, e: errors.append((offset, e))))
+    assert _texts(sents) == ['школа1', ' .', 'школа2', ' .']
+    assert [data[offset:offset + 5] for offset, e in errors] == [b'<se>x']
+    assert 'not closed' in str(errors[0][1])
+
+
+def test_resumable_ingest(tmpdir):
+    tmpdir.join('a.xml').write_binary(_corpus(10, broken=(4,)))
+    with gzip.open(str(tmpdir.join('b.xml.gz')), 'wb') as f:
+        f.write(_corpus(5))
+    tmpdir.join('c.xml').write_binary(b'<corpus><se>')
+    db = str(tmpdir.join('checkpoints.sqlite'))
+
+    errors = []
+    with ResumableIngest(db, checkpoint_every=2,
+                         on_error=lambda *args: errors.append(args)) as ingest:
+        it = ingest.ingest(str(tmpdir))
+        first = [next(it) for _ in range(5)]
+        it.close()  # interrupted; 4 sentences are processed
+    assert [index for path, index, sent in first] == list(range(5))
+    assert len(errors) == 1
+
+    with ResumableIngest(db, on_error=lambda *args: None) as ingest:
+        rest = list(ingest.ingest(str(tmpdir)))
+        assert [(os.path.basename(path), index) for path, index, sent in rest] == (
+            [('a.xml', i) for i in range(4, 9)] +
+            [('b.xml.gz', i) for i in range(5)]
+        )
+        assert rest[0][2][0].text == 'школа5'
+        assert ingest.counts['files_resumed'] == 1
+        assert ingest.counts['sentences_broken'] == 2  # a.xml is resumed before it
+        assert [(os.path.basename(name), offset) for name, offset, message in ingest.errors()] == [
+            ('a.xml', _corpus(10, broken=(4,)).index(b'<se>' + BROKEN[4:].encode('utf8'))),
+            ('c.xml', 8),
+        ]
+
+        assert list(ingest.ingest(str(tmpdir))) == []
+        assert ingest.counts['files_done'] == 3
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import io
+import bz2
+import gzip
+import zipfile
+import pytest
+import ruscorpora as rnc
+from ruscorpora.sources import iter_sources
+from ruscorpora.offsets import build_offset_index
+from conftest import SCHOOL_SENT, corpus_xml
+
+def _data(i):
+    return corpus_xml(SCHOOL_SENT % i)
+
+
+def _compress(data, ext):
+    if ext == '.gz':
+        fp = io.BytesIO()
+        with gzip.GzipFile(fileobj=fp, mode='wb') as f:
+            f.write(data)
+        return fp.getvalue()
+    if ext == '.bz2':
+        return bz2.compress(data)
+    lzma = pytest.importorskip('lzma')
+    return lzma.compress(data)
+
+
+@pytest.mark.parametrize('ext', ['.gz', '.bz2', '.xz'])
+def test_compressed_file(tmpdir, ext):
+    path = tmpdir.join('a.xml' + ext)
+    path.write_binary(_compress(_data(1), ext))
+    expected = list(rnc.parse_simple(io.BytesIO(_data(1))))
+    assert list(rnc.parse_simple(str(path))) == expected
+
+
+def test_zip_archive(tmpdir):
+    path = str(tmpdir.join('corpus.zip'))
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('texts/a.xml', _data(1))
+        archive.writestr('texts/readme.txt', b'not a corpus file')
+        archive.writestr('texts/b.xml.gz', _compress(_data(2), '.gz'))
+
+    assert [name for name, fp in iter_sources(path)] == [
+        path + '/texts/a.xml', path + '/texts/b.xml.gz'
+    ]
+    texts = [sent[0].text for sent in rnc.parse_simple(path)]
+    assert texts == ['Школа1', 'Школа2']
+
+
+def test_iter_files(tmpdir):
+    tmpdir.join('a.xml').write_binary(_data(1))
+    tmpdir.join('b.xml.bz2').write_binary(_compress(_data(2), '.bz2'))
+    tmpdir.join('c.txt').write_binary(b'')
+    files = list(rnc.iter_files(str(tmpdir)))
+    assert [f[len(str(tmpdir)) + 1:] for f in files] == ['a.xml', 'b.xml.bz2']
+
+    sents = list(rnc.parse_corpus(str(tmpdir), workers=1))
+    assert [sent[0].text for sent in sents] == ['Школа1', 'Школа2']
+
+
+def test_no_random_access(tmpdir):
+    path = tmpdir.join('a.xml.gz')
+    path.write_binary(_compress(_data(1), '.gz'))
+    with pytest.raises(ValueError):
+        build_offset_index(str(path))
@@ -2,6 +2,7 @@
 from __future__ import absolute_import, unicode_literals
 import pytest
 import ruscorpora as rnc
+from ruscorpora.tagset import to_ud, to_opencorpora, convert_many
 
 def test_attributes():
     tag = rnc.Tag('S,f,inan=sg,nom')
@@ -52,3 +53,58 @@ def test_eq():
 
     with pytest.raises(ValueError):
         rnc.Tag('S,f') == 'Foo'
+
+def test_hash_grammeme_order():
+    tag = rnc.Tag('S,f,inan=sg,nom')
+    assert hash(tag) == hash(rnc.Tag('S,inan,f=nom,sg'))
+    assert {tag: 1}[rnc.Tag.from_string('S,inan,f=nom,sg')] == 1
+
+def test_from_string_cached():
+    rnc.Tag.cache_clear()
+    tag = rnc.Tag.from_string('S,f,inan=sg,nom')
+    assert tag == 'S,f,inan=sg,nom'
+    assert rnc.Tag.from_string('S,f,inan=sg,nom') is tag
+    assert rnc.Tag.cache_info() == (1, 1, None, 1)
+
+def test_from_string_cache_size():
+    try:
+        rnc.Tag.set_cache_size(1)
+        v = rnc.Tag.from_string('V')
+        rnc.Tag.from_string('S')
+        assert rnc.Tag.cache_info().currsize == 1
+        assert rnc.Tag.from_string('V') is not v
+    finally:
+        rnc.Tag.set_cache_size(None)
+
+def test_hash():
+    counts = {}
+    for tag in ['S,f,inan=sg,nom', 'S,f,inan,sg,nom', 'V']:
+        counts[rnc.Tag(tag)] = counts.get(rnc.Tag(tag), 0) + 1
+    assert counts == {rnc.Tag('S,f,inan=sg,nom'): 2, rnc.Tag('V'): 1}
+
+def test_slots():
+    with pytest.raises(AttributeError):
+        rnc.Tag('V').foo = 1
+
+def test_grammemes():
+    assert rnc.Tag('S,f,inan=sg,nom').grammemes == frozenset(['S', 'f', 'inan', 'sg', 'nom'])
+
+def test_to_ud():
+    assert to_ud('S,f,inan=sg,nom') == ('NOUN', 'Animacy=Inan|Case=Nom|Gender=Fem|Number=Sing')
+    assert to_ud(rnc.Tag('V,pf,tran=partcp,pass,brev,pl')) == (
+        'VERB', 'Aspect=Perf|Number=Plur|Variant=Short|VerbForm=Part|Voice=Pass'
+    )
+    assert to_ud('S,m,anim,persn=sg,nom').upos == 'PROPN'
+    assert to_ud('PNCT') == ('PUNCT', '_')
+
+def test_to_opencorpora():
+    assert to_opencorpora('S,f,inan=sg,nom') == 'NOUN,femn,inan nomn,sing'
+    assert to_opencorpora('V,ipf,intr=n,sg,praet,indic') == 'VERB,impf,intr indc,neut,past,sing'
+    assert to_opencorpora('V,pf,tran=inf') == 'INFN,perf,tran'
+    assert to_opencorpora('A=comp') == 'COMP'
+
+def test_convert_many():
+    tags = ['S,f,inan=sg,nom', rnc.Tag('PNCT'), 'S,f,inan=sg,nom']
+    assert convert_many(tags, 'ud') == [to_ud(tag) for tag in tags]
+    with pytest.raises(ValueError):
+        convert_many(tags, 'foo')